@@ -1,29 +1,44 @@
-from flask import Flask, render_template, request, jsonify
+import json
+
+from flask import Flask, Response, render_template, request, jsonify, stream_with_context
 import requests
-from config import BACKEND_URL, FLASK_PORT, DEBUG
+from requests.adapters import HTTPAdapter
+from config import (
+    BACKEND_URL, FLASK_PORT, DEBUG,
+    BACKEND_POOL_SIZE, BACKEND_CONNECT_TIMEOUT, BACKEND_READ_TIMEOUT, BACKEND_PRIORITY,
+)
 
 app = Flask(__name__)
 
+# One pooled session for all proxied calls, so backend connections are kept alive and reused
+backend = requests.Session()
+backend.mount('http://', HTTPAdapter(pool_connections=1, pool_maxsize=BACKEND_POOL_SIZE))
+backend.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=BACKEND_POOL_SIZE))
+
+ALLOWED_TYPES = ('summarize', 'sentiment', 'intent', 'classify', 'analyze')
+STREAMING_TYPES = ('summarize', 'sentiment', 'intent', 'classify')
+# Backend response headers relayed to the browser; Retry-After comes with 429/503 backpressure
+PASSTHROUGH_HEADERS = ('Retry-After',)
+
 
 @app.route('/')
 def index():
     return render_template('index.html')
 
 
-@app.route('/api/ai/<analysis_type>', methods=['POST'])
-def proxy_analysis(analysis_type):
-    allowed_types = ('summarize', 'sentiment', 'intent', 'classify')
-    if analysis_type not in allowed_types:
-        return jsonify({'error': f'Invalid analysis type: {analysis_type}'}), 400
-
+def forward(path, stream=False):
+    """POST the raw request body to the backend and relay the response bytes unchanged."""
     try:
-        resp = requests.post(
-            f'{BACKEND_URL}/api/ai/{analysis_type}',
-            json=request.get_json(),
-            headers={'Content-Type': 'application/json'},
-            timeout=30
+        resp = backend.post(
+            f'{BACKEND_URL}{path}',
+            data=request.get_data(),
+            headers={
+                'Content-Type': request.content_type or 'application/json',
+                'X-Priority': BACKEND_PRIORITY,
+            },
+            timeout=(BACKEND_CONNECT_TIMEOUT, BACKEND_READ_TIMEOUT),
+            stream=stream,
         )
-        return jsonify(resp.json()), resp.status_code
     except requests.exceptions.ConnectionError:
         return jsonify({'error': 'Cannot connect to backend service'}), 502
     except requests.exceptions.Timeout:
@@ -31,6 +46,43 @@ def proxy_analysis(analysis_type):
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+    content_type = resp.headers.get('Content-Type', 'application/json')
+    headers = {name: resp.headers[name] for name in PASSTHROUGH_HEADERS if name in resp.headers}
+    if not stream:
+        return Response(resp.content, status=resp.status_code, content_type=content_type, headers=headers)
+
+    def relay():
+        try:
+            yield from resp.iter_content(chunk_size=None)
+        except requests.RequestException as e:
+            # The backend stalled or dropped mid-stream; end the stream with an error event
+            if content_type.startswith('text/event-stream'):
+                yield f'event: error\ndata: {json.dumps({"error": f"Backend stream failed: {e}"})}\n\n'.encode()
+        finally:
+            resp.close()
+
+    return Response(
+        stream_with_context(relay()),
+        status=resp.status_code,
+        content_type=content_type,
+        # Keep proxies from buffering server-sent events
+        headers={**headers, 'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+    )
+
+
+@app.route('/api/ai/<analysis_type>', methods=['POST'])
+def proxy_analysis(analysis_type):
+    if analysis_type not in ALLOWED_TYPES:
+        return jsonify({'error': f'Invalid analysis type: {analysis_type}'}), 400
+    return forward(f'/api/ai/{analysis_type}')
+
+
+@app.route('/api/ai/<analysis_type>/stream', methods=['POST'])
+def proxy_analysis_stream(analysis_type):
+    if analysis_type not in STREAMING_TYPES:
+        return jsonify({'error': f'Invalid analysis type: {analysis_type}'}), 400
+    return forward(f'/api/ai/{analysis_type}/stream', stream=True)
+
 
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=FLASK_PORT, debug=DEBUG)
+    app.run(host='0.0.0.0', port=FLASK_PORT, debug=DEBUG, threaded=True)
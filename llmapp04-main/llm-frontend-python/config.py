@@ -3,3 +3,11 @@ import os
 BACKEND_URL = os.environ.get('BACKEND_URL', 'http://localhost:8080')
 FLASK_PORT = int(os.environ.get('FLASK_PORT', 5000))
 DEBUG = os.environ.get('FLASK_DEBUG', 'true').lower() == 'true'
+
+# Shared connection pool to the backend
+BACKEND_POOL_SIZE = int(os.environ.get('BACKEND_POOL_SIZE', 50))
+BACKEND_CONNECT_TIMEOUT = float(os.environ.get('BACKEND_CONNECT_TIMEOUT', 5))
+# Seconds to wait for the backend to respond (between bytes when streaming)
+BACKEND_READ_TIMEOUT = float(os.environ.get('BACKEND_READ_TIMEOUT', 120))
+# Priority class requested for browser traffic, so it is served ahead of bulk API clients
+BACKEND_PRIORITY = os.environ.get('BACKEND_PRIORITY', 'interactive')
@@ -270,33 +270,37 @@ document.addEventListener('DOMContentLoaded', () => {
         setLoading(true);
         hideError();
 
+        // One request; the backend runs the four analyses concurrently.
         const types = ['summarize', 'sentiment', 'intent', 'classify'];
-        const promises = types.map(type =>
-            fetch(`/api/ai/${type}`, {
+        try {
+            const response = await fetch('/api/ai/analyze', {
                 method: 'POST',
                 headers: { 'Content-Type': 'application/json' },
-                body: JSON.stringify({ text })
-            })
-            .then(async response => {
-                if (!response.ok) {
-                    const errorData = await response.json().catch(() => ({}));
-                    throw new Error(errorData.error || `${type} analysis failed`);
-                }
-                return { type, data: await response.json() };
-            })
-            .catch(err => {
-                console.error(`${type} analysis error:`, err);
-                return null;
-            })
-        );
-
-        const results = await Promise.all(promises);
-        results.forEach(result => {
-            if (result) {
-                renderResultCard(result.type, result.data);
+                body: JSON.stringify({ text, tasks: types })
+            });
+
+            if (!response.ok) {
+                const errorData = await response.json().catch(() => ({}));
+                throw new Error(errorData.error || `Analysis failed (${response.status})`);
             }
-        });
 
-        setLoading(false);
+            const data = await response.json();
+            types.forEach(type => {
+                if (data[type]) {
+                    renderResultCard(type, data[type]);
+                }
+            });
+
+            const failed = Object.keys(data.errors || {});
+            if (failed.length) {
+                console.error('Analysis errors:', data.errors);
+                showError(`Some analyses failed: ${failed.join(', ')}`);
+            }
+        } catch (err) {
+            showError(err.message || 'An error occurred while analyzing the text');
+            console.error('Analysis error:', err);
+        } finally {
+            setLoading(false);
+        }
     }
 });
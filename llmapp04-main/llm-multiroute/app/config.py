@@ -7,6 +7,8 @@ class Settings:
     OLLAMA_BASE_URL: str = os.getenv("OLLAMA_BASE_URL", "https://ollama.com")
     OLLAMA_TEMPERATURE: float = float(os.getenv("OLLAMA_TEMPERATURE", "0.7"))
     OLLAMA_API_KEY: str = os.getenv("OLLAMA_API_KEY", "")
+    # Send the DTO JSON schemas as Ollama's `format`; disable for backends without structured outputs
+    OLLAMA_STRUCTURED_OUTPUT: bool = os.getenv("OLLAMA_STRUCTURED_OUTPUT", "true").lower() == "true"
 
     # Per-route model assignments (must be available on Ollama cloud)
     OLLAMA_MODEL_CLASSIFY: str = os.getenv("OLLAMA_MODEL_CLASSIFY", "gemma3:4b")
@@ -14,5 +16,152 @@ class Settings:
     OLLAMA_MODEL_SUMMARIZE: str = os.getenv("OLLAMA_MODEL_SUMMARIZE", "ministral-3:8b")
     OLLAMA_MODEL_INTENT: str = os.getenv("OLLAMA_MODEL_INTENT", "gemma3:12b")
 
+    # Optional JSON file of input-size routing rules, re-read when it changes
+    # (format: routing_rules.example.json)
+    ROUTING_RULES_PATH: str = os.getenv("ROUTING_RULES_PATH", "")
+    ROUTING_RULES_RELOAD_SECONDS: float = float(os.getenv("ROUTING_RULES_RELOAD_SECONDS", "5"))
+
+    # Optional per-route fallback models, used while the primary model's circuit is open
+    OLLAMA_FALLBACK_MODEL_CLASSIFY: str = os.getenv("OLLAMA_FALLBACK_MODEL_CLASSIFY", "")
+    OLLAMA_FALLBACK_MODEL_SENTIMENT: str = os.getenv("OLLAMA_FALLBACK_MODEL_SENTIMENT", "")
+    OLLAMA_FALLBACK_MODEL_SUMMARIZE: str = os.getenv("OLLAMA_FALLBACK_MODEL_SUMMARIZE", "")
+    OLLAMA_FALLBACK_MODEL_INTENT: str = os.getenv("OLLAMA_FALLBACK_MODEL_INTENT", "")
+
+    # Generation caps: without structured output, stream and stop reading once the JSON
+    # object is complete; limit output tokens per task
+    OLLAMA_EARLY_STOP: bool = os.getenv("OLLAMA_EARLY_STOP", "true").lower() == "true"
+    OLLAMA_NUM_PREDICT_CLASSIFY: int = int(os.getenv("OLLAMA_NUM_PREDICT_CLASSIFY", "256"))
+    OLLAMA_NUM_PREDICT_SENTIMENT: int = int(os.getenv("OLLAMA_NUM_PREDICT_SENTIMENT", "256"))
+    OLLAMA_NUM_PREDICT_SUMMARIZE: int = int(os.getenv("OLLAMA_NUM_PREDICT_SUMMARIZE", "1024"))
+    OLLAMA_NUM_PREDICT_INTENT: int = int(os.getenv("OLLAMA_NUM_PREDICT_INTENT", "256"))
+
+    # Extra Ollama hosts as comma-separated base URLs (defaults to OLLAMA_BASE_URL alone). Each
+    # model is kept on OLLAMA_HOSTS_PER_MODEL of them; a host is skipped for the cooldown after
+    # the given number of consecutive failures
+    OLLAMA_HOSTS: str = os.getenv("OLLAMA_HOSTS", "")
+    OLLAMA_HOSTS_PER_MODEL: int = int(os.getenv("OLLAMA_HOSTS_PER_MODEL", "2"))
+    OLLAMA_HOST_FAILURE_THRESHOLD: int = int(os.getenv("OLLAMA_HOST_FAILURE_THRESHOLD", "3"))
+    OLLAMA_HOST_COOLDOWN_SECONDS: float = float(os.getenv("OLLAMA_HOST_COOLDOWN_SECONDS", "30"))
+
+    # Cascade: run classify/sentiment/intent on a cheap model first and re-run on the routed
+    # model when parsing fails or confidence is below the threshold
+    CASCADE_ENABLED: bool = os.getenv("CASCADE_ENABLED", "false").lower() == "true"
+    CASCADE_CONFIDENCE_THRESHOLD: float = float(os.getenv("CASCADE_CONFIDENCE_THRESHOLD", "0.7"))
+    CASCADE_MODEL_CLASSIFY: str = os.getenv("CASCADE_MODEL_CLASSIFY", "ministral-3:3b")
+    CASCADE_MODEL_SENTIMENT: str = os.getenv("CASCADE_MODEL_SENTIMENT", "")
+    CASCADE_MODEL_INTENT: str = os.getenv("CASCADE_MODEL_INTENT", "ministral-3:3b")
+
+    # Circuit breaker per (host, model): opens on failure or slow-call rate over the last
+    # BREAKER_WINDOW calls, then lets probes through after BREAKER_OPEN_SECONDS
+    BREAKER_ENABLED: bool = os.getenv("BREAKER_ENABLED", "true").lower() == "true"
+    BREAKER_WINDOW: int = int(os.getenv("BREAKER_WINDOW", "20"))
+    BREAKER_MIN_CALLS: int = int(os.getenv("BREAKER_MIN_CALLS", "5"))
+    BREAKER_FAILURE_RATE: float = float(os.getenv("BREAKER_FAILURE_RATE", "0.5"))
+    BREAKER_SLOW_CALL_SECONDS: float = float(os.getenv("BREAKER_SLOW_CALL_SECONDS", "30"))
+    BREAKER_SLOW_CALL_RATE: float = float(os.getenv("BREAKER_SLOW_CALL_RATE", "0.8"))
+    BREAKER_OPEN_SECONDS: float = float(os.getenv("BREAKER_OPEN_SECONDS", "30"))
+    BREAKER_HALF_OPEN_PROBES: int = int(os.getenv("BREAKER_HALF_OPEN_PROBES", "1"))
+
+    # Upstream connection pool; HTTP/2 needs a TLS endpoint that negotiates it (e.g. a proxy
+    # in front of Ollama) and falls back to HTTP/1.1 otherwise
+    OLLAMA_MAX_CONNECTIONS: int = int(os.getenv("OLLAMA_MAX_CONNECTIONS", "100"))
+    OLLAMA_MAX_KEEPALIVE_CONNECTIONS: int = int(os.getenv("OLLAMA_MAX_KEEPALIVE_CONNECTIONS", "20"))
+    OLLAMA_KEEPALIVE_EXPIRY_SECONDS: float = float(os.getenv("OLLAMA_KEEPALIVE_EXPIRY_SECONDS", "30"))
+    OLLAMA_HTTP2: bool = os.getenv("OLLAMA_HTTP2", "false").lower() == "true"
+
+    # Upstream timeouts in seconds; the read timeout is per task since summaries take longer
+    OLLAMA_CONNECT_TIMEOUT: float = float(os.getenv("OLLAMA_CONNECT_TIMEOUT", "5"))
+    OLLAMA_WRITE_TIMEOUT: float = float(os.getenv("OLLAMA_WRITE_TIMEOUT", "10"))
+    OLLAMA_POOL_TIMEOUT: float = float(os.getenv("OLLAMA_POOL_TIMEOUT", "10"))
+    OLLAMA_READ_TIMEOUT: float = float(os.getenv("OLLAMA_READ_TIMEOUT", "120"))
+    OLLAMA_READ_TIMEOUT_CLASSIFY: float = float(os.getenv("OLLAMA_READ_TIMEOUT_CLASSIFY", "60"))
+    OLLAMA_READ_TIMEOUT_SENTIMENT: float = float(os.getenv("OLLAMA_READ_TIMEOUT_SENTIMENT", "60"))
+    OLLAMA_READ_TIMEOUT_SUMMARIZE: float = float(os.getenv("OLLAMA_READ_TIMEOUT_SUMMARIZE", "180"))
+    OLLAMA_READ_TIMEOUT_INTENT: float = float(os.getenv("OLLAMA_READ_TIMEOUT_INTENT", "60"))
+
+    # Ask for all tasks routed to the same model in one prompt on /api/ai/analyze
+    MULTI_TASK_PROMPT_ENABLED: bool = os.getenv("MULTI_TASK_PROMPT_ENABLED", "true").lower() == "true"
+
+    # Map-reduce summarization: texts longer than SUMMARIZE_CHUNK_TOKENS (0 disables) are
+    # split on paragraph/sentence boundaries, up to SUMMARIZE_CHUNK_CONCURRENCY chunks are
+    # summarized at once, and the chunk summaries are merged in at most
+    # SUMMARIZE_MAX_REDUCE_DEPTH levels of reduce prompts
+    SUMMARIZE_CHUNK_TOKENS: int = int(os.getenv("SUMMARIZE_CHUNK_TOKENS", "2000"))
+    SUMMARIZE_CHUNK_CONCURRENCY: int = int(os.getenv("SUMMARIZE_CHUNK_CONCURRENCY", "4"))
+    SUMMARIZE_MAX_REDUCE_DEPTH: int = int(os.getenv("SUMMARIZE_MAX_REDUCE_DEPTH", "2"))
+
+    # Micro-batching: concurrent classify/sentiment requests for short texts (up to
+    # MICRO_BATCH_MAX_TEXT_TOKENS) that go to the same model are gathered for up to
+    # MICRO_BATCH_MAX_WAIT_SECONDS and sent as one numbered multi-item prompt
+    MICRO_BATCH_ENABLED: bool = os.getenv("MICRO_BATCH_ENABLED", "false").lower() == "true"
+    MICRO_BATCH_MAX_SIZE: int = int(os.getenv("MICRO_BATCH_MAX_SIZE", "8"))
+    MICRO_BATCH_MAX_WAIT_SECONDS: float = float(os.getenv("MICRO_BATCH_MAX_WAIT_SECONDS", "0.01"))
+    MICRO_BATCH_MAX_TEXT_TOKENS: int = int(os.getenv("MICRO_BATCH_MAX_TEXT_TOKENS", "256"))
+
+    # Upstream retries: exponential backoff with jitter, limited by a shared budget
+    RETRY_MAX_ATTEMPTS: int = int(os.getenv("RETRY_MAX_ATTEMPTS", "3"))
+    RETRY_BASE_DELAY_SECONDS: float = float(os.getenv("RETRY_BASE_DELAY_SECONDS", "0.25"))
+    RETRY_MAX_DELAY_SECONDS: float = float(os.getenv("RETRY_MAX_DELAY_SECONDS", "4"))
+    RETRY_BUDGET_RATIO: float = float(os.getenv("RETRY_BUDGET_RATIO", "0.2"))
+    RETRY_BUDGET_MAX_TOKENS: float = float(os.getenv("RETRY_BUDGET_MAX_TOKENS", "10"))
+    RETRY_REPAIR_PROMPT_ENABLED: bool = os.getenv("RETRY_REPAIR_PROMPT_ENABLED", "true").lower() == "true"
+
+    # Per-model concurrency bulkheads: calls beyond the limit wait in a bounded queue and are
+    # rejected with 429 (queue full) or 503 (waited too long). BULKHEAD_MODEL_LIMITS overrides
+    # the limit per model as "model=limit,..."; adaptive limits follow AIMD on latency
+    BULKHEAD_ENABLED: bool = os.getenv("BULKHEAD_ENABLED", "true").lower() == "true"
+    BULKHEAD_MAX_CONCURRENCY: int = int(os.getenv("BULKHEAD_MAX_CONCURRENCY", "8"))
+    BULKHEAD_MODEL_LIMITS: str = os.getenv("BULKHEAD_MODEL_LIMITS", "")
+    BULKHEAD_MAX_QUEUE: int = int(os.getenv("BULKHEAD_MAX_QUEUE", "32"))
+    BULKHEAD_QUEUE_TIMEOUT_SECONDS: float = float(os.getenv("BULKHEAD_QUEUE_TIMEOUT_SECONDS", "30"))
+    BULKHEAD_ADAPTIVE: bool = os.getenv("BULKHEAD_ADAPTIVE", "false").lower() == "true"
+    BULKHEAD_MIN_CONCURRENCY: int = int(os.getenv("BULKHEAD_MIN_CONCURRENCY", "1"))
+    BULKHEAD_MAX_ADAPTIVE_CONCURRENCY: int = int(os.getenv("BULKHEAD_MAX_ADAPTIVE_CONCURRENCY", "32"))
+    BULKHEAD_LATENCY_TOLERANCE: float = float(os.getenv("BULKHEAD_LATENCY_TOLERANCE", "2.0"))
+
+    # Token-aware admission: calls to a model are admitted against its throughput in
+    # tokens/sec (TOKEN_CAPACITY_MODELS overrides per model as "model=tokens,..."). A call
+    # costs its expected output tokens plus its prompt tokens times TOKEN_PREFILL_WEIGHT;
+    # with learning on, Ollama's reported counts and durations refine all three figures
+    TOKEN_SCHEDULER_ENABLED: bool = os.getenv("TOKEN_SCHEDULER_ENABLED", "false").lower() == "true"
+    TOKEN_CAPACITY_PER_SECOND: float = float(os.getenv("TOKEN_CAPACITY_PER_SECOND", "200"))
+    TOKEN_CAPACITY_MODELS: str = os.getenv("TOKEN_CAPACITY_MODELS", "")
+    TOKEN_BURST_SECONDS: float = float(os.getenv("TOKEN_BURST_SECONDS", "5"))
+    TOKEN_MAX_WAIT_SECONDS: float = float(os.getenv("TOKEN_MAX_WAIT_SECONDS", "30"))
+    TOKEN_PREFILL_WEIGHT: float = float(os.getenv("TOKEN_PREFILL_WEIGHT", "0.1"))
+    TOKEN_CAPACITY_LEARNING: bool = os.getenv("TOKEN_CAPACITY_LEARNING", "true").lower() == "true"
+
+    # Priority classes for queued calls: "class=weight,..." shares of a model's bulkhead queue,
+    # weighted fairly across classes, tenants and tasks. Requests pick a class with the
+    # X-Priority header; PRIORITY_API_KEYS ("key=tenant:class,...") pins X-API-Key holders
+    PRIORITY_CLASSES: str = os.getenv("PRIORITY_CLASSES", "interactive=8,standard=4,batch=1")
+    PRIORITY_DEFAULT_CLASS: str = os.getenv("PRIORITY_DEFAULT_CLASS", "standard")
+    PRIORITY_API_KEYS: str = os.getenv("PRIORITY_API_KEYS", "")
+
+    # Hedged requests: race a second copy on another replica when the first is slow. A delay
+    # of 0 hedges after the model's observed p95 once HEDGE_MIN_SAMPLES calls are known
+    HEDGE_ENABLED: bool = os.getenv("HEDGE_ENABLED", "false").lower() == "true"
+    HEDGE_DELAY_SECONDS: float = float(os.getenv("HEDGE_DELAY_SECONDS", "0"))
+    HEDGE_MIN_SAMPLES: int = int(os.getenv("HEDGE_MIN_SAMPLES", "20"))
+    HEDGE_BUDGET_RATIO: float = float(os.getenv("HEDGE_BUDGET_RATIO", "0.05"))
+    HEDGE_BUDGET_MAX_TOKENS: float = float(os.getenv("HEDGE_BUDGET_MAX_TOKENS", "5"))
+
+    # Batch endpoint limits
+    BATCH_MAX_ITEMS: int = int(os.getenv("BATCH_MAX_ITEMS", "1000"))
+    BATCH_CONCURRENCY: int = int(os.getenv("BATCH_CONCURRENCY", "8"))
+
+    # In-memory response cache (0 entries disables it)
+    RESPONSE_CACHE_MAX_ENTRIES: int = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "1024"))
+    RESPONSE_CACHE_TTL_SECONDS: float = float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "3600"))
+
+    # Persistent SQLite result cache (empty path disables it)
+    PERSISTENT_CACHE_PATH: str = os.getenv("PERSISTENT_CACHE_PATH", "")
+    PERSISTENT_CACHE_MAX_ENTRIES: int = int(os.getenv("PERSISTENT_CACHE_MAX_ENTRIES", "100000"))
+    PERSISTENT_CACHE_TTL_SECONDS: float = float(os.getenv("PERSISTENT_CACHE_TTL_SECONDS", "604800"))
+    # Expired and excess rows are pruned once per this many writes
+    PERSISTENT_CACHE_PRUNE_EVERY: int = int(os.getenv("PERSISTENT_CACHE_PRUNE_EVERY", "100"))
+    # A hit refreshes a row's LRU access time at most once per this many seconds
+    PERSISTENT_CACHE_TOUCH_INTERVAL_SECONDS: float = float(os.getenv("PERSISTENT_CACHE_TOUCH_INTERVAL_SECONDS", "60"))
+
 
 settings = Settings()
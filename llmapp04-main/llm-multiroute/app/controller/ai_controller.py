@@ -1,62 +1,211 @@
-from fastapi import APIRouter
+import json
+from typing import Annotated, Any, AsyncIterator, Optional
 
+from fastapi import APIRouter, Depends, Header
+from fastapi.responses import StreamingResponse
+
+from app.config import settings
+from app.dto.analyze_request import AnalyzeRequest
+from app.dto.analyze_response import AnalyzeResponse
+from app.dto.batch_request import BatchRequest
+from app.dto.batch_response import BatchResponse
+from app.dto.cache_stats_response import CacheStatsResponse
 from app.dto.classification_response import ClassificationResponse
 from app.dto.intent_response import IntentResponse
 from app.dto.sentiment_response import SentimentResponse
 from app.dto.summary_response import SummaryResponse
 from app.dto.text_request import TextRequest
-from app.router.model_router import model_router
-from app.service.ai_service import AIService
+from app.router.backend_pool import backend_pool
+from app.router.model_router import TaskType, model_router
+from app.service.ai_service import AsyncAIService
+from app.service.persistent_cache import PersistentResultCache
+from app.service.priority import priority_classes, request_priority
+from app.service.response_cache import ResponseCache
+
+
+async def set_request_priority(
+    x_priority: Annotated[Optional[str], Header(description="Priority class, e.g. interactive or batch")] = None,
+    x_api_key: Annotated[Optional[str], Header(description="API key; assigned keys fix the tenant and class")] = None,
+) -> None:
+    # Async so the value is set in the task that serves the request, not a worker thread
+    request_priority.set(priority_classes.resolve(x_priority, x_api_key))
+
 
 router = APIRouter(prefix="/api/ai", tags=["AI Text Analysis"])
 
-ai_service = AIService()
+# Only routes that call a model are queued by priority; read-only endpoints ignore X-Priority
+_prioritized = [Depends(set_request_priority)]
+
+response_cache = ResponseCache(
+    max_entries=settings.RESPONSE_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.RESPONSE_CACHE_TTL_SECONDS,
+)
+persistent_cache = (
+    PersistentResultCache(
+        path=settings.PERSISTENT_CACHE_PATH,
+        max_entries=settings.PERSISTENT_CACHE_MAX_ENTRIES,
+        ttl_seconds=settings.PERSISTENT_CACHE_TTL_SECONDS,
+        prune_every=settings.PERSISTENT_CACHE_PRUNE_EVERY,
+        touch_interval=settings.PERSISTENT_CACHE_TOUCH_INTERVAL_SECONDS,
+    )
+    if settings.PERSISTENT_CACHE_PATH
+    else None
+)
+ai_service = AsyncAIService(cache=response_cache, persistent_cache=persistent_cache)
 
 
 @router.post(
     "/classify",
+    dependencies=_prioritized,
     response_model=ClassificationResponse,
     summary="Classify Text",
     description="Analyzes text and returns classification labels, tags, and primary category",
 )
-def classify_text(request: TextRequest) -> ClassificationResponse:
-    return ai_service.classify_text(request.text)
+async def classify_text(request: TextRequest) -> ClassificationResponse:
+    return await ai_service.classify_text(request.text)
 
 
 @router.post(
     "/sentiment",
+    dependencies=_prioritized,
     response_model=SentimentResponse,
     summary="Analyze Sentiment",
     description="Analyzes text sentiment (positive, negative, neutral) and detects specific emotions",
 )
-def analyze_sentiment(request: TextRequest) -> SentimentResponse:
-    return ai_service.analyze_sentiment(request.text)
+async def analyze_sentiment(request: TextRequest) -> SentimentResponse:
+    return await ai_service.analyze_sentiment(request.text)
 
 
 @router.post(
     "/summarize",
+    dependencies=_prioritized,
     response_model=SummaryResponse,
     summary="Summarize Text",
     description="Generates a concise summary with key points from the provided text",
 )
-def summarize_text(request: TextRequest) -> SummaryResponse:
-    return ai_service.summarize_text(request.text)
+async def summarize_text(request: TextRequest) -> SummaryResponse:
+    return await ai_service.summarize_text(request.text)
 
 
 @router.post(
     "/intent",
+    dependencies=_prioritized,
     response_model=IntentResponse,
     summary="Detect Intent",
     description="Identifies the intent and purpose behind the text (question, request, statement, command)",
 )
-def detect_intent(request: TextRequest) -> IntentResponse:
-    return ai_service.detect_intent(request.text)
+async def detect_intent(request: TextRequest) -> IntentResponse:
+    return await ai_service.detect_intent(request.text)
+
+
+@router.post(
+    "/analyze",
+    dependencies=_prioritized,
+    response_model=AnalyzeResponse,
+    summary="Run Several Analyses",
+    description=(
+        "Runs the requested analyses (all four by default) concurrently, each on its routed model, "
+        "and returns every result plus per-task errors"
+    ),
+)
+async def analyze_text(request: AnalyzeRequest) -> AnalyzeResponse:
+    return await ai_service.analyze_text(request.text, request.tasks or list(TaskType))
+
+
+@router.post(
+    "/{task}/batch",
+    dependencies=_prioritized,
+    response_model=BatchResponse,
+    summary="Batch Analysis",
+    description=(
+        "Runs one analysis over a list of texts with bounded concurrency. Identical texts are analyzed once; "
+        "results come back in input order with a per-item result or error"
+    ),
+)
+async def run_batch(task: TaskType, request: BatchRequest) -> BatchResponse:
+    return await ai_service.run_batch(task, request.texts)
+
+
+def _sse(event: str, data: str) -> str:
+    return f"event: {event}\ndata: {data}\n\n"
+
+
+async def _stream_events(task: TaskType, text: str) -> AsyncIterator[str]:
+    try:
+        async for event, payload in ai_service.stream_task(task, text):
+            if event == "token":
+                yield _sse("token", json.dumps({"content": payload}))
+            else:
+                yield _sse("result", payload.model_dump_json())
+    except Exception as e:
+        yield _sse("error", json.dumps({"error": str(e)}))
+
+
+@router.post(
+    "/{task}/stream",
+    dependencies=_prioritized,
+    summary="Stream Analysis",
+    description=(
+        "Runs one analysis and relays the model output as Server-Sent Events: `token` events carry "
+        "generated text, a final `result` event carries the parsed response (or an `error` event on failure)"
+    ),
+    response_class=StreamingResponse,
+)
+async def stream_task(task: TaskType, request: TextRequest) -> StreamingResponse:
+    return StreamingResponse(
+        _stream_events(task, request.text),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 @router.get(
     "/routes",
     summary="Get Route Configuration",
-    description="Returns the current model routing table showing which model handles each task type",
+    description=(
+        "Returns the current model routing table showing which model handles each task type, "
+        "plus configured fallback models under `fallbacks`, cheap first-tier models under `cascades`, "
+        "input-size routing rules with their hit counts under `rules` and, under `backends`, health, "
+        "queue depth, latency, placed models and circuit breaker state for each Ollama host"
+    ),
+)
+def get_routes() -> dict[str, Any]:
+    return {
+        **model_router.get_routes(),
+        "fallbacks": model_router.get_fallbacks(),
+        "cascades": model_router.get_cascades(),
+        "rules": model_router.rules.stats() if model_router.rules is not None else None,
+        "backends": backend_pool.stats(),
+    }
+
+
+@router.get(
+    "/cache",
+    response_model=CacheStatsResponse,
+    summary="Get Cache Statistics",
+    description="Returns response cache size, limits and hit/miss/eviction counters",
+)
+def get_cache_stats() -> CacheStatsResponse:
+    persistent = persistent_cache.stats() if persistent_cache is not None else None
+    return CacheStatsResponse(**response_cache.stats(), persistent=persistent)
+
+
+@router.delete(
+    "/cache",
+    summary="Flush Cache",
+    description="Removes every cached response, in memory and on disk, and returns how many entries were flushed",
+)
+def flush_cache() -> dict[str, int]:
+    flushed = {"flushed": response_cache.clear()}
+    if persistent_cache is not None:
+        flushed["flushedPersistent"] = persistent_cache.clear()
+    return flushed
+
+
+@router.get(
+    "/metrics",
+    summary="Get Service Metrics",
+    description="Returns AI service counters such as the number of requests coalesced into an in-flight call",
 )
-def get_routes() -> dict[str, str]:
-    return model_router.get_routes()
+def get_metrics() -> dict:
+    return ai_service.metrics()
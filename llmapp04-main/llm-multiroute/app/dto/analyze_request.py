@@ -0,0 +1,20 @@
+from typing import Optional
+
+from pydantic import BaseModel, Field
+
+from app.router.model_router import TaskType
+
+
+class AnalyzeRequest(BaseModel):
+    """Request body for running several analyses on one text."""
+
+    text: str = Field(
+        ...,
+        description="Text to be analyzed",
+        json_schema_extra={"example": "I love this product! The quality is outstanding."},
+    )
+    tasks: Optional[list[TaskType]] = Field(
+        None,
+        description="Analyses to run; all four when omitted",
+        json_schema_extra={"example": ["sentiment", "intent"]},
+    )
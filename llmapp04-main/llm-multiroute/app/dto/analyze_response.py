@@ -0,0 +1,22 @@
+from typing import Optional
+
+from pydantic import BaseModel, Field
+
+from app.dto.classification_response import ClassificationResponse
+from app.dto.intent_response import IntentResponse
+from app.dto.sentiment_response import SentimentResponse
+from app.dto.summary_response import SummaryResponse
+
+
+class AnalyzeResponse(BaseModel):
+    """Combined result of several analyses; a task is null when it was not requested or failed."""
+
+    classify: Optional[ClassificationResponse] = Field(None, description="Classification result")
+    sentiment: Optional[SentimentResponse] = Field(None, description="Sentiment analysis result")
+    summarize: Optional[SummaryResponse] = Field(None, description="Summarization result")
+    intent: Optional[IntentResponse] = Field(None, description="Intent detection result")
+    errors: dict[str, str] = Field(
+        default_factory=dict,
+        description="Error message per failed task",
+        json_schema_extra={"example": {"summarize": "Failed to parse AI response as JSON"}},
+    )
@@ -0,0 +1,15 @@
+from pydantic import BaseModel, Field
+
+from app.config import settings
+
+
+class BatchRequest(BaseModel):
+    """Request body containing many texts to run through one analysis."""
+
+    texts: list[str] = Field(
+        ...,
+        min_length=1,
+        max_length=settings.BATCH_MAX_ITEMS,
+        description="Texts to be analyzed; identical texts are only analyzed once",
+        json_schema_extra={"example": ["Great product!", "Terrible support.", "Great product!"]},
+    )
@@ -0,0 +1,40 @@
+from typing import Optional, Union
+
+from pydantic import BaseModel, Field
+
+from app.dto.classification_response import ClassificationResponse
+from app.dto.intent_response import IntentResponse
+from app.dto.sentiment_response import SentimentResponse
+from app.dto.summary_response import SummaryResponse
+
+
+class BatchItemResult(BaseModel):
+    """Outcome for one text of a batch: either a result or an error."""
+
+    index: int = Field(
+        ...,
+        description="Position of the text in the request",
+        json_schema_extra={"example": 0},
+    )
+    result: Optional[Union[ClassificationResponse, SentimentResponse, SummaryResponse, IntentResponse]] = Field(
+        None,
+        description="Analysis result, or null when the item failed",
+    )
+    error: Optional[str] = Field(
+        None,
+        description="Error message when the item failed",
+        json_schema_extra={"example": "Failed to parse AI response as JSON"},
+    )
+
+
+class BatchResponse(BaseModel):
+    """Batch analysis results in request order."""
+
+    results: list[BatchItemResult] = Field(..., description="One entry per input text, in input order")
+    uniqueTexts: int = Field(
+        ...,
+        description="Number of distinct texts that were analyzed",
+        json_schema_extra={"example": 2},
+    )
+    succeeded: int = Field(..., description="Number of items with a result", json_schema_extra={"example": 3})
+    failed: int = Field(..., description="Number of items with an error", json_schema_extra={"example": 0})
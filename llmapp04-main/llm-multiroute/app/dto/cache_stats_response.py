@@ -0,0 +1,53 @@
+from typing import Any, Optional
+
+from pydantic import BaseModel, Field
+
+
+class CacheStatsResponse(BaseModel):
+    """Response cache occupancy and hit/miss counters."""
+
+    enabled: bool = Field(
+        ...,
+        description="Whether the response cache is active",
+        json_schema_extra={"example": True},
+    )
+    size: int = Field(
+        ...,
+        description="Number of cached responses",
+        json_schema_extra={"example": 42},
+    )
+    maxEntries: int = Field(
+        ...,
+        description="Maximum number of cached responses",
+        json_schema_extra={"example": 1024},
+    )
+    ttlSeconds: float = Field(
+        ...,
+        description="Time-to-live of a cached response in seconds",
+        json_schema_extra={"example": 3600},
+    )
+    hits: int = Field(
+        ...,
+        description="Lookups answered from the cache",
+        json_schema_extra={"example": 120},
+    )
+    misses: int = Field(
+        ...,
+        description="Lookups that required a model call",
+        json_schema_extra={"example": 40},
+    )
+    evictions: int = Field(
+        ...,
+        description="Entries dropped to stay within maxEntries",
+        json_schema_extra={"example": 0},
+    )
+    expirations: int = Field(
+        ...,
+        description="Entries dropped because their TTL elapsed",
+        json_schema_extra={"example": 3},
+    )
+    persistent: Optional[dict[str, Any]] = Field(
+        None,
+        description="Statistics of the on-disk result cache, or null when it is disabled",
+        json_schema_extra={"example": {"path": "/data/result-cache.sqlite3", "size": 5000, "hits": 310}},
+    )
@@ -1,3 +1,5 @@
+from typing import Optional
+
 from pydantic import BaseModel, Field
 
 
@@ -19,3 +21,13 @@ class SummaryResponse(BaseModel):
         description="Word count of the summary",
         json_schema_extra={"example": 50},
     )
+    chunks: Optional[int] = Field(
+        None,
+        description="Number of chunks a long text was summarized in; absent when it fit one prompt",
+        json_schema_extra={"example": 6},
+    )
+    reusedChunks: Optional[int] = Field(
+        None,
+        description="Chunks whose summary was reused from the cache instead of generated again",
+        json_schema_extra={"example": 5},
+    )
@@ -1,8 +1,30 @@
-from fastapi import FastAPI
+import math
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 
 from app.config import settings
+from app.controller.ai_controller import ai_service, persistent_cache
 from app.controller.ai_controller import router as ai_router
+from app.router.circuit_breaker import CircuitOpenError
+from app.service.bulkhead import BulkheadFullError
+from app.service.http_client import build_async_client
+from app.service.priority import UnknownPriorityError
+from app.service.token_scheduler import CapacityExceededError
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # One pooled client for the process; closed when the server shuts down.
+    async with build_async_client() as client:
+        ai_service.http_client = client
+        yield
+        ai_service.http_client = None
+    if persistent_cache is not None:
+        persistent_cache.close()
+
 
 app = FastAPI(
     title="Multi-Route LLM API",
@@ -21,6 +43,7 @@ app = FastAPI(
     servers=[
         {"url": f"http://localhost:{settings.SERVER_PORT}", "description": "Local Development Server"}
     ],
+    lifespan=lifespan,
 )
 
 app.add_middleware(
@@ -33,6 +56,42 @@ app.add_middleware(
 
 app.include_router(ai_router)
 
+
+@app.exception_handler(CircuitOpenError)
+async def circuit_open_handler(request: Request, exc: CircuitOpenError) -> JSONResponse:
+    # Fail fast while the model is unavailable instead of waiting out the upstream timeout
+    return JSONResponse(
+        status_code=503,
+        content={"error": str(exc)},
+        headers={"Retry-After": str(max(1, math.ceil(exc.retry_after)))},
+    )
+
+
+@app.exception_handler(BulkheadFullError)
+async def bulkhead_full_handler(request: Request, exc: BulkheadFullError) -> JSONResponse:
+    # 429 when the model's queue is full, 503 when the request waited too long for a slot
+    return JSONResponse(
+        status_code=exc.status_code,
+        content={"error": str(exc)},
+        headers={"Retry-After": str(max(1, math.ceil(exc.retry_after)))},
+    )
+
+
+@app.exception_handler(CapacityExceededError)
+async def capacity_exceeded_handler(request: Request, exc: CapacityExceededError) -> JSONResponse:
+    # The model's token throughput is booked further ahead than a caller should wait
+    return JSONResponse(
+        status_code=429,
+        content={"error": str(exc)},
+        headers={"Retry-After": str(max(1, math.ceil(exc.retry_after)))},
+    )
+
+
+@app.exception_handler(UnknownPriorityError)
+async def unknown_priority_handler(request: Request, exc: UnknownPriorityError) -> JSONResponse:
+    return JSONResponse(status_code=400, content={"error": str(exc)})
+
+
 if __name__ == "__main__":
     import uvicorn
 
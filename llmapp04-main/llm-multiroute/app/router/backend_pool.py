@@ -0,0 +1,211 @@
+import hashlib
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Collection, Iterator, Optional
+
+from app.config import settings
+from app.router.circuit_breaker import CircuitBreaker, CircuitOpenError
+from app.router.outcome import track_outcome
+
+
+class Backend:
+    """One Ollama host and its live load and health counters."""
+
+    def __init__(self, url: str):
+        self.url = url.rstrip("/")
+        self.outstanding = 0
+        self.requests = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.unhealthy_until = 0.0
+        self.latency_ewma: Optional[float] = None
+
+    def is_healthy(self, now: float) -> bool:
+        return now >= self.unhealthy_until
+
+
+class BackendPool:
+    """Spreads requests over several Ollama hosts while keeping each model on a few of them.
+
+    Every model is placed on ``hosts_per_model`` preferred hosts chosen by rendezvous
+    hashing, so placement is stable and only the models of an added or removed host
+    move. Within that subset a request goes to the healthy host with the fewest
+    outstanding requests. A host is skipped for ``cooldown_seconds`` after
+    ``failure_threshold`` consecutive failures; when all preferred hosts are down the
+    request spills over to any healthy host. With a ``breaker_factory``, each
+    (host, model) pair also gets a circuit breaker, so a model that hangs on one host
+    is avoided there; when no host admits the model ``CircuitOpenError`` is raised
+    straight away.
+    """
+
+    # Weight of the newest sample in the latency moving average
+    LATENCY_ALPHA = 0.2
+
+    def __init__(
+        self,
+        urls: list[str],
+        hosts_per_model: int = 2,
+        failure_threshold: int = 3,
+        cooldown_seconds: float = 30.0,
+        breaker_factory: Optional[Callable[[], CircuitBreaker]] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        if not urls:
+            raise ValueError("BackendPool needs at least one host")
+        self.backends = [Backend(url) for url in dict.fromkeys(urls)]
+        self.hosts_per_model = max(1, hosts_per_model)
+        self.failure_threshold = failure_threshold
+        self.cooldown_seconds = cooldown_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._placements: dict[str, list[Backend]] = {}
+        self._breaker_factory = breaker_factory
+        self._breakers: dict[tuple[str, str], CircuitBreaker] = {}
+
+    @classmethod
+    def from_settings(cls) -> "BackendPool":
+        urls = [url.strip() for url in settings.OLLAMA_HOSTS.split(",") if url.strip()]
+        return cls(
+            urls or [settings.OLLAMA_BASE_URL],
+            hosts_per_model=settings.OLLAMA_HOSTS_PER_MODEL,
+            failure_threshold=settings.OLLAMA_HOST_FAILURE_THRESHOLD,
+            cooldown_seconds=settings.OLLAMA_HOST_COOLDOWN_SECONDS,
+            breaker_factory=_breaker_from_settings if settings.BREAKER_ENABLED else None,
+        )
+
+    def preferred(self, model: str) -> list[Backend]:
+        """The hosts ``model`` is placed on, highest rendezvous score first."""
+        placement = self._placements.get(model)
+        if placement is None:
+            ranked = sorted(
+                self.backends,
+                key=lambda b: hashlib.sha256(f"{model}@{b.url}".encode()).digest(),
+                reverse=True,
+            )
+            placement = self._placements[model] = ranked[: self.hosts_per_model]
+        return placement
+
+    def _breaker(self, backend: Backend, model: str) -> Optional[CircuitBreaker]:
+        if self._breaker_factory is None:
+            return None
+        breaker = self._breakers.get((backend.url, model))
+        if breaker is None:
+            breaker = self._breakers[(backend.url, model)] = self._breaker_factory()
+        return breaker
+
+    def _admits(self, backend: Backend, model: str) -> bool:
+        breaker = self._breaker(backend, model)
+        return breaker is None or breaker.can_call()
+
+    def available(self, model: str) -> bool:
+        """Whether any host would currently accept a call for ``model``."""
+        with self._lock:
+            return any(self._admits(b, model) for b in self.backends)
+
+    def has_spare(self, model: str, tried: Collection[str]) -> bool:
+        """Whether another preferred host outside ``tried`` could take a copy of the request."""
+        with self._lock:
+            now = self._clock()
+            return any(
+                b.url not in tried and b.is_healthy(now) and self._admits(b, model) for b in self.preferred(model)
+            )
+
+    def acquire(self, model: str, tried: Collection[str] = ()) -> Backend:
+        """Lease a host for ``model``, avoiding hosts in ``tried`` when another candidate exists."""
+        with self._lock:
+            now = self._clock()
+            preferred = self.preferred(model)
+            candidates = [b for b in preferred if b.is_healthy(now) and self._admits(b, model)]
+            if not candidates:
+                candidates = [b for b in self.backends if b.is_healthy(now) and self._admits(b, model)]
+            if not candidates:
+                candidates = [b for b in preferred if self._admits(b, model)]
+            if not candidates:
+                retry_after = min(self._breaker(b, model).retry_after() for b in preferred)
+                raise CircuitOpenError(model, retry_after)
+            candidates = [b for b in candidates if b.url not in tried] or candidates
+            # min() keeps placement order on ties, so idle traffic stays on the first preferred host
+            backend = min(candidates, key=lambda b: b.outstanding)
+            breaker = self._breaker(backend, model)
+            if breaker is not None:
+                breaker.acquire()
+            backend.outstanding += 1
+            backend.requests += 1
+            return backend
+
+    def release(self, backend: Backend, model: str, seconds: float, ok: Optional[bool]) -> None:
+        """Return a host; ``ok=None`` frees the slot without recording an outcome."""
+        with self._lock:
+            backend.outstanding -= 1
+            breaker = self._breaker(backend, model)
+            if breaker is not None:
+                if ok is None:
+                    breaker.cancel()
+                else:
+                    breaker.record(ok, seconds)
+            if ok is None:
+                return
+            if ok:
+                backend.consecutive_failures = 0
+                backend.unhealthy_until = 0.0
+                if backend.latency_ewma is None:
+                    backend.latency_ewma = seconds
+                else:
+                    backend.latency_ewma += self.LATENCY_ALPHA * (seconds - backend.latency_ewma)
+                return
+            backend.failures += 1
+            backend.consecutive_failures += 1
+            if backend.consecutive_failures >= self.failure_threshold:
+                backend.unhealthy_until = self._clock() + self.cooldown_seconds
+
+    @contextmanager
+    def lease(self, model: str, tried: Optional[set[str]] = None) -> Iterator[Backend]:
+        """Hold a host for one request; its latency and outcome are recorded on exit.
+
+        The leased host is added to ``tried``, so later attempts that share the set
+        (retries, hedges) go to a different host when one is available.
+        """
+        backend = self.acquire(model, tried or ())
+        if tried is not None:
+            tried.add(backend.url)
+        with track_outcome(lambda seconds, ok: self.release(backend, model, seconds, ok), self._clock):
+            yield backend
+
+    def stats(self) -> list[dict]:
+        with self._lock:
+            now = self._clock()
+            placed: dict[str, list[str]] = {b.url: [] for b in self.backends}
+            for model, placement in self._placements.items():
+                for backend in placement:
+                    placed[backend.url].append(model)
+            return [
+                {
+                    "url": b.url,
+                    "healthy": b.is_healthy(now),
+                    "outstanding": b.outstanding,
+                    "requests": b.requests,
+                    "failures": b.failures,
+                    "avgLatencyMs": None if b.latency_ewma is None else round(b.latency_ewma * 1000, 1),
+                    "models": sorted(placed[b.url]),
+                    "breakers": {
+                        model: breaker.stats() for (url, model), breaker in self._breakers.items() if url == b.url
+                    },
+                }
+                for b in self.backends
+            ]
+
+
+def _breaker_from_settings() -> CircuitBreaker:
+    return CircuitBreaker(
+        window=settings.BREAKER_WINDOW,
+        min_calls=settings.BREAKER_MIN_CALLS,
+        failure_rate=settings.BREAKER_FAILURE_RATE,
+        slow_call_seconds=settings.BREAKER_SLOW_CALL_SECONDS,
+        slow_call_rate=settings.BREAKER_SLOW_CALL_RATE,
+        open_seconds=settings.BREAKER_OPEN_SECONDS,
+        half_open_probes=settings.BREAKER_HALF_OPEN_PROBES,
+    )
+
+
+backend_pool = BackendPool.from_settings()
@@ -0,0 +1,127 @@
+import threading
+import time
+from collections import deque
+from typing import Callable
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling a model whose breakers are all open."""
+
+    def __init__(self, model: str, retry_after: float):
+        super().__init__(f"Circuit open for model {model}; retry in {retry_after:.0f}s")
+        self.model = model
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """Closed/open/half-open breaker over a sliding window of recent calls.
+
+    Opens when, over at least ``min_calls`` of the last ``window`` calls, the failure
+    rate reaches ``failure_rate`` or the share of calls slower than ``slow_call_seconds``
+    reaches ``slow_call_rate``. After ``open_seconds`` it lets ``half_open_probes`` calls
+    through; a successful probe closes it and a failed or slow one opens it again.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        window: int = 20,
+        min_calls: int = 5,
+        failure_rate: float = 0.5,
+        slow_call_seconds: float = 30.0,
+        slow_call_rate: float = 0.8,
+        open_seconds: float = 30.0,
+        half_open_probes: int = 1,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_call_rate = slow_call_rate
+        self.open_seconds = open_seconds
+        self.half_open_probes = half_open_probes
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._calls: deque[tuple[bool, bool]] = deque(maxlen=window)
+        self._state = self.CLOSED
+        self._opened_at = 0.0
+        self._probes = 0
+        self.times_opened = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self) -> str:
+        if self._state == self.OPEN and self._clock() - self._opened_at >= self.open_seconds:
+            self._state = self.HALF_OPEN
+            self._probes = 0
+        return self._state
+
+    def can_call(self) -> bool:
+        """Whether a call would be admitted right now, without reserving a probe slot."""
+        with self._lock:
+            state = self._current_state()
+            return state == self.CLOSED or (state == self.HALF_OPEN and self._probes < self.half_open_probes)
+
+    def acquire(self) -> bool:
+        """Admit a call, taking a probe slot when half-open."""
+        with self._lock:
+            state = self._current_state()
+            if state == self.CLOSED:
+                return True
+            if state == self.HALF_OPEN and self._probes < self.half_open_probes:
+                self._probes += 1
+                return True
+            return False
+
+    def retry_after(self) -> float:
+        with self._lock:
+            if self._current_state() != self.OPEN:
+                return 0.0
+            return max(0.0, self.open_seconds - (self._clock() - self._opened_at))
+
+    def record(self, ok: bool, seconds: float) -> None:
+        slow = seconds >= self.slow_call_seconds
+        with self._lock:
+            if self._current_state() == self.HALF_OPEN:
+                self._probes = max(0, self._probes - 1)
+                if ok and not slow:
+                    self._state = self.CLOSED
+                    self._calls.clear()
+                else:
+                    self._open()
+                return
+            self._calls.append((not ok, slow))
+            if self._state == self.CLOSED and len(self._calls) >= self.min_calls:
+                failures = sum(1 for failed, _ in self._calls if failed) / len(self._calls)
+                slow_calls = sum(1 for _, was_slow in self._calls if was_slow) / len(self._calls)
+                if failures >= self.failure_rate or slow_calls >= self.slow_call_rate:
+                    self._open()
+
+    def cancel(self) -> None:
+        """Give back a probe slot for a call that ended without an outcome."""
+        with self._lock:
+            if self._state == self.HALF_OPEN:
+                self._probes = max(0, self._probes - 1)
+
+    def _open(self) -> None:
+        self._state = self.OPEN
+        self._opened_at = self._clock()
+        self._calls.clear()
+        self.times_opened += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            calls = len(self._calls)
+            return {
+                "state": self._current_state(),
+                "calls": calls,
+                "failureRate": round(sum(1 for f, _ in self._calls if f) / calls, 3) if calls else 0.0,
+                "slowCallRate": round(sum(1 for _, s in self._calls if s) / calls, 3) if calls else 0.0,
+                "timesOpened": self.times_opened,
+            }
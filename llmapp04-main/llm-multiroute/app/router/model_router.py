@@ -1,29 +1,76 @@
-from enum import Enum
+import logging
+from typing import Callable, Iterable, Optional
 
 from app.config import settings
+from app.router.routing_rules import RoutingRules
+from app.router.task_type import TaskType
 
-
-class TaskType(str, Enum):
-    CLASSIFY = "classify"
-    SENTIMENT = "sentiment"
-    SUMMARIZE = "summarize"
-    INTENT = "intent"
+logger = logging.getLogger(__name__)
 
 
 class ModelRouter:
-    def __init__(self):
+    def __init__(self, rules: Optional[RoutingRules] = None):
+        self.rules = rules
         self._route_map: dict[TaskType, str] = {
             TaskType.CLASSIFY: settings.OLLAMA_MODEL_CLASSIFY,
             TaskType.SENTIMENT: settings.OLLAMA_MODEL_SENTIMENT,
             TaskType.SUMMARIZE: settings.OLLAMA_MODEL_SUMMARIZE,
             TaskType.INTENT: settings.OLLAMA_MODEL_INTENT,
         }
+        self._fallback_map: dict[TaskType, str] = {
+            TaskType.CLASSIFY: settings.OLLAMA_FALLBACK_MODEL_CLASSIFY,
+            TaskType.SENTIMENT: settings.OLLAMA_FALLBACK_MODEL_SENTIMENT,
+            TaskType.SUMMARIZE: settings.OLLAMA_FALLBACK_MODEL_SUMMARIZE,
+            TaskType.INTENT: settings.OLLAMA_FALLBACK_MODEL_INTENT,
+        }
+        # Summaries carry no confidence to escalate on, so they are never cascaded
+        self._cascade_map: dict[TaskType, str] = {
+            TaskType.CLASSIFY: settings.CASCADE_MODEL_CLASSIFY,
+            TaskType.SENTIMENT: settings.CASCADE_MODEL_SENTIMENT,
+            TaskType.INTENT: settings.CASCADE_MODEL_INTENT,
+        }
+
+    def get_model(self, task_type: TaskType, tokens: Optional[int] = None) -> str:
+        """The model for ``task_type``; with an estimated input size, the first matching rule may override it."""
+        model = self._route_map[task_type]
+        if self.rules is None or tokens is None:
+            return model
+        rule = self.rules.match(task_type, tokens)
+        if rule is None:
+            logger.debug("route task=%s tokens=%d rule=<default> model=%s", task_type.value, tokens, model)
+            return model
+        logger.info("route task=%s tokens=%d rule=%s model=%s", task_type.value, tokens, rule.name, rule.model)
+        return rule.model
+
+    def get_cascade_model(self, task_type: TaskType) -> Optional[str]:
+        return self._cascade_map.get(task_type) or None
 
-    def get_model(self, task_type: TaskType) -> str:
-        return self._route_map[task_type]
+    def get_fallback_model(self, task_type: TaskType) -> Optional[str]:
+        return self._fallback_map[task_type] or None
+
+    def group_by_model(
+        self,
+        task_types: Iterable[TaskType],
+        model_for: Optional[Callable[[TaskType], str]] = None,
+    ) -> dict[str, list[TaskType]]:
+        """Group tasks by routed model; tasks sharing a model can be answered by one prompt.
+
+        ``model_for`` overrides how each task's model is chosen (e.g. to apply failover).
+        """
+        model_for = model_for or self.get_model
+        groups: dict[str, list[TaskType]] = {}
+        for task_type in task_types:
+            groups.setdefault(model_for(task_type), []).append(task_type)
+        return groups
 
     def get_routes(self) -> dict[str, str]:
         return {task.value: model for task, model in self._route_map.items()}
 
+    def get_fallbacks(self) -> dict[str, str]:
+        return {task.value: model for task, model in self._fallback_map.items() if model}
+
+    def get_cascades(self) -> dict[str, str]:
+        return {task.value: model for task, model in self._cascade_map.items() if model}
+
 
-model_router = ModelRouter()
+model_router = ModelRouter(RoutingRules.from_settings())
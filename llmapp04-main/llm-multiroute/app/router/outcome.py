@@ -0,0 +1,29 @@
+from contextlib import contextmanager
+from typing import Callable, Iterator, Optional
+
+
+@contextmanager
+def track_outcome(
+    record: Callable[[float, Optional[bool]], None],
+    clock: Callable[[], float],
+    is_failure: Callable[[Exception], bool] = lambda error: True,
+) -> Iterator[None]:
+    """Time the enclosed call and pass ``(seconds, ok)`` to ``record`` when it ends.
+
+    ``ok`` is True on success, False for an exception ``is_failure`` accepts, and None
+    when the call was cancelled or its exception says nothing about the callee.
+    """
+    started = clock()
+    try:
+        yield
+    except GeneratorExit:
+        # A stream closed early once the answer was complete
+        record(clock() - started, True)
+        raise
+    except Exception as error:
+        record(clock() - started, False if is_failure(error) else None)
+        raise
+    except BaseException:
+        record(clock() - started, None)
+        raise
+    record(clock() - started, True)
@@ -0,0 +1,104 @@
+import json
+import logging
+import os
+import threading
+import time
+from collections import Counter
+from typing import Callable, Optional
+
+from pydantic import BaseModel, TypeAdapter
+
+from app.config import settings
+from app.router.task_type import TaskType
+
+logger = logging.getLogger(__name__)
+
+
+class RoutingRule(BaseModel):
+    """Send ``task`` (any task when omitted) to ``model`` when the input size is within bounds."""
+
+    name: str
+    model: str
+    task: Optional[TaskType] = None
+    minTokens: Optional[int] = None
+    maxTokens: Optional[int] = None
+
+    def matches(self, task_type: TaskType, tokens: int) -> bool:
+        if self.task is not None and self.task != task_type:
+            return False
+        if self.minTokens is not None and tokens < self.minTokens:
+            return False
+        if self.maxTokens is not None and tokens > self.maxTokens:
+            return False
+        return True
+
+
+_RULES = TypeAdapter(list[RoutingRule])
+
+
+class RoutingRules:
+    """Ordered routing rules read from a JSON file and reloaded when the file changes.
+
+    The file holds a list of rules; the first one matching the task and the estimated
+    token count wins. The file's mtime is checked at most every ``reload_seconds``. A
+    file that fails to load keeps the previous rules in force and is reported in ``stats()``.
+    """
+
+    def __init__(self, path: str, reload_seconds: float = 5.0, clock: Callable[[], float] = time.monotonic):
+        self.path = path
+        self.reload_seconds = reload_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._rules: list[RoutingRule] = []
+        self._mtime: Optional[float] = None
+        self._checked_at: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self.reloads = 0
+        self.hits: Counter[str] = Counter()
+
+    @classmethod
+    def from_settings(cls) -> Optional["RoutingRules"]:
+        if not settings.ROUTING_RULES_PATH:
+            return None
+        return cls(settings.ROUTING_RULES_PATH, settings.ROUTING_RULES_RELOAD_SECONDS)
+
+    def _reload_if_changed(self) -> None:
+        now = self._clock()
+        if self._checked_at is not None and now - self._checked_at < self.reload_seconds:
+            return
+        self._checked_at = now
+        try:
+            mtime = os.stat(self.path).st_mtime
+            if mtime == self._mtime:
+                return
+            with open(self.path, encoding="utf-8") as f:
+                rules = _RULES.validate_python(json.load(f))
+        except (OSError, ValueError) as e:
+            if self.last_error is None:
+                logger.error("Keeping %d routing rules; failed to load %s: %s", len(self._rules), self.path, e)
+            self.last_error = str(e)
+            return
+        self._rules = rules
+        self._mtime = mtime
+        self.last_error = None
+        self.reloads += 1
+        logger.info("Loaded %d routing rules from %s", len(rules), self.path)
+
+    def match(self, task_type: TaskType, tokens: int) -> Optional[RoutingRule]:
+        with self._lock:
+            self._reload_if_changed()
+            for rule in self._rules:
+                if rule.matches(task_type, tokens):
+                    self.hits[rule.name] += 1
+                    return rule
+            return None
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "path": self.path,
+                "reloads": self.reloads,
+                "lastError": self.last_error,
+                "rules": [rule.model_dump(exclude_none=True) for rule in self._rules],
+                "hits": dict(self.hits),
+            }
@@ -0,0 +1,8 @@
+from enum import Enum
+
+
+class TaskType(str, Enum):
+    CLASSIFY = "classify"
+    SENTIMENT = "sentiment"
+    SUMMARIZE = "summarize"
+    INTENT = "intent"
@@ -0,0 +1,9 @@
+import math
+
+# Rough characters per token for English text with the Llama/Gemma-style tokenizers we serve
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token-count estimate used for routing and admission decisions."""
+    return max(1, math.ceil(len(text) / CHARS_PER_TOKEN))
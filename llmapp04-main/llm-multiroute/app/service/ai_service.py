@@ -1,106 +1,1045 @@
+import asyncio
+import hashlib
 import json
-import re
-from typing import Optional
+import time
+from collections import Counter, defaultdict
+from contextlib import aclosing, asynccontextmanager, nullcontext
+from typing import Any, AsyncIterator, Awaitable, Callable, Iterable, Optional
 
 import httpx
 
 from app.config import settings
+from app.dto.analyze_response import AnalyzeResponse
+from app.dto.batch_response import BatchItemResult, BatchResponse
 from app.dto.classification_response import ClassificationResponse
 from app.dto.intent_response import IntentResponse
 from app.dto.sentiment_response import SentimentResponse
 from app.dto.summary_response import SummaryResponse
+from app.router.backend_pool import Backend, BackendPool, backend_pool
 from app.router.model_router import ModelRouter, TaskType, model_router
+from app.router.token_estimate import estimate_tokens
+from app.service.bulkhead import Bulkhead, parse_limits
+from app.service.http_client import build_client, request_timeout
+from app.service.json_boundary import JsonObjectDetector
+from app.service.json_repair import JsonRepairer
+from app.service.latency_tracker import LatencyTracker
+from app.service.micro_batcher import MicroBatcher
+from app.service.persistent_cache import PersistentResultCache
+from app.service.pool_wait import PoolWaitTracker
+from app.service.priority import PriorityClasses, priority_classes
+from app.service.response_cache import ResponseCache
+from app.service.retry import RetryBudget, RetryPolicy, is_retryable
+from app.service.single_flight import SingleFlight
+from app.service.text_chunker import split_text
+from app.service.token_scheduler import USAGE_FIELDS, TokenScheduler
 
+# Bump whenever a prompt template changes so cached responses from the old wording are not reused.
+PROMPT_VERSION = 1
 
-class AIService:
-    def __init__(
-        self,
-        http_client: Optional[httpx.Client] = None,
-        router: Optional[ModelRouter] = None,
-    ):
-        self.http_client = http_client or httpx.Client(timeout=120.0)
-        self.base_url = settings.OLLAMA_BASE_URL
+# Per-task instruction and expected JSON shape; the text is inserted between them.
+_TASK_PROMPTS: dict[TaskType, tuple[str, str]] = {
+    TaskType.CLASSIFY: (
+        "Analyze the following text and classify it with appropriate labels and tags. ",
+        '{"labels": ["label1", "label2"], "primaryCategory": "category", "confidence": 0.9}',
+    ),
+    TaskType.SENTIMENT: (
+        "Analyze the sentiment of the following text. ",
+        '{"overallSentiment": "positive", "sentimentScore": 0.8, '
+        '"emotions": ["joy", "excitement"], "confidence": 0.9}',
+    ),
+    TaskType.SUMMARIZE: (
+        "Summarize the following text concisely. ",
+        '{"summary": "your summary here", "keyPoints": ["point1", "point2", "point3"], "wordCount": 25}',
+    ),
+    TaskType.INTENT: (
+        "Detect the intent behind the following text. ",
+        '{"primaryIntent": "main_intent", "secondaryIntents": ["intent1", "intent2"], '
+        '"intentCategory": "question", "confidence": 0.9}',
+    ),
+}
+
+_TASK_RESPONSES: dict[TaskType, type] = {
+    TaskType.CLASSIFY: ClassificationResponse,
+    TaskType.SENTIMENT: SentimentResponse,
+    TaskType.SUMMARIZE: SummaryResponse,
+    TaskType.INTENT: IntentResponse,
+}
+
+
+def _output_schema(response_class: type) -> dict:
+    """The DTO's JSON schema without optional fields, which the service fills in rather than the model."""
+    schema = response_class.model_json_schema()
+    required = set(schema.get("required", []))
+    schema["properties"] = {name: field for name, field in schema["properties"].items() if name in required}
+    return schema
+
+
+# JSON schemas passed as Ollama's ``format`` to constrain decoding to each DTO.
+_TASK_SCHEMAS: dict[TaskType, dict] = {task: _output_schema(cls) for task, cls in _TASK_RESPONSES.items()}
+
+# Tasks with short answers that may be micro-batched into one multi-item prompt.
+_MICRO_BATCH_TASKS = {TaskType.CLASSIFY, TaskType.SENTIMENT}
+
+
+def _task_num_predict(task_type: TaskType) -> int:
+    return {
+        TaskType.CLASSIFY: settings.OLLAMA_NUM_PREDICT_CLASSIFY,
+        TaskType.SENTIMENT: settings.OLLAMA_NUM_PREDICT_SENTIMENT,
+        TaskType.SUMMARIZE: settings.OLLAMA_NUM_PREDICT_SUMMARIZE,
+        TaskType.INTENT: settings.OLLAMA_NUM_PREDICT_INTENT,
+    }[task_type]
+
+
+def _usage(response: dict) -> dict:
+    """The token counts and durations Ollama reports with a finished generation."""
+    return {field: response[field] for field in USAGE_FIELDS if field in response}
+
+
+def _task_read_timeout(task_type: TaskType) -> float:
+    return {
+        TaskType.CLASSIFY: settings.OLLAMA_READ_TIMEOUT_CLASSIFY,
+        TaskType.SENTIMENT: settings.OLLAMA_READ_TIMEOUT_SENTIMENT,
+        TaskType.SUMMARIZE: settings.OLLAMA_READ_TIMEOUT_SUMMARIZE,
+        TaskType.INTENT: settings.OLLAMA_READ_TIMEOUT_INTENT,
+    }[task_type]
+
+
+class _BaseAIService:
+    """Prompt construction and response parsing shared by the sync and async services."""
+
+    def __init__(self, router: Optional[ModelRouter] = None, backends: Optional[BackendPool] = None):
         self.temperature = settings.OLLAMA_TEMPERATURE
         self.api_key = settings.OLLAMA_API_KEY
+        self.structured_output = settings.OLLAMA_STRUCTURED_OUTPUT
+        self.json_repairer = JsonRepairer()
         self.router = router or model_router
+        self.backends = backends or backend_pool
+        self.failovers: Counter[str] = Counter()
 
-    def _chat(self, prompt: str, model: str) -> str:
+    def _route(self, task_type: TaskType, text: str) -> str:
+        """The routed model for ``text``, or the task's fallback model while every circuit for it is open.
+
+        With no usable fallback the primary is returned and the call fails fast with
+        ``CircuitOpenError``. Choosing before the cache key is built keeps fallback answers
+        under the fallback model's key.
+        """
+        model = self.router.get_model(task_type, tokens=estimate_tokens(text))
+        if self.backends.available(model):
+            return model
+        fallback = self.router.get_fallback_model(task_type)
+        if fallback and fallback != model and self.backends.available(fallback):
+            self.failovers[task_type.value] += 1
+            return fallback
+        return model
+
+    def _headers(self) -> dict[str, str]:
         headers = {}
         if self.api_key:
             headers["Authorization"] = f"Bearer {self.api_key}"
-        response = self.http_client.post(
-            f"{self.base_url}/api/chat",
-            headers=headers,
-            json={
-                "model": model,
-                "messages": [{"role": "user", "content": prompt}],
-                "stream": False,
-                "temperature": self.temperature,
-            },
-        )
-        response.raise_for_status()
-        return response.json()["message"]["content"]
+        return headers
 
-    def classify_text(self, text: str) -> ClassificationResponse:
-        model = self.router.get_model(TaskType.CLASSIFY)
-        prompt = (
-            "Analyze the following text and classify it with appropriate labels and tags. "
+    def _options(self, task_types: list[TaskType]) -> dict:
+        """Sampling options for a prompt answering ``task_types``; output caps add up for combined prompts.
+
+        No stop sequences are sent: a closing fence looks the same as an opening one after
+        a line of prose, so stopping on it could cut the answer off before the JSON starts.
+        Streamed generations end at the closing brace instead (see ``JsonObjectDetector``).
+        """
+        return {
+            "temperature": self.temperature,
+            "num_predict": sum(_task_num_predict(t) for t in task_types),
+        }
+
+    @staticmethod
+    def _timeout(task_types: list[TaskType]) -> httpx.Timeout:
+        """A combined prompt may wait as long as the slowest of its tasks."""
+        return request_timeout(max(_task_read_timeout(t) for t in task_types))
+
+    def _response_format(self, task_types: list[TaskType]) -> Optional[dict]:
+        """JSON schema for Ollama's ``format`` so decoding can only produce the expected DTO(s)."""
+        if not self.structured_output:
+            return None
+        if len(task_types) == 1:
+            return _TASK_SCHEMAS[task_types[0]]
+        if len(set(task_types)) == 1:
+            # One task over several texts: a micro-batch answered as a "results" array
+            return {
+                "type": "object",
+                "properties": {
+                    "results": {
+                        "type": "array",
+                        "items": _TASK_SCHEMAS[task_types[0]],
+                        "minItems": len(task_types),
+                        "maxItems": len(task_types),
+                    }
+                },
+                "required": ["results"],
+            }
+        return {
+            "type": "object",
+            "properties": {t.value: _TASK_SCHEMAS[t] for t in task_types},
+            "required": [t.value for t in task_types],
+        }
+
+    def _chat_body(self, prompt: str, model: str, task_types: list[TaskType], stream: bool = False) -> dict:
+        body = {
+            "model": model,
+            "messages": [{"role": "user", "content": prompt}],
+            "stream": stream,
+            "options": self._options(task_types),
+        }
+        response_format = self._response_format(task_types)
+        if response_format is not None:
+            body["format"] = response_format
+        return body
+
+    def _cache_key(self, task: str, model: str, text: str) -> str:
+        digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        return f"{task}:{model}:{self.temperature}:v{PROMPT_VERSION}:{digest}"
+
+    @staticmethod
+    def _build_prompt(task_type: TaskType, text: str) -> str:
+        instruction, json_format = _TASK_PROMPTS[task_type]
+        return (
+            f"{instruction}"
             "Respond with ONLY valid JSON, no additional text or explanation.\n\n"
             f"Text: {text}\n\n"
             "Return JSON in this exact format:\n"
-            '{"labels": ["label1", "label2"], "primaryCategory": "category", "confidence": 0.9}'
+            f"{json_format}"
         )
-        response = self._chat(prompt, model)
-        return self._parse_json(response, ClassificationResponse)
 
-    def analyze_sentiment(self, text: str) -> SentimentResponse:
-        model = self.router.get_model(TaskType.SENTIMENT)
-        prompt = (
-            "Analyze the sentiment of the following text. "
-            "Respond with ONLY valid JSON, no additional text or explanation.\n\n"
-            f"Text: {text}\n\n"
+    @staticmethod
+    def _build_repair_prompt(task_type: TaskType, raw: str) -> str:
+        """Short follow-up that hands back invalid output for fixing instead of redoing the task."""
+        json_format = _TASK_PROMPTS[task_type][1]
+        return (
+            "The following output was meant to be valid JSON but could not be parsed. "
+            "Correct it and respond with ONLY the fixed JSON, no additional text or explanation.\n\n"
+            f"Output: {raw}\n\n"
             "Return JSON in this exact format:\n"
-            '{"overallSentiment": "positive", "sentimentScore": 0.8, '
-            '"emotions": ["joy", "excitement"], "confidence": 0.9}'
+            f"{json_format}"
         )
-        response = self._chat(prompt, model)
-        return self._parse_json(response, SentimentResponse)
 
-    def summarize_text(self, text: str) -> SummaryResponse:
-        model = self.router.get_model(TaskType.SUMMARIZE)
-        prompt = (
-            "Summarize the following text concisely. "
+    @staticmethod
+    def _build_combined_prompt(task_types: list[TaskType], text: str) -> str:
+        task_lines = "".join(f"- {t.value}: {_TASK_PROMPTS[t][0].strip()}\n" for t in task_types)
+        json_format = ", ".join(f'"{t.value}": {_TASK_PROMPTS[t][1]}' for t in task_types)
+        return (
+            "Perform each of the following tasks on the text below. "
             "Respond with ONLY valid JSON, no additional text or explanation.\n\n"
+            f"Tasks:\n{task_lines}\n"
             f"Text: {text}\n\n"
-            "Return JSON in this exact format:\n"
-            '{"summary": "your summary here", "keyPoints": ["point1", "point2", "point3"], "wordCount": 25}'
+            "Return one JSON object with a key per task, in this exact format:\n"
+            f"{{{json_format}}}"
         )
-        response = self._chat(prompt, model)
-        return self._parse_json(response, SummaryResponse)
 
-    def detect_intent(self, text: str) -> IntentResponse:
-        model = self.router.get_model(TaskType.INTENT)
-        prompt = (
-            "Detect the intent behind the following text. "
+    @staticmethod
+    def _build_batch_prompt(task_type: TaskType, texts: list[str]) -> str:
+        instruction, json_format = _TASK_PROMPTS[task_type]
+        numbered = "".join(f"Text {number}: {text}\n\n" for number, text in enumerate(texts, 1))
+        return (
+            f"{instruction}Do this separately for each of the {len(texts)} numbered texts below. "
             "Respond with ONLY valid JSON, no additional text or explanation.\n\n"
-            f"Text: {text}\n\n"
-            "Return JSON in this exact format:\n"
-            '{"primaryIntent": "main_intent", "secondaryIntents": ["intent1", "intent2"], '
-            '"intentCategory": "question", "confidence": 0.9}'
+            f"{numbered}"
+            f'Return one JSON object whose "results" array holds exactly {len(texts)} answers, '
+            "one per text in the same order, each in this exact format:\n"
+            f"{json_format}"
         )
-        response = self._chat(prompt, model)
-        return self._parse_json(response, IntentResponse)
 
     @staticmethod
-    def _parse_json(raw: str, model_class: type):
-        cleaned = raw.strip()
-        # Strip markdown code blocks if present
-        cleaned = re.sub(r"^```json\s*", "", cleaned)
-        cleaned = re.sub(r"^```\s*", "", cleaned)
-        cleaned = re.sub(r"\s*```$", "", cleaned)
-        cleaned = cleaned.strip()
+    def _build_reduce_prompt(parts: list[SummaryResponse]) -> str:
+        sections = "".join(
+            f"Part {number} summary: {part.summary}\n"
+            f"Part {number} key points:\n" + "".join(f"- {point}\n" for point in part.keyPoints) + "\n"
+            for number, part in enumerate(parts, 1)
+        )
+        return (
+            "The following are summaries of consecutive parts of one document. Merge them into one "
+            "concise summary of the whole document, keeping the most important key points and dropping "
+            "repeats. Respond with ONLY valid JSON, no additional text or explanation.\n\n"
+            f"{sections}"
+            "Return JSON in this exact format:\n"
+            f"{_TASK_PROMPTS[TaskType.SUMMARIZE][1]}"
+        )
+
+    def _parse_json(self, raw: str, model_class: type):
+        # Schema-constrained output is plain JSON; only fall back to recovery when that fails.
         try:
-            data = json.loads(cleaned)
-            return model_class(**data)
+            return model_class.model_validate_json(raw)
+        except ValueError:
+            pass
+        try:
+            return self.json_repairer.parse(raw, model_class)
         except Exception as e:
             raise RuntimeError(f"Failed to parse AI response as JSON: {raw}") from e
+
+    def _parse_combined(self, raw: str, task_types: list[TaskType]) -> dict[TaskType, Any]:
+        """Split a combined answer into per-task DTOs, leaving out sections that do not validate."""
+        try:
+            data, repairs = self.json_repairer.load(raw)
+        except ValueError:
+            return {}
+        if not isinstance(data, dict):
+            return {}
+        results = {}
+        for task_type in task_types:
+            result, coercions = self._validate_section(data.get(task_type.value), _TASK_RESPONSES[task_type])
+            if result is not None:
+                results[task_type] = result
+                repairs = repairs + coercions
+        if results:
+            self.json_repairer.record(list(dict.fromkeys(repairs)))
+        return results
+
+    def _parse_batch(self, raw: str, task_type: TaskType, count: int) -> list[Optional[Any]]:
+        """Split a micro-batch answer into per-text DTOs; None marks an answer that does not validate.
+
+        When the answer count does not match the texts, answers cannot be paired up and all are None.
+        """
+        try:
+            data, repairs = self.json_repairer.load(raw)
+        except ValueError:
+            return [None] * count
+        if isinstance(data, dict):
+            data = data.get("results")
+        if not isinstance(data, list) or len(data) != count:
+            return [None] * count
+        results = []
+        for section in data:
+            result, coercions = self._validate_section(section, _TASK_RESPONSES[task_type])
+            results.append(result)
+            repairs = repairs + coercions
+        if any(result is not None for result in results):
+            self.json_repairer.record(list(dict.fromkeys(repairs)))
+        return results
+
+    def _validate_section(self, section: Any, response_class: type) -> tuple[Optional[Any], list[str]]:
+        """Validate one decoded JSON object as ``response_class``, coercing keys and types when needed."""
+        if not isinstance(section, dict):
+            return None, []
+        try:
+            return response_class.model_validate(section), []
+        except ValueError:
+            pass
+        try:
+            section, coercions = self.json_repairer.coerce(section, response_class)
+            return response_class.model_validate(section), coercions
+        except ValueError:
+            return None, []
+
+
+class AIService(_BaseAIService):
+    """Blocking client, kept for scripts and callers outside the event loop."""
+
+    def __init__(
+        self,
+        http_client: Optional[httpx.Client] = None,
+        router: Optional[ModelRouter] = None,
+        backends: Optional[BackendPool] = None,
+    ):
+        super().__init__(router, backends)
+        self.http_client = http_client or build_client()
+
+    def _chat(self, prompt: str, model: str, task_types: list[TaskType]) -> str:
+        with self.backends.lease(model) as backend:
+            response = self.http_client.post(
+                f"{backend.url}/api/chat",
+                headers=self._headers(),
+                json=self._chat_body(prompt, model, task_types),
+                timeout=self._timeout(task_types),
+            )
+            response.raise_for_status()
+            return response.json()["message"]["content"]
+
+    def _run_task(self, task_type: TaskType, text: str):
+        model = self._route(task_type, text)
+        response = self._chat(self._build_prompt(task_type, text), model, [task_type])
+        return self._parse_json(response, _TASK_RESPONSES[task_type])
+
+    def classify_text(self, text: str) -> ClassificationResponse:
+        return self._run_task(TaskType.CLASSIFY, text)
+
+    def analyze_sentiment(self, text: str) -> SentimentResponse:
+        return self._run_task(TaskType.SENTIMENT, text)
+
+    def summarize_text(self, text: str) -> SummaryResponse:
+        return self._run_task(TaskType.SUMMARIZE, text)
+
+    def detect_intent(self, text: str) -> IntentResponse:
+        return self._run_task(TaskType.INTENT, text)
+
+
+class AsyncAIService(_BaseAIService):
+    """Non-blocking client used by the API routes.
+
+    The ``httpx.AsyncClient`` is owned by the application lifespan (see ``app.main``)
+    and attached here on startup, so all requests share one connection pool. Results
+    are cached and identical in-flight requests share one generation; each upstream
+    call is admitted per model by ``_upstream`` and sent to a host leased from
+    ``backends``. The feature switches set in ``__init__`` mirror ``settings``.
+    """
+
+    def __init__(
+        self,
+        http_client: Optional[httpx.AsyncClient] = None,
+        router: Optional[ModelRouter] = None,
+        cache: Optional[ResponseCache] = None,
+        persistent_cache: Optional[PersistentResultCache] = None,
+        backends: Optional[BackendPool] = None,
+        priorities: Optional[PriorityClasses] = None,
+    ):
+        super().__init__(router, backends)
+        self.http_client = http_client
+        self.priorities = priorities or priority_classes
+        self.cache = cache
+        self.persistent_cache = persistent_cache
+        self.combine_tasks = settings.MULTI_TASK_PROMPT_ENABLED
+        self.micro_batching = settings.MICRO_BATCH_ENABLED
+        self.micro_batch_max_tokens = settings.MICRO_BATCH_MAX_TEXT_TOKENS
+        self.micro_batcher = MicroBatcher(settings.MICRO_BATCH_MAX_SIZE, settings.MICRO_BATCH_MAX_WAIT_SECONDS)
+        self.micro_batch_fallbacks = 0
+        self.summarize_chunk_tokens = settings.SUMMARIZE_CHUNK_TOKENS
+        self.summarize_fan_out = settings.SUMMARIZE_CHUNK_CONCURRENCY
+        self.summarize_reduce_depth = settings.SUMMARIZE_MAX_REDUCE_DEPTH
+        self.map_reduce: Counter[str] = Counter()
+        self.batch_concurrency = settings.BATCH_CONCURRENCY
+        self.early_stop = settings.OLLAMA_EARLY_STOP
+        self.early_stops = 0
+        self._in_flight = SingleFlight()
+        self.combined_prompts = 0
+        self.retry_policy = RetryPolicy(
+            max_attempts=settings.RETRY_MAX_ATTEMPTS,
+            base_delay=settings.RETRY_BASE_DELAY_SECONDS,
+            max_delay=settings.RETRY_MAX_DELAY_SECONDS,
+            repair_prompts=settings.RETRY_REPAIR_PROMPT_ENABLED,
+        )
+        self.retry_budget = RetryBudget(settings.RETRY_BUDGET_RATIO, settings.RETRY_BUDGET_MAX_TOKENS)
+        self.retries: defaultdict[str, Counter[str]] = defaultdict(Counter)
+        self.pool_waits = PoolWaitTracker()
+        self.bulkheads_enabled = settings.BULKHEAD_ENABLED
+        self.bulkheads: dict[str, Bulkhead] = {}
+        self._bulkhead_limits = parse_limits(settings.BULKHEAD_MODEL_LIMITS)
+        self.queue_waits = LatencyTracker(min_samples=1)
+        self.token_scheduling = settings.TOKEN_SCHEDULER_ENABLED
+        self.token_schedulers: dict[str, TokenScheduler] = {}
+        self._token_capacities = parse_limits(settings.TOKEN_CAPACITY_MODELS)
+        self.hedging = settings.HEDGE_ENABLED
+        self.hedge_delay = settings.HEDGE_DELAY_SECONDS
+        self.hedge_budget = RetryBudget(settings.HEDGE_BUDGET_RATIO, settings.HEDGE_BUDGET_MAX_TOKENS)
+        self.latencies = LatencyTracker(min_samples=settings.HEDGE_MIN_SAMPLES)
+        self.hedges: Counter[str] = Counter()
+        self.hedge_wins: Counter[str] = Counter()
+        self.cascade = settings.CASCADE_ENABLED
+        self.cascade_threshold = settings.CASCADE_CONFIDENCE_THRESHOLD
+        self.cascade_paths: defaultdict[str, Counter[str]] = defaultdict(Counter)
+        self.cascade_latencies = LatencyTracker(min_samples=1)
+
+    def _record_retry(self, task_types: list[TaskType], reason: str) -> None:
+        self.retries["+".join(dict.fromkeys(t.value for t in task_types))][reason] += 1
+
+    async def _chat(
+        self, prompt: str, model: str, task_types: list[TaskType], tried: Optional[set[str]] = None
+    ) -> str:
+        """Call the model, retrying transient failures while attempts and budget allow.
+
+        Hosts already used for this request are collected in ``tried`` so a retry prefers another one.
+        """
+        tried = set() if tried is None else tried
+        self.retry_budget.deposit()
+        attempt = 1
+        while True:
+            try:
+                return await self._chat_once(prompt, model, task_types, tried)
+            except Exception as e:
+                if (
+                    not is_retryable(e)
+                    or attempt >= self.retry_policy.max_attempts
+                    or not self.retry_budget.try_spend()
+                ):
+                    raise
+            self._record_retry(task_types, "upstream")
+            await asyncio.sleep(self.retry_policy.backoff(attempt))
+            attempt += 1
+
+    def _bulkhead(self, model: str) -> Optional[Bulkhead]:
+        if not self.bulkheads_enabled:
+            return None
+        bulkhead = self.bulkheads.get(model)
+        if bulkhead is None:
+            bulkhead = self.bulkheads[model] = Bulkhead(
+                model,
+                limit=self._bulkhead_limits.get(model, settings.BULKHEAD_MAX_CONCURRENCY),
+                max_queue=settings.BULKHEAD_MAX_QUEUE,
+                queue_timeout=settings.BULKHEAD_QUEUE_TIMEOUT_SECONDS,
+                adaptive=settings.BULKHEAD_ADAPTIVE,
+                min_limit=settings.BULKHEAD_MIN_CONCURRENCY,
+                max_limit=settings.BULKHEAD_MAX_ADAPTIVE_CONCURRENCY,
+                tolerance=settings.BULKHEAD_LATENCY_TOLERANCE,
+            )
+        return bulkhead
+
+    def _token_scheduler(self, model: str) -> Optional[TokenScheduler]:
+        if not self.token_scheduling:
+            return None
+        scheduler = self.token_schedulers.get(model)
+        if scheduler is None:
+            scheduler = self.token_schedulers[model] = TokenScheduler(
+                model,
+                tokens_per_second=self._token_capacities.get(model, settings.TOKEN_CAPACITY_PER_SECOND),
+                burst_seconds=settings.TOKEN_BURST_SECONDS,
+                max_wait=settings.TOKEN_MAX_WAIT_SECONDS,
+                prefill_weight=settings.TOKEN_PREFILL_WEIGHT,
+                learn=settings.TOKEN_CAPACITY_LEARNING,
+            )
+        return scheduler
+
+    @asynccontextmanager
+    async def _upstream(
+        self, prompt: str, model: str, task_types: list[TaskType], tried: Optional[set[str]]
+    ) -> AsyncIterator[tuple[Backend, dict]]:
+        """Admit one upstream call, then hold the model's bulkhead slot and a leased host for it.
+
+        The call waits for token capacity and then for a bulkhead slot, both times queued
+        in the flow of its priority class, tenant and tasks. The yielded dict collects the
+        token usage Ollama reports, which settles the call with the token scheduler.
+        """
+        priority = self.priorities.current()
+        task = "+".join(t.value for t in task_types)
+        flow = (priority.name, priority.tenant, task)
+        prompt_tokens = estimate_tokens(prompt)
+        max_tokens = sum(_task_num_predict(t) for t in task_types)
+        started = time.perf_counter()
+        scheduler = self._token_scheduler(model)
+        admission = None
+        if scheduler is not None:
+            admission = await scheduler.admit(task, prompt_tokens, max_tokens, flow, priority.weight)
+        bulkhead = self._bulkhead(model)
+        usage = None
+        try:
+            cost = admission.cost if admission is not None else prompt_tokens + max_tokens
+            async with bulkhead.slot(flow, priority.weight, cost) if bulkhead is not None else nullcontext():
+                if scheduler is not None or bulkhead is not None:
+                    self.queue_waits.record(priority.name, time.perf_counter() - started)
+                with self.backends.lease(model, tried) as backend:
+                    usage = {}
+                    yield backend, usage
+        finally:
+            if admission is not None:
+                scheduler.release(admission, usage)
+
+    async def _chat_once(
+        self, prompt: str, model: str, task_types: list[TaskType], tried: Optional[set[str]] = None
+    ) -> str:
+        if self.http_client is None:
+            raise RuntimeError("AsyncAIService has no HTTP client; is the application lifespan running?")
+        if self._stops_early(task_types):
+            return await self._chat_until_complete(prompt, model, task_types, tried)
+        async with self._upstream(prompt, model, task_types, tried) as (backend, usage):
+            response = await self.http_client.post(
+                f"{backend.url}/api/chat",
+                headers=self._headers(),
+                json=self._chat_body(prompt, model, task_types),
+                timeout=self._timeout(task_types),
+                extensions={"trace": self.pool_waits.start()},
+            )
+            response.raise_for_status()
+            data = response.json()
+            usage.update(_usage(data))
+            return data["message"]["content"]
+
+    def _stops_early(self, task_types: list[TaskType]) -> bool:
+        """Whether to hang up once the JSON object is complete.
+
+        Only unconstrained generations need it: with a ``format`` schema Ollama already
+        ends right after the object, and closing a stream early drops its pooled connection.
+        """
+        return self.early_stop and self._response_format(task_types) is None
+
+    async def _chat_until_complete(
+        self, prompt: str, model: str, task_types: list[TaskType], tried: Optional[set[str]] = None
+    ) -> str:
+        """Stream a generation and hang up once a balanced top-level JSON object has arrived."""
+        detector = JsonObjectDetector()
+        fragments = []
+        async with aclosing(self._chat_stream(prompt, model, task_types, tried)) as stream:
+            async for fragment in stream:
+                fragments.append(fragment)
+                if detector.feed(fragment) is not None:
+                    self.early_stops += 1
+                    return detector.result
+        return "".join(fragments)
+
+    async def _chat_stream(
+        self, prompt: str, model: str, task_types: list[TaskType], tried: Optional[set[str]] = None
+    ) -> AsyncIterator[str]:
+        """Yield content fragments as Ollama produces them (newline-delimited JSON)."""
+        if self.http_client is None:
+            raise RuntimeError("AsyncAIService has no HTTP client; is the application lifespan running?")
+        async with self._upstream(prompt, model, task_types, tried) as (backend, usage):
+            async with self.http_client.stream(
+                "POST",
+                f"{backend.url}/api/chat",
+                headers=self._headers(),
+                json=self._chat_body(prompt, model, task_types, stream=True),
+                timeout=self._timeout(task_types),
+                extensions={"trace": self.pool_waits.start()},
+            ) as response:
+                response.raise_for_status()
+                async for line in response.aiter_lines():
+                    if not line:
+                        continue
+                    chunk = json.loads(line)
+                    content = chunk.get("message", {}).get("content", "")
+                    if content:
+                        # Ollama streams about one token per chunk
+                        usage["streamed"] = usage.get("streamed", 0) + 1
+                        yield content
+                    if chunk.get("done"):
+                        usage.update(_usage(chunk))
+                        break
+
+    async def _lookup(self, key: str, response_class: type):
+        if self.cache is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+        if self.persistent_cache is not None:
+            stored = await self.persistent_cache.get(key, response_class)
+            if stored is not None:
+                if self.cache is not None:
+                    self.cache.set(key, stored)
+                return stored
+        return None
+
+    async def _store(self, key: str, result) -> None:
+        if self.cache is not None:
+            self.cache.set(key, result)
+        if self.persistent_cache is not None:
+            await self.persistent_cache.set(key, result)
+
+    async def _run_task(self, task_type: TaskType, text: str, model: Optional[str] = None):
+        if self._chunked(task_type, text):
+            return await self._summarize_chunked(text)
+        model = model or self._route(task_type, text)
+        cheap_model = self._cascade_model(task_type, model)
+        key = self._task_key(task_type, model, text)
+        cached = await self._lookup(key, _TASK_RESPONSES[task_type])
+        if cached is not None:
+            return cached
+        if cheap_model is not None:
+            return await self._in_flight.do(
+                key, lambda: self._generate_cascade(task_type, text, cheap_model, model, key)
+            )
+        return await self._in_flight.do(key, lambda: self._generate(task_type, text, model, key))
+
+    def _chunked(self, task_type: TaskType, text: str) -> bool:
+        return (
+            task_type is TaskType.SUMMARIZE
+            and self.summarize_chunk_tokens > 0
+            and estimate_tokens(text) > self.summarize_chunk_tokens
+        )
+
+    async def _summarize_chunked(self, text: str) -> SummaryResponse:
+        """Summarize a long text chunk by chunk, then merge the chunk summaries.
+
+        Each chunk is an ordinary summarize task, so it is routed, cached and coalesced
+        on its own; at most ``summarize_fan_out`` chunks run at once. Chunk boundaries
+        are content-defined and summaries are cached by chunk content, so after an edit
+        only the changed chunks and the reduce step run again; the response reports how
+        many chunk summaries were reused.
+        """
+        chunks = split_text(text, self.summarize_chunk_tokens, content_defined=True)
+        semaphore = asyncio.Semaphore(self.summarize_fan_out)
+        reused = 0
+
+        async def summarize(chunk: str) -> SummaryResponse:
+            nonlocal reused
+            model = self._route(TaskType.SUMMARIZE, chunk)
+            key = self._task_key(TaskType.SUMMARIZE, model, chunk)
+            cached = await self._lookup(key, SummaryResponse)
+            if cached is not None:
+                reused += 1
+                return cached
+            async with semaphore:
+                return await self._in_flight.do(key, lambda: self._generate(TaskType.SUMMARIZE, chunk, model, key))
+
+        parts = await asyncio.gather(*(summarize(chunk) for chunk in chunks))
+        self.map_reduce["documents"] += 1
+        self.map_reduce["chunks"] += len(chunks)
+        self.map_reduce["reusedChunks"] += reused
+        result = await self._reduce_summaries(list(parts), depth=1)
+        return result.model_copy(update={"chunks": len(chunks), "reusedChunks": reused})
+
+    async def _reduce_summaries(self, parts: list[SummaryResponse], depth: int) -> SummaryResponse:
+        """Merge ``parts`` into one summary, a level of groups at a time while they overflow a chunk.
+
+        The last allowed level (``summarize_reduce_depth``) merges whatever is left in one prompt.
+        """
+        if len(parts) == 1:
+            return parts[0]
+        groups = self._reduce_groups(parts) if depth < self.summarize_reduce_depth else [parts]
+        if len(groups) == 1:
+            return await self._reduce(parts)
+        semaphore = asyncio.Semaphore(self.summarize_fan_out)
+
+        async def reduce(group: list[SummaryResponse]) -> SummaryResponse:
+            async with semaphore:
+                return await self._reduce(group)
+
+        merged = await asyncio.gather(*(reduce(group) for group in groups))
+        return await self._reduce_summaries(list(merged), depth + 1)
+
+    def _reduce_groups(self, parts: list[SummaryResponse]) -> list[list[SummaryResponse]]:
+        """Pack consecutive parts into groups whose reduce prompt fits a chunk, at least two per group."""
+        groups: list[list[SummaryResponse]] = []
+        current: list[SummaryResponse] = []
+        for part in parts:
+            prompt = self._build_reduce_prompt(current + [part])
+            if len(current) >= 2 and estimate_tokens(prompt) > self.summarize_chunk_tokens:
+                groups.append(current)
+                current = []
+            current.append(part)
+        if len(current) == 1 and groups:
+            groups[-1].append(current[0])
+        elif current:
+            groups.append(current)
+        return groups
+
+    async def _reduce(self, parts: list[SummaryResponse]) -> SummaryResponse:
+        prompt = self._build_reduce_prompt(parts)
+        model = self._route(TaskType.SUMMARIZE, prompt)
+        key = self._cache_key(f"{TaskType.SUMMARIZE.value}|reduce", model, prompt)
+        cached = await self._lookup(key, SummaryResponse)
+        if cached is not None:
+            return cached
+
+        async def generate() -> SummaryResponse:
+            result = await self._solve(TaskType.SUMMARIZE, prompt, model)
+            self.map_reduce["reduceCalls"] += 1
+            await self._store(key, result)
+            return result
+
+        return await self._in_flight.do(key, generate)
+
+    def _micro_batchable(self, task_type: TaskType, text: str) -> bool:
+        return (
+            self.micro_batching
+            and task_type in _MICRO_BATCH_TASKS
+            and estimate_tokens(text) <= self.micro_batch_max_tokens
+        )
+
+    async def _generate(self, task_type: TaskType, text: str, model: str, key: str):
+        if self._micro_batchable(task_type, text):
+            result = await self.micro_batcher.submit(
+                (task_type, model), text, lambda texts: self._solve_batch(task_type, texts, model)
+            )
+        else:
+            result = await self._solve(task_type, self._build_prompt(task_type, text), model)
+        await self._store(key, result)
+        return result
+
+    async def _solve_batch(self, task_type: TaskType, texts: list[str], model: str) -> list[Any]:
+        """Answer ``task_type`` for several texts in one numbered prompt.
+
+        Texts whose answer is missing or invalid are answered on their own; the outcome
+        list holds a DTO or an exception per text.
+        """
+        if len(texts) == 1:
+            return [await self._solve(task_type, self._build_prompt(task_type, texts[0]), model)]
+        response = await self._chat(self._build_batch_prompt(task_type, texts), model, [task_type] * len(texts))
+        results = self._parse_batch(response, task_type, len(texts))
+        missing = [index for index, result in enumerate(results) if result is None]
+        self.micro_batch_fallbacks += len(missing)
+        outcomes = await asyncio.gather(
+            *(self._solve(task_type, self._build_prompt(task_type, texts[index]), model) for index in missing),
+            return_exceptions=True,
+        )
+        for index, outcome in zip(missing, outcomes):
+            results[index] = outcome
+        return results
+
+    async def _solve(self, task_type: TaskType, prompt: str, model: str):
+        async def answer(tried: set[str]):
+            response = await self._chat(prompt, model, [task_type], tried)
+            return await self._parse_or_repair(response, model, task_type)
+
+        return await self._hedged(model, answer)
+
+    def _cascade_model(self, task_type: TaskType, model: str) -> Optional[str]:
+        """The cheap first-tier model for ``task_type``, or None when the task is not cascaded."""
+        if not self.cascade:
+            return None
+        cheap_model = self.router.get_cascade_model(task_type)
+        if not cheap_model or cheap_model == model or not self.backends.available(cheap_model):
+            return None
+        return cheap_model
+
+    def _task_key(self, task_type: TaskType, model: str, text: str) -> str:
+        """Cache and coalescing key for ``task_type``'s answer to ``text`` on ``model``.
+
+        The routed model is part of the key, so re-routing a task never serves the old model's
+        answers. Cascaded answers may come from either tier, so they are keyed on both models.
+        """
+        cheap_model = self._cascade_model(task_type, model)
+        task = task_type.value if cheap_model is None else f"{task_type.value}|cascade:{cheap_model}"
+        return self._cache_key(task, model, text)
+
+    async def _generate_cascade(self, task_type: TaskType, text: str, cheap_model: str, model: str, key: str):
+        """Answer on ``cheap_model`` and re-run on ``model`` if that fails or is not confident enough."""
+        prompt = self._build_prompt(task_type, text)
+        started = time.perf_counter()
+        try:
+            response = await self._chat(prompt, cheap_model, [task_type])
+            result = self._parse_json(response, _TASK_RESPONSES[task_type])
+        except Exception:
+            result = None
+        if result is not None and result.confidence >= self.cascade_threshold:
+            path = "cheap"
+        else:
+            result = await self._solve(task_type, prompt, model)
+            path = "escalated"
+        self.cascade_paths[task_type.value][path] += 1
+        self.cascade_latencies.record(path, time.perf_counter() - started)
+        await self._store(key, result)
+        return result
+
+    def _hedge_after(self, model: str) -> Optional[float]:
+        """Seconds to wait before hedging: the fixed delay, else the model's observed p95."""
+        if self.hedge_delay > 0:
+            return self.hedge_delay
+        return self.latencies.percentile(model, 0.95)
+
+    async def _hedged(self, model: str, attempt: Callable[[set[str]], Awaitable[Any]]):
+        """Run ``attempt``, racing a second copy on another host if the first is slow.
+
+        The first attempt to return a parsed result wins and the other is cancelled; an
+        error only surfaces once both attempts have failed.
+        """
+        tried: set[str] = set()
+
+        async def timed():
+            started = time.perf_counter()
+            result = await attempt(tried)
+            self.latencies.record(model, time.perf_counter() - started)
+            return result
+
+        self.hedge_budget.deposit()
+        delay = self._hedge_after(model) if self.hedging else None
+        if delay is None:
+            return await timed()
+        primary = asyncio.ensure_future(timed())
+        done, _ = await asyncio.wait({primary}, timeout=delay)
+        if done or not self.backends.has_spare(model, tried) or not self.hedge_budget.try_spend():
+            return await primary
+        self.hedges[model] += 1
+        hedge = asyncio.ensure_future(timed())
+        pending = {primary, hedge}
+        error = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedge:
+                            self.hedge_wins[model] += 1
+                        return task.result()
+                    error = error or task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def _parse_or_repair(self, raw: str, model: str, task_type: TaskType):
+        """Parse ``raw``, or ask the model once to fix it when it cannot be recovered locally."""
+        response_class = _TASK_RESPONSES[task_type]
+        try:
+            return self._parse_json(raw, response_class)
+        except RuntimeError:
+            if not self.retry_policy.repair_prompts or not self.retry_budget.try_spend():
+                raise
+        self._record_retry([task_type], "repair")
+        repaired = await self._chat(self._build_repair_prompt(task_type, raw), model, [task_type])
+        return self._parse_json(repaired, response_class)
+
+    async def _run_group(self, model: str, task_types: list[TaskType], text: str) -> dict[TaskType, Any]:
+        """Answer tasks that share ``model``, with one combined prompt for those not already cached.
+
+        Cascaded tasks run through their cascade instead. Tasks whose section of the combined
+        answer is missing or invalid, or all of them when the combined call fails, are retried
+        on their own.
+        """
+        if len(task_types) == 1:
+            return {task_types[0]: await self._run_task(task_types[0], text, model)}
+        results: dict[TaskType, Any] = {}
+        pending = []
+        for task_type in task_types:
+            if self._chunked(task_type, text) or self._cascade_model(task_type, model) is not None:
+                # Too long for one prompt, or answered by its cheap model first; run on its own below
+                continue
+            cached = await self._lookup(self._task_key(task_type, model, text), _TASK_RESPONSES[task_type])
+            if cached is not None:
+                results[task_type] = cached
+            else:
+                pending.append(task_type)
+        if len(pending) > 1:
+            key = self._cache_key("+".join(t.value for t in pending), model, text)
+            try:
+                results.update(await self._in_flight.do(key, lambda: self._generate_combined(pending, text, model)))
+            except Exception:
+                # Keep the cached answers; the pending tasks fall back to single calls below
+                pass
+        missing = [t for t in task_types if t not in results]
+        outcomes = await asyncio.gather(*(self._run_task(t, text, model) for t in missing), return_exceptions=True)
+        results.update(zip(missing, outcomes))
+        return results
+
+    async def _generate_combined(self, task_types: list[TaskType], text: str, model: str) -> dict[TaskType, Any]:
+        response = await self._chat(self._build_combined_prompt(task_types, text), model, task_types)
+        self.combined_prompts += 1
+        results = self._parse_combined(response, task_types)
+        for task_type, result in results.items():
+            await self._store(self._task_key(task_type, model, text), result)
+        return results
+
+    def metrics(self) -> dict:
+        return {
+            "coalescedRequests": self._in_flight.coalesced,
+            "inFlightRequests": len(self._in_flight),
+            "combinedPrompts": self.combined_prompts,
+            "mapReduce": {
+                "chunkTokens": self.summarize_chunk_tokens,
+                "documents": self.map_reduce["documents"],
+                "chunks": self.map_reduce["chunks"],
+                "reusedChunks": self.map_reduce["reusedChunks"],
+                "reduceCalls": self.map_reduce["reduceCalls"],
+            },
+            "microBatching": {
+                "enabled": self.micro_batching,
+                **self.micro_batcher.stats(),
+                "fallbacks": self.micro_batch_fallbacks,
+            },
+            "earlyStops": self.early_stops,
+            "jsonRepairs": self.json_repairer.stats(),
+            "retries": {task: dict(counts) for task, counts in self.retries.items()},
+            "retryBudget": self.retry_budget.stats(),
+            "poolWait": self.pool_waits.stats(),
+            "failovers": dict(self.failovers),
+            "bulkheads": {model: bulkhead.stats() for model, bulkhead in self.bulkheads.items()},
+            "tokenScheduler": {model: scheduler.stats() for model, scheduler in self.token_schedulers.items()},
+            "priorities": {
+                "classes": self.priorities.weights,
+                "default": self.priorities.default,
+                "queueWait": self.queue_waits.stats(),
+            },
+            "cascade": self._cascade_stats(),
+            "hedging": {
+                "enabled": self.hedging,
+                "hedges": dict(self.hedges),
+                "hedgeWins": dict(self.hedge_wins),
+                "budget": self.hedge_budget.stats(),
+                "latency": self.latencies.stats(),
+            },
+        }
+
+    def _cascade_stats(self) -> dict:
+        cheap = sum(paths["cheap"] for paths in self.cascade_paths.values())
+        total = sum(sum(paths.values()) for paths in self.cascade_paths.values())
+        return {
+            "enabled": self.cascade,
+            "requests": total,
+            "cheapTierShare": round(cheap / total, 3) if total else None,
+            "byTask": {task: dict(paths) for task, paths in self.cascade_paths.items()},
+            "latency": self.cascade_latencies.stats(),
+        }
+
+    async def classify_text(self, text: str) -> ClassificationResponse:
+        return await self._run_task(TaskType.CLASSIFY, text)
+
+    async def analyze_sentiment(self, text: str) -> SentimentResponse:
+        return await self._run_task(TaskType.SENTIMENT, text)
+
+    async def summarize_text(self, text: str) -> SummaryResponse:
+        return await self._run_task(TaskType.SUMMARIZE, text)
+
+    async def detect_intent(self, text: str) -> IntentResponse:
+        return await self._run_task(TaskType.INTENT, text)
+
+    async def analyze_text(self, text: str, tasks: Iterable[TaskType]) -> AnalyzeResponse:
+        """Run several tasks on ``text`` concurrently, each on its routed model."""
+        tasks = list(dict.fromkeys(tasks))
+        if self.combine_tasks:
+            groups = list(self.router.group_by_model(tasks, lambda task: self._route(task, text)).items())
+        else:
+            groups = [(self._route(task, text), [task]) for task in tasks]
+        outcomes = await asyncio.gather(
+            *(self._run_group(model, group, text) for model, group in groups), return_exceptions=True
+        )
+        response = AnalyzeResponse()
+        for (_, group), outcome in zip(groups, outcomes):
+            for task in group:
+                result = outcome if isinstance(outcome, Exception) else outcome[task]
+                if isinstance(result, Exception):
+                    response.errors[task.value] = str(result)
+                else:
+                    setattr(response, task.value, result)
+        return response
+
+    async def run_batch(self, task_type: TaskType, texts: list[str]) -> BatchResponse:
+        """Run one task over many texts, analysing each distinct text once.
+
+        At most ``batch_concurrency`` calls are in flight at a time; a failing item is
+        reported in its slot without affecting the others.
+        """
+        unique_texts = list(dict.fromkeys(texts))
+        semaphore = asyncio.Semaphore(self.batch_concurrency)
+
+        async def run_one(text: str):
+            async with semaphore:
+                return await self._run_task(task_type, text)
+
+        outcomes = await asyncio.gather(*(run_one(text) for text in unique_texts), return_exceptions=True)
+        by_text = dict(zip(unique_texts, outcomes))
+        results = []
+        for index, text in enumerate(texts):
+            outcome = by_text[text]
+            if isinstance(outcome, Exception):
+                results.append(BatchItemResult(index=index, error=str(outcome)))
+            else:
+                results.append(BatchItemResult(index=index, result=outcome))
+        failed = sum(1 for item in results if item.error is not None)
+        return BatchResponse(
+            results=results,
+            uniqueTexts=len(unique_texts),
+            succeeded=len(results) - failed,
+            failed=failed,
+        )
+
+    async def stream_task(self, task_type: TaskType, text: str) -> AsyncIterator[tuple[str, Any]]:
+        """Stream one task as ``("token", fragment)`` events followed by ``("result", dto)``.
+
+        A cached answer, or a long summary built chunk by chunk, is returned as a lone result event.
+        Cascaded tasks stream from the routed model and share the cascade's cache entry.
+        """
+        if self._chunked(task_type, text):
+            yield "result", await self._summarize_chunked(text)
+            return
+        model = self._route(task_type, text)
+        key = self._task_key(task_type, model, text)
+        response_class = _TASK_RESPONSES[task_type]
+        cached = await self._lookup(key, response_class)
+        if cached is not None:
+            yield "result", cached
+            return
+        detector = JsonObjectDetector()
+        fragments = []
+        prompt = self._build_prompt(task_type, text)
+        async with aclosing(self._chat_stream(prompt, model, [task_type])) as stream:
+            async for fragment in stream:
+                fragments.append(fragment)
+                yield "token", fragment
+                if detector.feed(fragment) is not None and self._stops_early([task_type]):
+                    self.early_stops += 1
+                    break
+        result = self._parse_json(detector.result or "".join(fragments), response_class)
+        await self._store(key, result)
+        yield "result", result
@@ -0,0 +1,189 @@
+import asyncio
+import statistics
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Callable, Hashable, Optional
+
+import httpx
+
+from app.router.outcome import track_outcome
+from app.service.fair_queue import FairQueue
+
+
+def is_overload(error: Exception) -> bool:
+    """Upstream timeouts, 429 and 5xx responses point at an overloaded model; other errors say nothing about it."""
+    if isinstance(error, httpx.TimeoutException):
+        return True
+    if isinstance(error, httpx.HTTPStatusError):
+        status = error.response.status_code
+        return status == 429 or status >= 500
+    return False
+
+
+class BulkheadFullError(RuntimeError):
+    """Raised when a model's bulkhead cannot take a request: 429 if its queue is full, 503 if the wait timed out."""
+
+    def __init__(self, model: str, retry_after: float, status_code: int = 429):
+        reason = "queue is full" if status_code == 429 else "queue wait timed out"
+        super().__init__(f"Too many concurrent requests for model {model}: {reason}")
+        self.model = model
+        self.retry_after = retry_after
+        self.status_code = status_code
+
+
+class Bulkhead:
+    """Concurrency limit for one model with a bounded, weighted fair wait queue.
+
+    At most ``limit`` calls run at once; up to ``max_queue`` more wait for up to
+    ``queue_timeout`` seconds and anything beyond is rejected straight away. Waiting
+    calls are admitted by ``FairQueue`` order over their ``flow``, so each flow gets
+    slots in proportion to its ``weight`` and inverse to each call's ``cost``. When
+    ``adaptive``, the limit follows AIMD on observed latency, judged once per
+    ``WINDOW`` calls so that single long generations do not count as overload: it
+    shrinks by ``DECREASE`` when the window's median latency exceeds ``tolerance`` times
+    the baseline (a moving average of past window medians), and otherwise grows by one
+    per ``limit`` calls that finished while saturated. A call that fails with a sign of
+    overload (see ``is_overload``) shrinks it at once; other errors leave it alone.
+    """
+
+    DECREASE = 0.9
+    WINDOW = 20
+    # Weight of the newest window median in the baseline latency
+    BASELINE_ALPHA = 0.1
+
+    def __init__(
+        self,
+        name: str,
+        limit: int,
+        max_queue: int,
+        queue_timeout: float,
+        adaptive: bool = False,
+        min_limit: int = 1,
+        max_limit: Optional[int] = None,
+        tolerance: float = 2.0,
+        clock: Callable[[], float] = time.perf_counter,
+    ):
+        self.name = name
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.adaptive = adaptive
+        self.min_limit = min_limit
+        self.max_limit = max_limit or limit
+        self.tolerance = tolerance
+        self._clock = clock
+        self._limit = float(limit)
+        self._waiters = FairQueue()
+        self._latencies: deque[float] = deque(maxlen=100)
+        self._window: list[float] = []
+        self._saturated = 0
+        self._baseline: Optional[float] = None
+        self.active = 0
+        self.completed = 0
+        self.rejected = 0
+        self.timed_out = 0
+
+    @property
+    def limit(self) -> int:
+        return max(self.min_limit, int(self._limit))
+
+    def retry_after(self) -> float:
+        """Rough time until a queued request would start, for the Retry-After header."""
+        average = sum(self._latencies) / len(self._latencies) if self._latencies else 1.0
+        return max(1.0, average * (len(self._waiters) + 1) / self.limit)
+
+    @asynccontextmanager
+    async def slot(self, flow: Hashable = None, weight: float = 1.0, cost: float = 1.0) -> AsyncIterator[None]:
+        await self._acquire(flow, weight, cost)
+        with track_outcome(self._release, self._clock, is_overload):
+            yield
+
+    async def _acquire(self, flow: Hashable, weight: float, cost: float) -> None:
+        if self.active < self.limit and not self._waiters:
+            self.active += 1
+            return
+        if len(self._waiters) >= self.max_queue:
+            self.rejected += 1
+            raise BulkheadFullError(self.name, self.retry_after(), 429)
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.push(waiter, flow, weight, cost)
+        try:
+            done, _ = await asyncio.wait({waiter}, timeout=self.queue_timeout)
+        except BaseException:
+            self._abandon(waiter)
+            raise
+        if not done:
+            self._abandon(waiter)
+            self.timed_out += 1
+            raise BulkheadFullError(self.name, self.retry_after(), 503)
+
+    def _abandon(self, waiter: asyncio.Future) -> None:
+        if waiter.done():
+            # The slot was handed over just as the caller gave up; pass it on
+            self._leave()
+        else:
+            waiter.cancel()
+            self._waiters.remove(waiter)
+
+    def _leave(self) -> None:
+        self.active -= 1
+        while self._waiters and self.active < self.limit:
+            waiter = self._waiters.pop()
+            if not waiter.done():
+                self.active += 1
+                waiter.set_result(None)
+
+    def _release(self, seconds: float, ok: Optional[bool]) -> None:
+        if ok is not None:
+            self.completed += 1
+            if self.adaptive:
+                self._adapt(seconds, ok)
+            if ok:
+                self._latencies.append(seconds)
+        self._leave()
+
+    def _adapt(self, seconds: float, ok: bool) -> None:
+        if not ok:
+            self._limit = max(float(self.min_limit), self._limit * self.DECREASE)
+            return
+        self._window.append(seconds)
+        if self.active >= self.limit:
+            self._saturated += 1
+        if len(self._window) < self.WINDOW:
+            return
+        median = statistics.median(self._window)
+        if self._baseline is not None and median > self.tolerance * self._baseline:
+            self._limit = max(float(self.min_limit), self._limit * self.DECREASE)
+        else:
+            self._limit = min(float(self.max_limit), self._limit + self._saturated / self._limit)
+        if self._baseline is None:
+            self._baseline = median
+        else:
+            self._baseline += self.BASELINE_ALPHA * (median - self._baseline)
+        self._window.clear()
+        self._saturated = 0
+
+    def stats(self) -> dict:
+        return {
+            "limit": self.limit,
+            "active": self.active,
+            "queued": len(self._waiters),
+            "maxQueue": self.max_queue,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "timedOut": self.timed_out,
+            "avgLatencyMs": (
+                round(sum(self._latencies) / len(self._latencies) * 1000, 1) if self._latencies else None
+            ),
+        }
+
+
+def parse_limits(spec: str) -> dict[str, int]:
+    """Parse ``name=number`` pairs separated by commas, such as per-model limit overrides."""
+    limits = {}
+    for pair in spec.split(","):
+        if "=" not in pair:
+            continue
+        model, _, limit = pair.rpartition("=")
+        limits[model.strip()] = int(limit)
+    return limits
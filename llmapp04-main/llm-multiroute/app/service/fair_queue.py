@@ -0,0 +1,45 @@
+import heapq
+import itertools
+from typing import Any, Hashable
+
+
+class FairQueue:
+    """Self-clocked weighted fair queue.
+
+    Each pushed item belongs to a flow and is stamped with a virtual finish time of
+    ``max(now, flow's last finish) + cost / weight``, where "now" is the finish time of
+    the item popped last. Items are popped in finish-time order, so flows share the
+    queue in proportion to their weights however many items each of them pushes, and
+    a flow of costly items (long summaries) gets fewer turns than a flow of cheap ones.
+    """
+
+    def __init__(self):
+        self._heap: list[tuple[float, int, Any]] = []
+        self._finish: dict[Hashable, float] = {}
+        self._virtual_time = 0.0
+        self._order = itertools.count()
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def push(self, item: Any, flow: Hashable, weight: float = 1.0, cost: float = 1.0) -> None:
+        start = max(self._virtual_time, self._finish.get(flow, 0.0))
+        finish = self._finish[flow] = start + cost / max(weight, 1e-9)
+        heapq.heappush(self._heap, (finish, next(self._order), item))
+
+    def pop(self) -> Any:
+        finish, _, item = heapq.heappop(self._heap)
+        self._virtual_time = finish
+        if not self._heap:
+            # Idle flows carry no credit or debt into the next busy period
+            self._finish.clear()
+        return item
+
+    def remove(self, item: Any) -> None:
+        for index, entry in enumerate(self._heap):
+            if entry[2] is item:
+                self._heap[index] = self._heap[-1]
+                self._heap.pop()
+                heapq.heapify(self._heap)
+                return
+        raise ValueError("item is not queued")
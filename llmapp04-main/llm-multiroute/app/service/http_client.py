@@ -0,0 +1,38 @@
+import httpx
+
+from app.config import settings
+
+
+def client_limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=settings.OLLAMA_MAX_CONNECTIONS,
+        max_keepalive_connections=settings.OLLAMA_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=settings.OLLAMA_KEEPALIVE_EXPIRY_SECONDS,
+    )
+
+
+def request_timeout(read: float) -> httpx.Timeout:
+    """Shared connect/write/pool timeouts with a task-specific read timeout."""
+    return httpx.Timeout(
+        connect=settings.OLLAMA_CONNECT_TIMEOUT,
+        read=read,
+        write=settings.OLLAMA_WRITE_TIMEOUT,
+        pool=settings.OLLAMA_POOL_TIMEOUT,
+    )
+
+
+def build_async_client() -> httpx.AsyncClient:
+    """Pooled client for the Ollama backend; per-task read timeouts are set on each request."""
+    return httpx.AsyncClient(
+        limits=client_limits(),
+        timeout=request_timeout(settings.OLLAMA_READ_TIMEOUT),
+        http2=settings.OLLAMA_HTTP2,
+    )
+
+
+def build_client() -> httpx.Client:
+    return httpx.Client(
+        limits=client_limits(),
+        timeout=request_timeout(settings.OLLAMA_READ_TIMEOUT),
+        http2=settings.OLLAMA_HTTP2,
+    )
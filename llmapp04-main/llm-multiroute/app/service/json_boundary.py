@@ -0,0 +1,50 @@
+from typing import Optional
+
+
+class JsonObjectDetector:
+    """Incrementally finds the first complete top-level JSON object in streamed text.
+
+    Fragments are fed as they arrive; ``feed`` returns the object's text (from the
+    opening ``{`` to its matching ``}``) as soon as it is balanced, ignoring anything
+    before it such as a markdown fence. Braces inside strings are not counted.
+    """
+
+    def __init__(self):
+        self._fragments: list[str] = []
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._started = False
+        self.result: Optional[str] = None
+
+    def feed(self, fragment: str) -> Optional[str]:
+        if self.result is not None:
+            return self.result
+        self._fragments.append(fragment)
+        for index, char in enumerate(fragment):
+            if not self._started:
+                if char == "{":
+                    self._started = True
+                    self._depth = 1
+                    # Drop everything before the opening brace.
+                    self._fragments = [fragment[index:]]
+                continue
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char == "{":
+                self._depth += 1
+            elif char == "}":
+                self._depth -= 1
+                if self._depth == 0:
+                    overshoot = len(fragment) - index - 1
+                    text = "".join(self._fragments)
+                    self.result = text[: len(text) - overshoot] if overshoot else text
+                    return self.result
+        return None
@@ -0,0 +1,192 @@
+import json
+import re
+import threading
+from collections import Counter
+from typing import Any, get_origin
+
+from pydantic import BaseModel
+
+from app.service.json_boundary import JsonObjectDetector
+
+_PYTHON_LITERALS = {"True": "true", "False": "false", "None": "null"}
+
+
+def _normalize(text: str) -> tuple[str, list[str]]:
+    """Rewrite near-JSON into JSON in one pass, leaving double-quoted strings untouched.
+
+    Handles single-quoted strings, trailing commas, unquoted keys and Python literals.
+    Returns the rewritten text and the names of the repairs that were applied.
+    """
+    out = []
+    repairs = set()
+    i, n = 0, len(text)
+    while i < n:
+        char = text[i]
+        if char == '"':
+            j = i + 1
+            while j < n and text[j] != '"':
+                j += 2 if text[j] == "\\" else 1
+            out.append(text[i:j + 1])
+            i = j + 1
+        elif char == "'":
+            j = i + 1
+            buf = []
+            while j < n and text[j] != "'":
+                if text[j] == "\\" and j + 1 < n:
+                    buf.append("'" if text[j + 1] == "'" else text[j:j + 2])
+                    j += 2
+                    continue
+                buf.append('\\"' if text[j] == '"' else text[j])
+                j += 1
+            out.append('"' + "".join(buf) + '"')
+            repairs.add("single_quotes")
+            i = j + 1
+        elif char == ",":
+            j = i + 1
+            while j < n and text[j].isspace():
+                j += 1
+            if j < n and text[j] in "}]":
+                repairs.add("trailing_commas")
+            else:
+                out.append(char)
+            i += 1
+        elif char.isalpha() or char == "_":
+            j = i
+            while j < n and (text[j].isalnum() or text[j] == "_"):
+                j += 1
+            word = text[i:j]
+            k = j
+            while k < n and text[k].isspace():
+                k += 1
+            if k < n and text[k] == ":":
+                out.append(f'"{word}"')
+                repairs.add("unquoted_keys")
+            elif word in _PYTHON_LITERALS:
+                out.append(_PYTHON_LITERALS[word])
+                repairs.add("python_literals")
+            else:
+                out.append(word)
+            i = j
+        else:
+            out.append(char)
+            i += 1
+    return "".join(out), sorted(repairs)
+
+
+def _field_key(name: str) -> str:
+    return re.sub(r"[^a-z0-9]", "", name.lower())
+
+
+def _to_number(value: Any, kind: type) -> Any:
+    if isinstance(value, str):
+        stripped = value.strip()
+        if stripped.endswith("%"):
+            return kind(float(stripped[:-1]) / 100) if kind is float else kind(float(stripped[:-1]))
+        return kind(float(stripped))
+    if kind is int and isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
+class JsonRepairer:
+    """Recovers DTOs from model output that is not quite valid JSON.
+
+    Pulls the first balanced object out of surrounding prose or fences, fixes common
+    syntax defects and coerces values to the DTO's field types. Every repair that led
+    to a successful parse is counted by name in ``counts``.
+    """
+
+    def __init__(self):
+        self.counts: Counter[str] = Counter()
+        self._lock = threading.Lock()
+
+    def load(self, raw: str) -> tuple[Any, list[str]]:
+        """Return the decoded JSON value and the syntax repairs needed to decode it.
+
+        Balanced ``{...}`` spans are tried in order, so braces in prose before the
+        object do not hide it.
+        """
+        text = raw.strip()
+        try:
+            return json.loads(text), []
+        except ValueError:
+            pass
+        error = ValueError("No complete JSON object found")
+        start = text.find("{")
+        while start != -1:
+            extracted = JsonObjectDetector().feed(text[start:])
+            if extracted is None:
+                break
+            repairs = [] if extracted == text else ["extracted_object"]
+            try:
+                return json.loads(extracted), repairs
+            except ValueError:
+                normalized, fixes = _normalize(extracted)
+            try:
+                return json.loads(normalized), repairs + fixes
+            except ValueError as e:
+                error = e
+            start = text.find("{", start + 1)
+        raise error
+
+    @staticmethod
+    def coerce(data: dict, model_class: type[BaseModel]) -> tuple[dict, list[str]]:
+        """Map keys onto the DTO's field names and convert values to the declared types."""
+        repairs = set()
+        fields = model_class.model_fields
+        by_key = {_field_key(name): name for name in fields}
+        coerced = {}
+        for key, value in data.items():
+            name = key if key in fields else by_key.get(_field_key(key))
+            if name is None:
+                continue
+            if name != key:
+                repairs.add("renamed_keys")
+            coerced[name] = value
+        for name, field in fields.items():
+            annotation = field.annotation
+            if name not in coerced:
+                if get_origin(annotation) is list:
+                    coerced[name] = []
+                    repairs.add("defaulted_lists")
+                continue
+            value = coerced[name]
+            try:
+                if annotation in (float, int) and not isinstance(value, bool):
+                    converted = _to_number(value, annotation)
+                    if converted is not value:
+                        coerced[name] = converted
+                        repairs.add("coerced_numbers")
+                elif get_origin(annotation) is list:
+                    if isinstance(value, str):
+                        coerced[name] = [part.strip() for part in value.split(",") if part.strip()]
+                        repairs.add("coerced_lists")
+                    elif isinstance(value, list) and any(not isinstance(item, str) for item in value):
+                        coerced[name] = [str(item) for item in value]
+                        repairs.add("coerced_lists")
+                elif annotation is str and not isinstance(value, str):
+                    coerced[name] = ", ".join(map(str, value)) if isinstance(value, list) else str(value)
+                    repairs.add("coerced_strings")
+            except (TypeError, ValueError):
+                continue
+        return coerced, sorted(repairs)
+
+    def parse(self, raw: str, model_class: type[BaseModel]) -> BaseModel:
+        data, repairs = self.load(raw)
+        if not isinstance(data, dict):
+            raise ValueError("JSON value is not an object")
+        data, coercions = self.coerce(data, model_class)
+        result = model_class.model_validate(data)
+        self.record(repairs + coercions)
+        return result
+
+    def record(self, repairs: list[str]) -> None:
+        if not repairs:
+            return
+        with self._lock:
+            self.counts["recovered_responses"] += 1
+            self.counts.update(repairs)
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return dict(self.counts)
@@ -0,0 +1,43 @@
+import threading
+from collections import deque
+from typing import Optional
+
+
+class LatencyTracker:
+    """Recent call durations per model, for percentile-based decisions such as hedging."""
+
+    def __init__(self, window: int = 200, min_samples: int = 20):
+        self.window = window
+        self.min_samples = min_samples
+        self._samples: dict[str, deque[float]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, model: str, seconds: float) -> None:
+        with self._lock:
+            samples = self._samples.get(model)
+            if samples is None:
+                samples = self._samples[model] = deque(maxlen=self.window)
+            samples.append(seconds)
+
+    def percentile(self, model: str, fraction: float) -> Optional[float]:
+        """Nearest-rank percentile, or None until ``min_samples`` durations are known."""
+        with self._lock:
+            samples = sorted(self._samples.get(model, ()))
+        if len(samples) < self.min_samples:
+            return None
+        index = min(len(samples) - 1, max(0, round(fraction * len(samples)) - 1))
+        return samples[index]
+
+    def stats(self) -> dict[str, dict]:
+        with self._lock:
+            models = list(self._samples)
+        result = {}
+        for model in models:
+            p50 = self.percentile(model, 0.5)
+            p95 = self.percentile(model, 0.95)
+            result[model] = {
+                "samples": len(self._samples[model]),
+                "p50Ms": None if p50 is None else round(p50 * 1000, 1),
+                "p95Ms": None if p95 is None else round(p95 * 1000, 1),
+            }
+        return result
@@ -0,0 +1,75 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Hashable, Optional
+
+
+class _Batch:
+    def __init__(self, flush: Callable[[list[Any]], Awaitable[list[Any]]]):
+        self.flush = flush
+        self.items: list[Any] = []
+        self.futures: list[asyncio.Future] = []
+        self.timer: Optional[asyncio.TimerHandle] = None
+
+
+class MicroBatcher:
+    """Gathers concurrent calls that share a key and runs them as one batch.
+
+    The first item for a key opens a batch, which is flushed ``max_wait`` seconds later
+    or as soon as it holds ``max_size`` items. ``flush`` gets the items in arrival order
+    and returns one outcome per item, either a result or an exception that is raised to
+    that item's caller only; if ``flush`` itself fails, every caller gets its error.
+    Callers await through ``asyncio.shield``, as with ``SingleFlight``, so one client
+    disconnecting does not cancel the batch for the others.
+    """
+
+    def __init__(self, max_size: int = 8, max_wait: float = 0.01):
+        self.max_size = max(1, max_size)
+        self.max_wait = max_wait
+        self._open: dict[Hashable, _Batch] = {}
+        # The loop only holds tasks weakly, so batches in flight are kept alive here
+        self._running: set[asyncio.Task] = set()
+        self.batches = 0
+        self.items = 0
+
+    async def submit(self, key: Hashable, item: Any, flush: Callable[[list[Any]], Awaitable[list[Any]]]) -> Any:
+        batch = self._open.get(key)
+        if batch is None:
+            batch = self._open[key] = _Batch(flush)
+            batch.timer = asyncio.get_running_loop().call_later(self.max_wait, self._flush, key, batch)
+        future = asyncio.get_running_loop().create_future()
+        batch.items.append(item)
+        batch.futures.append(future)
+        if len(batch.items) >= self.max_size:
+            self._flush(key, batch)
+        return await asyncio.shield(future)
+
+    def _flush(self, key: Hashable, batch: _Batch) -> None:
+        if self._open.get(key) is not batch:
+            return
+        del self._open[key]
+        batch.timer.cancel()
+        self.batches += 1
+        self.items += len(batch.items)
+        task = asyncio.ensure_future(self._run(batch))
+        self._running.add(task)
+        task.add_done_callback(self._running.discard)
+
+    @staticmethod
+    async def _run(batch: _Batch) -> None:
+        try:
+            outcomes = await batch.flush(batch.items)
+        except Exception as e:
+            outcomes = [e] * len(batch.futures)
+        for future, outcome in zip(batch.futures, outcomes):
+            if future.done():
+                continue
+            if isinstance(outcome, BaseException):
+                future.set_exception(outcome)
+            else:
+                future.set_result(outcome)
+
+    def stats(self) -> dict:
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "avgBatchSize": round(self.items / self.batches, 2) if self.batches else 0.0,
+        }
@@ -0,0 +1,145 @@
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Optional
+
+from pydantic import BaseModel, ValidationError
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    key TEXT PRIMARY KEY,
+    payload TEXT NOT NULL,
+    expires_at REAL NOT NULL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_results_accessed_at ON results (accessed_at);
+CREATE INDEX IF NOT EXISTS idx_results_expires_at ON results (expires_at);
+"""
+
+
+class PersistentResultCache:
+    """SQLite-backed store of parsed responses that survives process restarts.
+
+    Values are kept as compact JSON and re-validated into their DTO on read. Entries
+    expire after ``ttl_seconds`` and the least recently read ones are dropped once the
+    table holds more than ``max_entries`` rows. Both are pruned every ``prune_every``
+    writes rather than on each one, so the table may briefly run over its limit. A read
+    only refreshes a row's access time once it is ``touch_interval`` seconds old, so most
+    hits stay read-only. A row that no longer validates against its DTO (saved before a
+    DTO change) counts as a miss and is deleted. The async methods run the blocking
+    SQLite calls on a worker thread so they never stall the event loop.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_entries: int,
+        ttl_seconds: float,
+        prune_every: int = 100,
+        touch_interval: float = 60.0,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.prune_every = max(1, prune_every)
+        self.touch_interval = touch_interval
+        self._writes = 0
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self.hits = 0
+        self.misses = 0
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    async def get(self, key: str, model_class: type[BaseModel]) -> Optional[BaseModel]:
+        return await asyncio.to_thread(self.get_sync, key, model_class)
+
+    async def set(self, key: str, value: BaseModel) -> None:
+        await asyncio.to_thread(self.set_sync, key, value)
+
+    def get_sync(self, key: str, model_class: type[BaseModel]) -> Optional[BaseModel]:
+        now = self._clock()
+        with self._lock:
+            conn = self._connection()
+            row = conn.execute(
+                "SELECT payload, accessed_at FROM results WHERE key = ? AND expires_at > ?", (key, now)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            try:
+                value = model_class.model_validate_json(row[0])
+            except ValidationError:
+                conn.execute("DELETE FROM results WHERE key = ?", (key,))
+                conn.commit()
+                self.misses += 1
+                return None
+            if now - row[1] >= self.touch_interval:
+                conn.execute("UPDATE results SET accessed_at = ? WHERE key = ?", (now, key))
+                conn.commit()
+            self.hits += 1
+        return value
+
+    def set_sync(self, key: str, value: BaseModel) -> None:
+        if self.max_entries <= 0:
+            return
+        now = self._clock()
+        payload = value.model_dump_json()
+        with self._lock:
+            conn = self._connection()
+            conn.execute(
+                "INSERT OR REPLACE INTO results (key, payload, expires_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, payload, now + self.ttl_seconds, now),
+            )
+            self._writes += 1
+            if self._writes % self.prune_every == 0:
+                self._prune(conn, now)
+            conn.commit()
+
+    def _prune(self, conn: sqlite3.Connection, now: float) -> None:
+        conn.execute("DELETE FROM results WHERE expires_at <= ?", (now,))
+        excess = conn.execute("SELECT COUNT(*) FROM results").fetchone()[0] - self.max_entries
+        if excess > 0:
+            conn.execute(
+                "DELETE FROM results WHERE key IN (SELECT key FROM results ORDER BY accessed_at LIMIT ?)",
+                (excess,),
+            )
+
+    def clear(self) -> int:
+        with self._lock:
+            conn = self._connection()
+            flushed = conn.execute("DELETE FROM results").rowcount
+            conn.commit()
+            return flushed
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            size = self._connection().execute("SELECT COUNT(*) FROM results").fetchone()[0]
+            return {
+                "path": self.path,
+                "size": size,
+                "maxEntries": self.max_entries,
+                "ttlSeconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
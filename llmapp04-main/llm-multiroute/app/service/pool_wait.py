@@ -0,0 +1,56 @@
+import threading
+import time
+from typing import Awaitable, Callable
+
+
+class PoolWaitTracker:
+    """Measures how long upstream requests wait for a pooled connection.
+
+    ``start()`` returns an httpcore ``trace`` callback for one request. The wait is the
+    time from ``start()`` until the request headers are sent, minus any time spent
+    opening a new connection, so it grows only when every pooled connection is busy.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.perf_counter):
+        self._clock = clock
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+
+    def start(self) -> Callable[[str, dict], Awaitable[None]]:
+        started = self._clock()
+        connect_started = None
+        connect_seconds = 0.0
+        recorded = False
+
+        async def trace(event: str, info: dict) -> None:
+            nonlocal connect_started, connect_seconds, recorded
+            name, _, phase = event.rpartition(".")
+            if name.endswith(("connect_tcp", "connect_unix_socket", "start_tls")):
+                if phase == "started":
+                    connect_started = self._clock()
+                elif connect_started is not None:
+                    connect_seconds += self._clock() - connect_started
+                    connect_started = None
+            elif name.endswith("send_request_headers") and phase == "started" and not recorded:
+                recorded = True
+                self.record(max(0.0, self._clock() - started - connect_seconds))
+
+        return trace
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self.requests += 1
+            self.total_seconds += seconds
+            self.max_seconds = max(self.max_seconds, seconds)
+
+    def stats(self) -> dict:
+        with self._lock:
+            average = self.total_seconds / self.requests if self.requests else 0.0
+            return {
+                "requests": self.requests,
+                "avgMs": round(average * 1000, 3),
+                "maxMs": round(self.max_seconds * 1000, 3),
+                "totalSeconds": round(self.total_seconds, 3),
+            }
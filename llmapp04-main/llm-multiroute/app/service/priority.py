@@ -0,0 +1,78 @@
+from contextvars import ContextVar
+from typing import Optional
+
+from app.config import settings
+from app.service.bulkhead import parse_limits
+
+
+class UnknownPriorityError(ValueError):
+    """Raised when a request names a priority class that is not configured."""
+
+
+class RequestPriority:
+    """Who a request is scheduled as: its priority class, the class weight and the tenant."""
+
+    def __init__(self, name: str, weight: int, tenant: str = "default"):
+        self.name = name
+        self.weight = weight
+        self.tenant = tenant
+
+    def __repr__(self) -> str:
+        return f"RequestPriority({self.name!r}, weight={self.weight}, tenant={self.tenant!r})"
+
+
+class PriorityClasses:
+    """Configured priority classes and the API keys assigned to them.
+
+    ``weights`` maps each class to its share of a model's queue. A request is placed by
+    its API key when the key is listed in ``api_keys`` (as ``tenant`` and class), else by
+    the class it names in the ``X-Priority`` header, else in ``default``; keys therefore
+    pin batch clients to their class whatever header they send. Only listed keys carry a
+    tenant of their own, so callers cannot open extra queue shares by naming new tenants.
+    """
+
+    def __init__(self, weights: dict[str, int], default: str, api_keys: Optional[dict[str, tuple[str, str]]] = None):
+        if default not in weights:
+            raise ValueError(f"Default priority class {default!r} is not one of {sorted(weights)}")
+        self.weights = weights
+        self.default = default
+        self.api_keys = api_keys or {}
+
+    @classmethod
+    def from_settings(cls) -> "PriorityClasses":
+        return cls(
+            parse_limits(settings.PRIORITY_CLASSES),
+            settings.PRIORITY_DEFAULT_CLASS,
+            parse_api_keys(settings.PRIORITY_API_KEYS),
+        )
+
+    def resolve(self, name: Optional[str] = None, api_key: Optional[str] = None) -> RequestPriority:
+        tenant = "default"
+        if api_key and api_key in self.api_keys:
+            tenant, name = self.api_keys[api_key]
+        name = (name or self.default).strip().lower()
+        if name not in self.weights:
+            raise UnknownPriorityError(f"Unknown priority class {name!r}; expected one of {sorted(self.weights)}")
+        return RequestPriority(name, self.weights[name], tenant)
+
+    def current(self) -> RequestPriority:
+        """The priority of the request being served, or the default class outside a request."""
+        return request_priority.get() or self.resolve()
+
+
+def parse_api_keys(spec: str) -> dict[str, tuple[str, str]]:
+    """Parse ``key=tenant:class`` pairs separated by commas."""
+    keys = {}
+    for pair in spec.split(","):
+        if "=" not in pair:
+            continue
+        key, _, assignment = pair.partition("=")
+        tenant, _, name = assignment.rpartition(":")
+        keys[key.strip()] = (tenant.strip() or "default", name.strip().lower())
+    return keys
+
+
+# Set per request by the API layer; tasks spawned while serving it inherit the value
+request_priority: ContextVar[Optional[RequestPriority]] = ContextVar("request_priority", default=None)
+
+priority_classes = PriorityClasses.from_settings()
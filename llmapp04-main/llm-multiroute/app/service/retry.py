@@ -0,0 +1,61 @@
+import random
+import threading
+
+import httpx
+
+
+def is_retryable(error: Exception) -> bool:
+    """Connection problems, timeouts, 429 and 5xx responses are worth another attempt."""
+    if isinstance(error, httpx.TransportError):
+        return True
+    if isinstance(error, httpx.HTTPStatusError):
+        status = error.response.status_code
+        return status == 429 or status >= 500
+    return False
+
+
+class RetryPolicy:
+    """Attempt limit and capped exponential backoff with full jitter."""
+
+    def __init__(self, max_attempts: int, base_delay: float, max_delay: float, repair_prompts: bool = True):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.repair_prompts = repair_prompts
+
+    def backoff(self, retry_number: int) -> float:
+        """Delay before retry ``retry_number`` (1 for the first retry)."""
+        ceiling = min(self.max_delay, self.base_delay * 2 ** (retry_number - 1))
+        return random.uniform(0, ceiling)
+
+
+class RetryBudget:
+    """Token bucket that keeps retries to a fraction of overall traffic.
+
+    Every upstream request deposits ``ratio`` tokens and every retry spends one, so
+    when the backend is failing broadly retries stop instead of multiplying the load.
+    The bucket holds at most ``max_tokens``, which is also the burst allowed at startup.
+    """
+
+    def __init__(self, ratio: float, max_tokens: float):
+        self.ratio = ratio
+        self.max_tokens = max_tokens
+        self._tokens = max_tokens
+        self._lock = threading.Lock()
+        self.exhausted = 0
+
+    def deposit(self) -> None:
+        with self._lock:
+            self._tokens = min(self.max_tokens, self._tokens + self.ratio)
+
+    def try_spend(self) -> bool:
+        with self._lock:
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return True
+            self.exhausted += 1
+            return False
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"tokens": round(self._tokens, 2), "maxTokens": self.max_tokens, "exhausted": self.exhausted}
@@ -0,0 +1,66 @@
+import hashlib
+import re
+
+from app.router.token_estimate import CHARS_PER_TOKEN, estimate_tokens
+
+# Boundaries to split on, coarsest first, with the separator used to pack pieces back together
+_BOUNDARIES: list[tuple[re.Pattern, str]] = [
+    (re.compile(r"\n\s*\n"), "\n\n"),  # paragraphs
+    (re.compile(r"(?<=[.!?])\s+"), " "),  # sentences
+    (re.compile(r"\s+"), " "),  # words
+]
+
+# With content-defined chunking, about one piece in this many ends a chunk that is at least half full
+ANCHOR_EVERY = 4
+
+
+def split_text(text: str, max_tokens: int, content_defined: bool = False) -> list[str]:
+    """Split ``text`` into chunks of at most ``max_tokens`` estimated tokens.
+
+    Whole paragraphs are packed into each chunk while they fit; a paragraph too long on
+    its own is split between sentences, a sentence between words, and a single
+    oversized word is cut at the character budget. With ``content_defined``, a chunk
+    that is at least half full also ends after any piece whose hash marks it as an
+    anchor, so after an edit the boundaries fall back into the same places and only
+    the chunks around the edit change.
+    """
+    return _split(text.strip(), max(1, max_tokens), 0, content_defined)
+
+
+def _is_anchor(piece: str) -> bool:
+    return int.from_bytes(hashlib.sha256(piece.encode("utf-8")).digest()[:4], "big") % ANCHOR_EVERY == 0
+
+
+def _split(text: str, max_tokens: int, level: int, content_defined: bool) -> list[str]:
+    if not text:
+        return []
+    if estimate_tokens(text) <= max_tokens:
+        return [text]
+    if level == len(_BOUNDARIES):
+        size = max_tokens * CHARS_PER_TOKEN
+        return [text[start:start + size] for start in range(0, len(text), size)]
+    pattern, separator = _BOUNDARIES[level]
+    chunks = []
+    current = ""
+    for piece in pattern.split(text):
+        piece = piece.strip()
+        if not piece:
+            continue
+        if estimate_tokens(piece) > max_tokens:
+            if current:
+                chunks.append(current)
+                current = ""
+            chunks.extend(_split(piece, max_tokens, level + 1, content_defined))
+            continue
+        packed = f"{current}{separator}{piece}" if current else piece
+        if estimate_tokens(packed) > max_tokens:
+            chunks.append(current)
+            current = piece
+        else:
+            current = packed
+        if content_defined and 2 * estimate_tokens(current) >= max_tokens and _is_anchor(piece):
+            chunks.append(current)
+            current = ""
+    if current:
+        chunks.append(current)
+    return chunks
@@ -0,0 +1,208 @@
+import asyncio
+import math
+import time
+from typing import Callable, Hashable, Optional
+
+from app.service.fair_queue import FairQueue
+
+# Fields of Ollama's final response chunk; durations are in nanoseconds
+USAGE_FIELDS = ("prompt_eval_count", "prompt_eval_duration", "eval_count", "eval_duration")
+
+
+class CapacityExceededError(RuntimeError):
+    """Raised when a call would wait longer than allowed for a model's token throughput."""
+
+    def __init__(self, model: str, retry_after: float):
+        super().__init__(f"Token capacity of model {model} is exhausted; retry in {retry_after:.1f}s")
+        self.model = model
+        self.retry_after = retry_after
+
+
+class Admission:
+    """One call let through the scheduler, with the token counts it was charged for."""
+
+    def __init__(self, task: str, prefill: int, decode: int, cost: float):
+        self.task = task
+        self.prefill = prefill
+        self.decode = decode
+        self.cost = cost
+        self.waiter: Optional[asyncio.Future] = None
+
+
+class TokenScheduler:
+    """Admits calls to one model against its throughput in weighted tokens per second.
+
+    A call costs its expected decode tokens plus its prompt tokens times
+    ``prefill_weight``, since prefill is far cheaper per token than decode. Credit
+    refills at ``tokens_per_second`` up to ``burst_seconds`` worth; a call is admitted
+    while credit is positive and may take it below zero, so the calls behind it wait
+    until the debt is paid back. Waiting calls are released in ``FairQueue`` order and
+    a call whose predicted wait exceeds ``max_wait`` is rejected with
+    ``CapacityExceededError``. With ``learn`` on, the counts and durations Ollama reports
+    settle each call's actual cost and steer the expected decode length per task, the
+    prefill weight and, while the model is busy, the capacity itself.
+    """
+
+    # Weight of the newest sample in the learned moving averages
+    ALPHA = 0.2
+    # Learned capacity never drops below this share of the configured one
+    MIN_CAPACITY_FRACTION = 0.1
+
+    def __init__(
+        self,
+        name: str,
+        tokens_per_second: float,
+        burst_seconds: float = 5.0,
+        max_wait: float = 30.0,
+        prefill_weight: float = 0.1,
+        learn: bool = True,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.name = name
+        self.tokens_per_second = float(tokens_per_second)
+        self.min_tokens_per_second = self.tokens_per_second * self.MIN_CAPACITY_FRACTION
+        self.burst_seconds = burst_seconds
+        self.max_wait = max_wait
+        self.prefill_weight = prefill_weight
+        self.learn = learn
+        self._clock = clock
+        self._level = self.burst
+        self._updated = clock()
+        self._waiters = FairQueue()
+        self._queued_cost = 0.0
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._decode_tokens: dict[str, float] = {}
+        self.in_flight = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.learned = 0
+
+    @property
+    def burst(self) -> float:
+        return self.tokens_per_second * self.burst_seconds
+
+    def expected_decode(self, task: str, max_tokens: int) -> int:
+        """Learned average output length for ``task``, or its ``max_tokens`` cap until one is known."""
+        learned = self._decode_tokens.get(task)
+        return max_tokens if learned is None else min(max_tokens, math.ceil(learned))
+
+    def _refill(self) -> None:
+        now = self._clock()
+        self._level = min(self.burst, self._level + (now - self._updated) * self.tokens_per_second)
+        self._updated = now
+
+    async def admit(
+        self, task: str, prompt_tokens: int, max_tokens: int, flow: Hashable = None, weight: float = 1.0
+    ) -> Admission:
+        decode = self.expected_decode(task, max_tokens)
+        admission = Admission(task, prompt_tokens, decode, decode + prompt_tokens * self.prefill_weight)
+        self._refill()
+        if not self._waiters and self._level > 0:
+            self._grant(admission)
+            return admission
+        wait = (self._queued_cost + admission.cost - self._level) / self.tokens_per_second
+        if wait > self.max_wait:
+            self.rejected += 1
+            raise CapacityExceededError(self.name, wait)
+        admission.waiter = asyncio.get_running_loop().create_future()
+        self._waiters.push(admission, flow, weight, admission.cost)
+        self._queued_cost += admission.cost
+        self._schedule()
+        try:
+            await admission.waiter
+        except BaseException:
+            if admission.waiter.done() and not admission.waiter.cancelled():
+                # Admitted just as the caller gave up
+                self.release(admission, None)
+            else:
+                admission.waiter.cancel()
+                self._waiters.remove(admission)
+                self._queued_cost -= admission.cost
+            raise
+        return admission
+
+    def _grant(self, admission: Admission) -> None:
+        self._level -= admission.cost
+        self.in_flight += 1
+        self.admitted += 1
+
+    def _schedule(self) -> None:
+        if self._timer is not None or not self._waiters:
+            return
+        delay = max(0.0, -self._level) / self.tokens_per_second
+        self._timer = asyncio.get_running_loop().call_later(delay, self._dispatch)
+
+    def _dispatch(self) -> None:
+        self._timer = None
+        self._refill()
+        while self._waiters and self._level > 0:
+            admission = self._waiters.pop()
+            self._queued_cost -= admission.cost
+            self._grant(admission)
+            admission.waiter.set_result(None)
+        self._schedule()
+
+    def release(self, admission: Admission, usage: Optional[dict]) -> None:
+        """Settle a finished call against what it actually used.
+
+        ``usage`` holds the Ollama fields in ``USAGE_FIELDS`` when the model reported
+        them, and ``streamed`` (tokens relayed) for streams closed early; a call with
+        neither is charged its estimate. ``usage=None`` means the call was never sent,
+        so its whole cost is handed back.
+        """
+        saturated = bool(self._waiters) or self._level <= 0
+        concurrency = self.in_flight
+        self.in_flight -= 1
+        self._refill()
+        actual = 0.0 if usage is None else self._settle(admission, usage, concurrency, saturated)
+        self._level = min(self.burst, self._level + admission.cost - actual)
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._waiters:
+            self._dispatch()
+
+    def _settle(self, admission: Admission, usage: dict, concurrency: int, saturated: bool) -> float:
+        """Return the call's actual weighted cost, learning from it when ``learn`` is on."""
+        prompt_tokens = usage.get("prompt_eval_count", admission.prefill)
+        output_tokens = usage.get("eval_count", usage.get("streamed"))
+        if output_tokens is None:
+            return admission.cost
+        prompt_ns = usage.get("prompt_eval_duration")
+        output_ns = usage.get("eval_duration")
+        if self.learn:
+            self.learned += 1
+            self._decode_tokens[admission.task] = _ewma(
+                self._decode_tokens.get(admission.task), output_tokens, self.ALPHA
+            )
+            if prompt_ns and output_ns and prompt_tokens and output_tokens:
+                self.prefill_weight = _ewma(
+                    self.prefill_weight, (prompt_ns / prompt_tokens) / (output_ns / output_tokens), self.ALPHA
+                )
+        cost = output_tokens + prompt_tokens * self.prefill_weight
+        if self.learn and prompt_ns is not None and output_ns:
+            # Throughput of this call times the calls that shared the model with it
+            sample = cost / ((prompt_ns + output_ns) / 1e9) * max(1, concurrency)
+            if sample > self.tokens_per_second or saturated:
+                self.tokens_per_second = max(
+                    self.min_tokens_per_second, _ewma(self.tokens_per_second, sample, self.ALPHA)
+                )
+        return cost
+
+    def stats(self) -> dict:
+        self._refill()
+        return {
+            "tokensPerSecond": round(self.tokens_per_second, 1),
+            "credit": round(self._level, 1),
+            "queued": len(self._waiters),
+            "inFlight": self.in_flight,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "learnedCalls": self.learned,
+            "prefillWeight": round(self.prefill_weight, 4),
+            "decodeTokens": {task: round(tokens, 1) for task, tokens in self._decode_tokens.items()},
+        }
+
+
+def _ewma(current: Optional[float], sample: float, alpha: float) -> float:
+    return sample if current is None else current + alpha * (sample - current)
@@ -1,18 +1,26 @@
-from unittest.mock import MagicMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
 
+import httpx
 import pytest
 from fastapi.testclient import TestClient
 
+from app.dto.analyze_response import AnalyzeResponse
+from app.dto.batch_response import BatchItemResult, BatchResponse
 from app.dto.classification_response import ClassificationResponse
 from app.dto.intent_response import IntentResponse
 from app.dto.sentiment_response import SentimentResponse
 from app.dto.summary_response import SummaryResponse
 from app.main import app
+from app.router.circuit_breaker import CircuitOpenError
+from app.router.model_router import TaskType
+from app.service.bulkhead import BulkheadFullError
+from app.service.priority import request_priority
+from app.service.token_scheduler import CapacityExceededError
 
 
 @pytest.fixture
 def mock_ai_service():
-    with patch("app.controller.ai_controller.ai_service") as mock_service:
+    with patch("app.controller.ai_controller.ai_service", new_callable=AsyncMock) as mock_service:
         yield mock_service
 
 
@@ -161,6 +169,16 @@ class TestSummarizeEndpoint:
         assert len(data["keyPoints"]) == 1
         assert data["wordCount"] == 3
 
+    def test_chunked_summary_reports_reused_chunks(self, client, mock_ai_service):
+        mock_ai_service.summarize_text.return_value = SummaryResponse(
+            summary="A long report.", keyPoints=["Point"], wordCount=3, chunks=6, reusedChunks=5
+        )
+
+        response = client.post("/api/ai/summarize", json={"text": "Long text"})
+
+        data = response.json()
+        assert (data["chunks"], data["reusedChunks"]) == (6, 5)
+
     def test_service_exception_returns_500(self, client, mock_ai_service):
         mock_ai_service.summarize_text.side_effect = RuntimeError("AI service timeout")
 
@@ -263,6 +281,96 @@ class TestRoutesEndpoint:
         assert data["summarize"] == "ministral-3:8b"
         assert data["intent"] == "gemma3:12b"
 
+    def test_get_routes_reports_backend_hosts(self, client, mock_ai_service):
+        response = client.get("/api/ai/routes")
+
+        backends = response.json()["backends"]
+        assert len(backends) >= 1
+        assert {"url", "healthy", "outstanding", "avgLatencyMs", "models", "breakers"} <= set(backends[0])
+        assert "fallbacks" in response.json()
+        assert "rules" in response.json()
+
+    def test_open_circuit_returns_503_with_retry_after(self, client, mock_ai_service):
+        mock_ai_service.classify_text.side_effect = CircuitOpenError("gemma3:4b", retry_after=12.3)
+
+        response = client.post("/api/ai/classify", json={"text": "Test text"})
+
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == "13"
+        assert "gemma3:4b" in response.json()["error"]
+
+    def test_full_bulkhead_returns_429_with_retry_after(self, client, mock_ai_service):
+        mock_ai_service.classify_text.side_effect = BulkheadFullError("gemma3:4b", retry_after=2.5)
+
+        response = client.post("/api/ai/classify", json={"text": "Test text"})
+
+        assert response.status_code == 429
+        assert response.headers["Retry-After"] == "3"
+
+    def test_bulkhead_queue_timeout_returns_503(self, client, mock_ai_service):
+        mock_ai_service.classify_text.side_effect = BulkheadFullError("gemma3:4b", retry_after=4, status_code=503)
+
+        response = client.post("/api/ai/classify", json={"text": "Test text"})
+
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == "4"
+
+    def test_exhausted_token_capacity_returns_429(self, client, mock_ai_service):
+        mock_ai_service.summarize_text.side_effect = CapacityExceededError("ministral-3:8b", retry_after=7.2)
+
+        response = client.post("/api/ai/summarize", json={"text": "Test text"})
+
+        assert response.status_code == 429
+        assert response.headers["Retry-After"] == "8"
+        assert "ministral-3:8b" in response.json()["error"]
+
+
+class TestPriorityHeaders:
+    def _capture_priority(self, mock_ai_service):
+        seen = []
+
+        async def classify(text):
+            seen.append(request_priority.get())
+            return ClassificationResponse(labels=["t"], primaryCategory="t", confidence=0.9)
+
+        mock_ai_service.classify_text.side_effect = classify
+        return seen
+
+    def test_priority_header_sets_request_class(self, client, mock_ai_service):
+        seen = self._capture_priority(mock_ai_service)
+
+        response = client.post("/api/ai/classify", json={"text": "Test text"}, headers={"X-Priority": "interactive"})
+
+        assert response.status_code == 200
+        assert (seen[0].name, seen[0].tenant) == ("interactive", "default")
+
+    def test_tenant_header_does_not_open_a_new_flow(self, client, mock_ai_service):
+        seen = self._capture_priority(mock_ai_service)
+
+        client.post("/api/ai/classify", json={"text": "Test text"}, headers={"X-Priority": "batch", "X-Tenant": "t1"})
+
+        assert seen[0].tenant == "default"
+
+    def test_requests_without_header_use_default_class(self, client, mock_ai_service):
+        seen = self._capture_priority(mock_ai_service)
+
+        client.post("/api/ai/classify", json={"text": "Test text"})
+
+        assert seen[0].name == "standard"
+
+    def test_unknown_priority_returns_400(self, client, mock_ai_service):
+        response = client.post("/api/ai/classify", json={"text": "Test text"}, headers={"X-Priority": "urgent"})
+
+        assert response.status_code == 400
+        assert "urgent" in response.json()["error"]
+        mock_ai_service.classify_text.assert_not_called()
+
+    def test_read_only_endpoints_ignore_priority(self, client):
+        for method, path in [("get", "/api/ai/routes"), ("get", "/api/ai/cache"), ("get", "/api/ai/metrics")]:
+            response = getattr(client, method)(path, headers={"X-Priority": "urgent"})
+
+            assert response.status_code == 200, path
+
 
 class TestRequestValidation:
     def test_empty_text(self, client, mock_ai_service):
@@ -313,3 +421,139 @@ class TestRequestValidation:
         )
 
         assert response.status_code == 422
+
+
+class TestLifespan:
+    def test_lifespan_attaches_shared_async_client(self):
+        from app.controller.ai_controller import ai_service
+
+        with TestClient(app):
+            assert isinstance(ai_service.http_client, httpx.AsyncClient)
+        assert ai_service.http_client is None
+
+
+class TestCacheEndpoints:
+    def test_get_cache_stats(self, client):
+        response = client.get("/api/ai/cache")
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["enabled"] is True
+        assert data["maxEntries"] == 1024
+        assert {"size", "hits", "misses", "evictions", "expirations"} <= data.keys()
+
+    def test_flush_cache(self, client):
+        from app.controller.ai_controller import response_cache
+
+        response_cache.set("key", "value")
+
+        response = client.delete("/api/ai/cache")
+
+        assert response.status_code == 200
+        assert response.json() == {"flushed": 1}
+        assert len(response_cache) == 0
+
+
+class TestMetricsEndpoint:
+    def test_get_metrics(self, client):
+        response = client.get("/api/ai/metrics")
+
+        assert response.status_code == 200
+        assert "coalescedRequests" in response.json()
+
+
+class TestAnalyzeEndpoint:
+    def test_runs_all_tasks_by_default(self, client, mock_ai_service):
+        mock_ai_service.analyze_text.return_value = AnalyzeResponse(
+            sentiment=SentimentResponse(overallSentiment="positive", sentimentScore=0.8, emotions=[], confidence=0.9),
+            errors={"summarize": "AI service timeout"},
+        )
+
+        response = client.post("/api/ai/analyze", json={"text": "Great product"})
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["sentiment"]["overallSentiment"] == "positive"
+        assert data["classify"] is None
+        assert data["errors"] == {"summarize": "AI service timeout"}
+        mock_ai_service.analyze_text.assert_called_once_with("Great product", list(TaskType))
+
+    def test_passes_requested_subset(self, client, mock_ai_service):
+        mock_ai_service.analyze_text.return_value = AnalyzeResponse()
+
+        response = client.post("/api/ai/analyze", json={"text": "Hi", "tasks": ["intent", "classify"]})
+
+        assert response.status_code == 200
+        mock_ai_service.analyze_text.assert_called_once_with("Hi", [TaskType.INTENT, TaskType.CLASSIFY])
+
+    def test_unknown_task_returns_422(self, client, mock_ai_service):
+        response = client.post("/api/ai/analyze", json={"text": "Hi", "tasks": ["translate"]})
+
+        assert response.status_code == 422
+
+
+class TestBatchEndpoint:
+    def test_batch_sentiment(self, client, mock_ai_service):
+        mock_ai_service.run_batch.return_value = BatchResponse(
+            results=[
+                BatchItemResult(
+                    index=0,
+                    result=SentimentResponse(
+                        overallSentiment="positive", sentimentScore=0.9, emotions=[], confidence=0.9
+                    ),
+                ),
+                BatchItemResult(index=1, error="Failed to parse AI response as JSON"),
+            ],
+            uniqueTexts=2,
+            succeeded=1,
+            failed=1,
+        )
+
+        response = client.post("/api/ai/sentiment/batch", json={"texts": ["Great!", "???"]})
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["results"][0]["result"]["overallSentiment"] == "positive"
+        assert data["results"][1]["error"] == "Failed to parse AI response as JSON"
+        mock_ai_service.run_batch.assert_called_once_with(TaskType.SENTIMENT, ["Great!", "???"])
+
+    def test_unknown_task_returns_422(self, client, mock_ai_service):
+        response = client.post("/api/ai/translate/batch", json={"texts": ["Hi"]})
+
+        assert response.status_code == 422
+
+    def test_empty_batch_returns_422(self, client, mock_ai_service):
+        response = client.post("/api/ai/classify/batch", json={"texts": []})
+
+        assert response.status_code == 422
+
+
+class TestStreamEndpoint:
+    def test_streams_tokens_and_result_as_sse(self, client, mock_ai_service):
+        async def fake_stream(task, text):
+            yield "token", '{"summary": '
+            yield "token", '"s"}'
+            yield "result", SummaryResponse(summary="s", keyPoints=[], wordCount=1)
+
+        mock_ai_service.stream_task = fake_stream
+
+        response = client.post("/api/ai/summarize/stream", json={"text": "Long document"})
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+        events = [block for block in response.text.split("\n\n") if block]
+        assert events[0] == 'event: token\ndata: {"content": "{\\"summary\\": "}'
+        assert events[-1].startswith("event: result\ndata: ")
+        assert '"summary":"s"' in events[-1]
+
+    def test_failure_is_sent_as_error_event(self, client, mock_ai_service):
+        async def fake_stream(task, text):
+            yield "token", "oops"
+            raise RuntimeError("Failed to parse AI response as JSON: oops")
+
+        mock_ai_service.stream_task = fake_stream
+
+        response = client.post("/api/ai/classify/stream", json={"text": "Text"})
+
+        assert response.status_code == 200
+        assert "event: error" in response.text
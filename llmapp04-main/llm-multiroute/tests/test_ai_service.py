@@ -1,14 +1,24 @@
+import asyncio
 import json
-from unittest.mock import MagicMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
 
+import httpx
 import pytest
 
 from app.dto.classification_response import ClassificationResponse
 from app.dto.intent_response import IntentResponse
 from app.dto.sentiment_response import SentimentResponse
 from app.dto.summary_response import SummaryResponse
+from app.router.backend_pool import BackendPool
+from app.router.circuit_breaker import CircuitBreaker, CircuitOpenError
 from app.router.model_router import ModelRouter, TaskType
-from app.service.ai_service import AIService
+from app.service.ai_service import AIService, AsyncAIService
+from app.service.bulkhead import Bulkhead, BulkheadFullError
+from app.service.persistent_cache import PersistentResultCache
+from app.service.priority import PriorityClasses, request_priority
+from app.service.response_cache import ResponseCache
+from app.service.retry import RetryBudget, RetryPolicy
+from app.service.token_scheduler import CapacityExceededError, TokenScheduler
 
 
 @pytest.fixture
@@ -19,25 +29,39 @@ def mock_http_client():
 @pytest.fixture
 def mock_router():
     router = MagicMock(spec=ModelRouter)
-    router.get_model.side_effect = lambda t: {
+    router.get_model.side_effect = lambda t, tokens=None: {
         TaskType.CLASSIFY: "gemma3:4b",
         TaskType.SENTIMENT: "ministral-3:3b",
         TaskType.SUMMARIZE: "ministral-3:8b",
         TaskType.INTENT: "gemma3:12b",
     }[t]
+    router.group_by_model.side_effect = lambda tasks, model_for=None: ModelRouter.group_by_model(
+        router, tasks, model_for
+    )
+    router.get_fallback_model.return_value = None
+    router.get_cascade_model.return_value = None
     return router
 
 
 @pytest.fixture
-def ai_service(mock_http_client, mock_router):
-    return AIService(http_client=mock_http_client, router=mock_router)
+def backends():
+    return BackendPool(["http://ollama:11434"])
 
 
-def _setup_chat_response(mock_http_client, response_text: str):
+@pytest.fixture
+def ai_service(mock_http_client, mock_router, backends):
+    return AIService(http_client=mock_http_client, router=mock_router, backends=backends)
+
+
+def _chat_response(content: str) -> MagicMock:
     mock_response = MagicMock()
-    mock_response.json.return_value = {"message": {"content": response_text}}
+    mock_response.json.return_value = {"message": {"content": content}}
     mock_response.raise_for_status = MagicMock()
-    mock_http_client.post.return_value = mock_response
+    return mock_response
+
+
+def _setup_chat_response(mock_http_client, response_text: str):
+    mock_http_client.post.return_value = _chat_response(response_text)
 
 
 class TestClassifyText:
@@ -254,11 +278,11 @@ class TestDetectIntent:
 
 
 class TestAuthorizationHeader:
-    def test_api_key_sends_bearer_header(self, mock_http_client):
+    def test_api_key_sends_bearer_header(self, mock_http_client, backends):
         json_response = '{"labels": ["test"], "primaryCategory": "test", "confidence": 0.9}'
         _setup_chat_response(mock_http_client, json_response)
 
-        service = AIService(http_client=mock_http_client)
+        service = AIService(http_client=mock_http_client, backends=backends)
         service.api_key = "test-api-key"
         service.classify_text("test text")
 
@@ -266,11 +290,11 @@ class TestAuthorizationHeader:
         headers = call_args.kwargs.get("headers") or call_args[1].get("headers")
         assert headers["Authorization"] == "Bearer test-api-key"
 
-    def test_no_api_key_sends_no_auth_header(self, mock_http_client):
+    def test_no_api_key_sends_no_auth_header(self, mock_http_client, backends):
         json_response = '{"labels": ["test"], "primaryCategory": "test", "confidence": 0.9}'
         _setup_chat_response(mock_http_client, json_response)
 
-        service = AIService(http_client=mock_http_client)
+        service = AIService(http_client=mock_http_client, backends=backends)
         service.api_key = ""
         service.classify_text("test text")
 
@@ -279,9 +303,24 @@ class TestAuthorizationHeader:
         assert "Authorization" not in headers
 
 
+class TestDefaultClient:
+    def test_service_without_arguments_builds_its_own_client(self, backends):
+        service = AIService(backends=backends)
+
+        with patch.object(service.http_client, "post") as post:
+            post.return_value = MagicMock(
+                json=lambda: {"message": {"content": '{"labels": ["t"], "primaryCategory": "t", "confidence": 0.9}'}}
+            )
+            result = service.classify_text("hi")
+
+        assert isinstance(service.http_client, httpx.Client)
+        assert result.primaryCategory == "t"
+        service.http_client.close()
+
+
 class TestModelRoutingIntegration:
-    def test_each_task_uses_different_model(self, mock_http_client, mock_router):
-        service = AIService(http_client=mock_http_client, router=mock_router)
+    def test_each_task_uses_different_model(self, mock_http_client, mock_router, backends):
+        service = AIService(http_client=mock_http_client, router=mock_router, backends=backends)
 
         tasks_and_models = [
             (lambda: service.classify_text("text"), "gemma3:4b"),
@@ -345,3 +384,1395 @@ class TestJsonParsingEdgeCases:
         assert "labels" in prompt
         assert "primaryCategory" in prompt
         assert "confidence" in prompt
+
+
+class PostBackedStream:
+    """Serves ``client.stream`` from the mocked ``client.post`` so one stub covers both transports."""
+
+    def __init__(self, post, url, headers, json, **kwargs):
+        self._post = post
+        self._request = (url, headers, json, kwargs)
+        self._content = ""
+
+    async def __aenter__(self):
+        url, headers, body, kwargs = self._request
+        self._response = await self._post(url, headers=headers, json=body, **kwargs)
+        self._content = self._response.json()["message"]["content"]
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+    def raise_for_status(self):
+        self._response.raise_for_status()
+
+    async def aiter_lines(self):
+        yield json.dumps({"message": {"content": self._content}, "done": False})
+        yield json.dumps({"message": {"content": ""}, "done": True})
+
+
+@pytest.fixture
+def mock_async_http_client():
+    client = MagicMock()
+    client.post = AsyncMock()
+    client.stream = MagicMock(
+        side_effect=lambda method, url, **kwargs: PostBackedStream(client.post, url, **kwargs)
+    )
+    return client
+
+
+@pytest.fixture
+def async_ai_service(mock_async_http_client, mock_router, backends):
+    return AsyncAIService(http_client=mock_async_http_client, router=mock_router, backends=backends)
+
+
+def _setup_async_chat_response(mock_async_http_client, response_text: str):
+    mock_async_http_client.post.return_value = _chat_response(response_text)
+
+
+class TestAsyncAIService:
+    @pytest.mark.asyncio
+    async def test_classify_text(self, async_ai_service, mock_async_http_client):
+        _setup_async_chat_response(
+            mock_async_http_client,
+            '{"labels": ["technology"], "primaryCategory": "technology", "confidence": 0.95}',
+        )
+
+        result = await async_ai_service.classify_text("AI is transforming healthcare")
+
+        assert result.primaryCategory == "technology"
+        body = mock_async_http_client.post.call_args.kwargs["json"]
+        assert body["model"] == "gemma3:4b"
+        assert "AI is transforming healthcare" in body["messages"][0]["content"]
+
+    @pytest.mark.asyncio
+    async def test_each_task_uses_routed_model(self, async_ai_service, mock_async_http_client):
+        cases = [
+            (async_ai_service.analyze_sentiment, "ministral-3:3b",
+             '{"overallSentiment": "neutral", "sentimentScore": 0.0, "emotions": [], "confidence": 0.5}'),
+            (async_ai_service.summarize_text, "ministral-3:8b",
+             '{"summary": "s", "keyPoints": ["p"], "wordCount": 1}'),
+            (async_ai_service.detect_intent, "gemma3:12b",
+             '{"primaryIntent": "i", "secondaryIntents": [], "intentCategory": "statement", "confidence": 0.5}'),
+        ]
+
+        for task_fn, expected_model, response_text in cases:
+            _setup_async_chat_response(mock_async_http_client, response_text)
+            await task_fn("text")
+
+            body = mock_async_http_client.post.call_args.kwargs["json"]
+            assert body["model"] == expected_model
+
+    @pytest.mark.asyncio
+    async def test_invalid_json_raises_exception(self, async_ai_service, mock_async_http_client):
+        _setup_async_chat_response(mock_async_http_client, "This is not valid JSON")
+
+        with pytest.raises(RuntimeError, match="Failed to parse AI response as JSON"):
+            await async_ai_service.classify_text("some text")
+
+    @pytest.mark.asyncio
+    async def test_missing_http_client_raises(self, mock_router, backends):
+        service = AsyncAIService(router=mock_router, backends=backends)
+
+        with pytest.raises(RuntimeError, match="no HTTP client"):
+            await service.classify_text("some text")
+
+
+class TestAsyncResponseCache:
+    CLASSIFY_JSON = '{"labels": ["t"], "primaryCategory": "t", "confidence": 0.9}'
+
+    @pytest.mark.asyncio
+    async def test_repeated_text_is_served_from_cache(self, mock_async_http_client, mock_router, backends):
+        cache = ResponseCache(max_entries=10, ttl_seconds=60)
+        service = AsyncAIService(http_client=mock_async_http_client, router=mock_router, cache=cache, backends=backends)
+        _setup_async_chat_response(mock_async_http_client, self.CLASSIFY_JSON)
+
+        first = await service.classify_text("same text")
+        second = await service.classify_text("same text")
+
+        assert first == second
+        assert mock_async_http_client.post.await_count == 1
+        assert cache.hits == 1
+
+    @pytest.mark.asyncio
+    async def test_tasks_do_not_share_entries(self, mock_async_http_client, mock_router, backends):
+        cache = ResponseCache(max_entries=10, ttl_seconds=60)
+        service = AsyncAIService(http_client=mock_async_http_client, router=mock_router, cache=cache, backends=backends)
+        _setup_async_chat_response(mock_async_http_client, self.CLASSIFY_JSON)
+        await service.classify_text("same text")
+        _setup_async_chat_response(
+            mock_async_http_client,
+            '{"overallSentiment": "neutral", "sentimentScore": 0.0, "emotions": [], "confidence": 0.5}',
+        )
+
+        result = await service.analyze_sentiment("same text")
+
+        assert result.overallSentiment == "neutral"
+        assert mock_async_http_client.post.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_rerouted_task_misses_cache(self, mock_async_http_client, backends):
+        router = MagicMock(spec=ModelRouter)
+        router.get_model.return_value = "gemma3:4b"
+        cache = ResponseCache(max_entries=10, ttl_seconds=60)
+        service = AsyncAIService(http_client=mock_async_http_client, router=router, cache=cache, backends=backends)
+        _setup_async_chat_response(mock_async_http_client, self.CLASSIFY_JSON)
+        await service.classify_text("same text")
+
+        router.get_model.return_value = "gemma3:12b"
+        await service.classify_text("same text")
+
+        assert mock_async_http_client.post.await_count == 2
+        body = mock_async_http_client.post.call_args.kwargs["json"]
+        assert body["model"] == "gemma3:12b"
+
+    @pytest.mark.asyncio
+    async def test_parse_failure_is_not_cached(self, mock_async_http_client, mock_router, backends):
+        cache = ResponseCache(max_entries=10, ttl_seconds=60)
+        service = AsyncAIService(http_client=mock_async_http_client, router=mock_router, cache=cache, backends=backends)
+        _setup_async_chat_response(mock_async_http_client, "not json")
+
+        with pytest.raises(RuntimeError):
+            await service.classify_text("same text")
+
+        assert len(cache) == 0
+
+
+class TestAsyncPersistentCache:
+    @pytest.mark.asyncio
+    async def test_persistent_hit_skips_model_and_warms_memory(
+        self, mock_async_http_client, mock_router, tmp_path, backends
+    ):
+        persistent = PersistentResultCache(str(tmp_path / "results.sqlite3"), max_entries=10, ttl_seconds=60)
+        _setup_async_chat_response(
+            mock_async_http_client, '{"labels": ["t"], "primaryCategory": "t", "confidence": 0.9}'
+        )
+        writer = AsyncAIService(
+            http_client=mock_async_http_client, router=mock_router, persistent_cache=persistent, backends=backends
+        )
+        await writer.classify_text("same text")
+
+        memory = ResponseCache(max_entries=10, ttl_seconds=60)
+        restarted = AsyncAIService(
+            http_client=mock_async_http_client,
+            router=mock_router,
+            cache=memory,
+            persistent_cache=persistent,
+            backends=backends,
+        )
+        result = await restarted.classify_text("same text")
+
+        assert result.primaryCategory == "t"
+        assert mock_async_http_client.post.await_count == 1
+        assert len(memory) == 1
+
+
+class TestAsyncRequestCoalescing:
+    @pytest.mark.asyncio
+    async def test_identical_concurrent_requests_share_upstream_call(self, async_ai_service, mock_async_http_client):
+        release = asyncio.Event()
+        mock_response = MagicMock()
+        mock_response.json.return_value = {
+            "message": {"content": '{"labels": ["t"], "primaryCategory": "t", "confidence": 0.9}'}
+        }
+
+        async def slow_post(*args, **kwargs):
+            await release.wait()
+            return mock_response
+
+        mock_async_http_client.post.side_effect = slow_post
+
+        pending = [asyncio.create_task(async_ai_service.classify_text("same text")) for _ in range(3)]
+        await asyncio.sleep(0)
+        release.set()
+        results = await asyncio.gather(*pending)
+
+        assert all(r.primaryCategory == "t" for r in results)
+        assert mock_async_http_client.post.await_count == 1
+        assert async_ai_service.metrics()["coalescedRequests"] == 2
+
+
+class TestAsyncAnalyzeText:
+    RESPONSES = {
+        "gemma3:4b": '{"labels": ["t"], "primaryCategory": "t", "confidence": 0.9}',
+        "ministral-3:3b": '{"overallSentiment": "neutral", "sentimentScore": 0.0, "emotions": [], "confidence": 0.5}',
+        "ministral-3:8b": '{"summary": "s", "keyPoints": ["p"], "wordCount": 1}',
+        "gemma3:12b": (
+            '{"primaryIntent": "i", "secondaryIntents": [], "intentCategory": "statement", "confidence": 0.5}'
+        ),
+    }
+
+    def _route_responses(self, mock_async_http_client, overrides=None):
+        responses = {**self.RESPONSES, **(overrides or {})}
+
+        async def post(url, headers, json, **kwargs):
+            mock_response = MagicMock()
+            mock_response.json.return_value = {"message": {"content": responses[json["model"]]}}
+            return mock_response
+
+        mock_async_http_client.post.side_effect = post
+
+    @pytest.mark.asyncio
+    async def test_runs_all_requested_tasks_on_their_models(self, async_ai_service, mock_async_http_client):
+        self._route_responses(mock_async_http_client)
+
+        result = await async_ai_service.analyze_text("text", list(TaskType))
+
+        assert result.classify.primaryCategory == "t"
+        assert result.sentiment.overallSentiment == "neutral"
+        assert result.summarize.summary == "s"
+        assert result.intent.primaryIntent == "i"
+        assert result.errors == {}
+        models = {call.kwargs["json"]["model"] for call in mock_async_http_client.post.call_args_list}
+        assert models == set(self.RESPONSES)
+
+    @pytest.mark.asyncio
+    async def test_subset_of_tasks(self, async_ai_service, mock_async_http_client):
+        self._route_responses(mock_async_http_client)
+
+        result = await async_ai_service.analyze_text("text", [TaskType.SENTIMENT])
+
+        assert result.sentiment is not None
+        assert result.classify is None
+        assert mock_async_http_client.post.await_count == 1
+
+    @pytest.mark.asyncio
+    async def test_failed_task_is_reported_without_failing_others(self, async_ai_service, mock_async_http_client):
+        self._route_responses(mock_async_http_client, {"ministral-3:8b": "not json"})
+
+        result = await async_ai_service.analyze_text("text", list(TaskType))
+
+        assert result.summarize is None
+        assert "Failed to parse AI response as JSON" in result.errors["summarize"]
+        assert result.classify is not None
+
+
+@pytest.fixture
+def shared_model_router():
+    router = MagicMock(spec=ModelRouter)
+    router.get_model.return_value = "gemma3:4b"
+    router.group_by_model.side_effect = lambda tasks, model_for=None: ModelRouter.group_by_model(
+        router, tasks, model_for
+    )
+    router.get_fallback_model.return_value = None
+    router.get_cascade_model.return_value = None
+    return router
+
+
+class TestAsyncCombinedPrompt:
+    COMBINED_JSON = (
+        '{"classify": {"labels": ["t"], "primaryCategory": "t", "confidence": 0.9}, '
+        '"sentiment": {"overallSentiment": "neutral", "sentimentScore": 0.0, "emotions": [], "confidence": 0.5}}'
+    )
+
+    @pytest.mark.asyncio
+    async def test_tasks_on_same_model_share_one_prompt(self, mock_async_http_client, shared_model_router, backends):
+        service = AsyncAIService(http_client=mock_async_http_client, router=shared_model_router, backends=backends)
+        _setup_async_chat_response(mock_async_http_client, self.COMBINED_JSON)
+
+        result = await service.analyze_text("text", [TaskType.CLASSIFY, TaskType.SENTIMENT])
+
+        assert result.classify.primaryCategory == "t"
+        assert result.sentiment.overallSentiment == "neutral"
+        assert mock_async_http_client.post.await_count == 1
+        prompt = mock_async_http_client.post.call_args.kwargs["json"]["messages"][0]["content"]
+        assert "- classify:" in prompt and "- sentiment:" in prompt
+        assert service.metrics()["combinedPrompts"] == 1
+
+    @pytest.mark.asyncio
+    async def test_invalid_section_falls_back_to_single_call(
+        self, mock_async_http_client, shared_model_router, backends
+    ):
+        service = AsyncAIService(http_client=mock_async_http_client, router=shared_model_router, backends=backends)
+        single = MagicMock()
+        single.json.return_value = {
+            "message": {
+                "content": '{"overallSentiment": "positive", "sentimentScore": 0.5, "emotions": [], "confidence": 0.8}'
+            }
+        }
+        combined = MagicMock()
+        combined.json.return_value = {
+            "message": {"content": '{"classify": {"labels": ["t"], "primaryCategory": "t", "confidence": 0.9}}'}
+        }
+        mock_async_http_client.post.side_effect = [combined, single]
+
+        result = await service.analyze_text("text", [TaskType.CLASSIFY, TaskType.SENTIMENT])
+
+        assert result.classify.primaryCategory == "t"
+        assert result.sentiment.overallSentiment == "positive"
+        assert mock_async_http_client.post.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_combined_results_fill_per_task_cache(self, mock_async_http_client, shared_model_router, backends):
+        cache = ResponseCache(max_entries=10, ttl_seconds=60)
+        service = AsyncAIService(
+            http_client=mock_async_http_client, router=shared_model_router, cache=cache, backends=backends
+        )
+        _setup_async_chat_response(mock_async_http_client, self.COMBINED_JSON)
+        await service.analyze_text("text", [TaskType.CLASSIFY, TaskType.SENTIMENT])
+
+        result = await service.classify_text("text")
+
+        assert result.primaryCategory == "t"
+        assert mock_async_http_client.post.await_count == 1
+
+    @pytest.mark.asyncio
+    async def test_failed_combined_call_keeps_cached_tasks(self, mock_async_http_client, shared_model_router, backends):
+        cache = ResponseCache(max_entries=10, ttl_seconds=60)
+        service = AsyncAIService(
+            http_client=mock_async_http_client, router=shared_model_router, cache=cache, backends=backends
+        )
+        service.retry_policy = RetryPolicy(max_attempts=1, base_delay=0, max_delay=0, repair_prompts=False)
+        _setup_async_chat_response(
+            mock_async_http_client, '{"labels": ["t"], "primaryCategory": "t", "confidence": 0.9}'
+        )
+        await service.classify_text("text")
+
+        async def post(url, headers, json, **kwargs):
+            prompt = json["messages"][0]["content"]
+            if "- sentiment:" in prompt:
+                raise httpx.ConnectError("refused")
+            if "overallSentiment" in prompt:
+                return _chat_response(
+                    '{"overallSentiment": "positive", "sentimentScore": 0.5, "emotions": [], "confidence": 0.8}'
+                )
+            return _chat_response("not json")
+
+        mock_async_http_client.post.side_effect = post
+
+        result = await service.analyze_text("text", [TaskType.CLASSIFY, TaskType.SENTIMENT, TaskType.INTENT])
+
+        assert result.classify.primaryCategory == "t"
+        assert result.sentiment.overallSentiment == "positive"
+        assert list(result.errors) == ["intent"]
+
+    @pytest.mark.asyncio
+    async def test_disabled_sends_one_prompt_per_task(self, mock_async_http_client, shared_model_router, backends):
+        service = AsyncAIService(http_client=mock_async_http_client, router=shared_model_router, backends=backends)
+        service.combine_tasks = False
+        service.retry_policy.repair_prompts = False
+        _setup_async_chat_response(
+            mock_async_http_client, '{"labels": ["t"], "primaryCategory": "t", "confidence": 0.9}'
+        )
+
+        await service.analyze_text("text", [TaskType.CLASSIFY, TaskType.SENTIMENT])
+
+        assert mock_async_http_client.post.await_count == 2
+
+
+class TestAsyncRunBatch:
+    @pytest.mark.asyncio
+    async def test_results_in_input_order_with_dedupe(self, async_ai_service, mock_async_http_client):
+        async def post(url, headers, json, **kwargs):
+            prompt = json["messages"][0]["content"]
+            label = "good" if "Great" in prompt else "bad"
+            mock_response = MagicMock()
+            mock_response.json.return_value = {
+                "message": {"content": f'{{"labels": ["{label}"], "primaryCategory": "{label}", "confidence": 0.9}}'}
+            }
+            return mock_response
+
+        mock_async_http_client.post.side_effect = post
+
+        batch = await async_ai_service.run_batch(TaskType.CLASSIFY, ["Great", "Awful", "Great"])
+
+        assert [item.result.primaryCategory for item in batch.results] == ["good", "bad", "good"]
+        assert [item.index for item in batch.results] == [0, 1, 2]
+        assert batch.uniqueTexts == 2
+        assert batch.succeeded == 3
+        assert mock_async_http_client.post.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_failed_item_does_not_fail_batch(self, async_ai_service, mock_async_http_client):
+        async_ai_service.retry_policy.repair_prompts = False
+
+        async def post(url, headers, json, **kwargs):
+            prompt = json["messages"][0]["content"]
+            content = "not json" if "bad input" in prompt else '{"summary": "s", "keyPoints": [], "wordCount": 1}'
+            mock_response = MagicMock()
+            mock_response.json.return_value = {"message": {"content": content}}
+            return mock_response
+
+        mock_async_http_client.post.side_effect = post
+
+        batch = await async_ai_service.run_batch(TaskType.SUMMARIZE, ["ok", "bad input"])
+
+        assert batch.results[0].result.summary == "s"
+        assert batch.results[1].result is None
+        assert "Failed to parse AI response as JSON" in batch.results[1].error
+        assert batch.failed == 1
+
+    @pytest.mark.asyncio
+    async def test_concurrency_is_bounded(self, async_ai_service, mock_async_http_client):
+        async_ai_service.batch_concurrency = 2
+        active = 0
+        peak = 0
+
+        async def post(url, headers, json, **kwargs):
+            nonlocal active, peak
+            active += 1
+            peak = max(peak, active)
+            await asyncio.sleep(0.01)
+            active -= 1
+            mock_response = MagicMock()
+            mock_response.json.return_value = {
+                "message": {"content": '{"labels": [], "primaryCategory": "x", "confidence": 0.5}'}
+            }
+            return mock_response
+
+        mock_async_http_client.post.side_effect = post
+
+        await async_ai_service.run_batch(TaskType.CLASSIFY, [f"text {i}" for i in range(6)])
+
+        assert peak == 2
+
+
+class FakeStreamResponse:
+    def __init__(self, lines):
+        self._lines = lines
+        self.raise_for_status = MagicMock()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+    async def aiter_lines(self):
+        for line in self._lines:
+            yield line
+
+
+def _stream_lines(*fragments):
+    lines = [json.dumps({"message": {"content": f}, "done": False}) for f in fragments]
+    lines.append(json.dumps({"message": {"content": ""}, "done": True}))
+    return lines
+
+
+class TestAsyncStreamTask:
+    @pytest.mark.asyncio
+    async def test_tokens_then_parsed_result(self, async_ai_service, mock_async_http_client):
+        mock_async_http_client.stream = MagicMock(
+            return_value=FakeStreamResponse(
+                _stream_lines('{"summary": "s", ', '"keyPoints": ["p"], ', '"wordCount": 1}')
+            )
+        )
+
+        events = [event async for event in async_ai_service.stream_task(TaskType.SUMMARIZE, "long text")]
+
+        assert [name for name, _ in events] == ["token", "token", "token", "result"]
+        assert events[-1][1].summary == "s"
+        body = mock_async_http_client.stream.call_args.kwargs["json"]
+        assert body["stream"] is True
+        assert body["model"] == "ministral-3:8b"
+
+    @pytest.mark.asyncio
+    async def test_cached_answer_is_single_result_event(self, mock_async_http_client, mock_router, backends):
+        cache = ResponseCache(max_entries=10, ttl_seconds=60)
+        service = AsyncAIService(http_client=mock_async_http_client, router=mock_router, cache=cache, backends=backends)
+        mock_async_http_client.stream = MagicMock(
+            return_value=FakeStreamResponse(_stream_lines('{"summary": "s", "keyPoints": [], "wordCount": 1}'))
+        )
+        [event async for event in service.stream_task(TaskType.SUMMARIZE, "text")]
+
+        events = [event async for event in service.stream_task(TaskType.SUMMARIZE, "text")]
+
+        assert [name for name, _ in events] == ["result"]
+        assert mock_async_http_client.stream.call_count == 1
+
+    @pytest.mark.asyncio
+    async def test_unparseable_stream_raises(self, async_ai_service, mock_async_http_client):
+        mock_async_http_client.stream = MagicMock(return_value=FakeStreamResponse(_stream_lines("no json here")))
+
+        with pytest.raises(RuntimeError, match="Failed to parse AI response as JSON"):
+            [event async for event in async_ai_service.stream_task(TaskType.CLASSIFY, "text")]
+
+
+class TestAsyncEarlyStop:
+    @pytest.mark.asyncio
+    async def test_stream_closed_once_object_is_complete_without_format(
+        self, async_ai_service, mock_async_http_client
+    ):
+        async_ai_service.structured_output = False
+        lines = _stream_lines(
+            '```json\n{"labels": ["t"], "primaryCategory": "t", ',
+            '"confidence": 0.9}',
+            "\n```\nThis text is about...",
+            " a great many things",
+        )
+        consumed = []
+
+        class TrackingStream(FakeStreamResponse):
+            async def aiter_lines(self):
+                for line in lines:
+                    consumed.append(line)
+                    yield line
+
+        mock_async_http_client.stream = MagicMock(return_value=TrackingStream(lines))
+
+        result = await async_ai_service.classify_text("text")
+
+        assert result.primaryCategory == "t"
+        assert len(consumed) == 2
+        assert async_ai_service.metrics()["earlyStops"] == 1
+        assert "format" not in mock_async_http_client.stream.call_args.kwargs["json"]
+
+    @pytest.mark.asyncio
+    async def test_disabled_uses_single_non_streaming_request(self, async_ai_service, mock_async_http_client):
+        async_ai_service.early_stop = False
+        _setup_async_chat_response(
+            mock_async_http_client, '{"labels": ["t"], "primaryCategory": "t", "confidence": 0.9}'
+        )
+
+        await async_ai_service.classify_text("text")
+
+        mock_async_http_client.stream.assert_not_called()
+        assert mock_async_http_client.post.call_args.kwargs["json"]["stream"] is False
+
+    @pytest.mark.asyncio
+    async def test_structured_output_skips_early_stop(self, async_ai_service, mock_async_http_client):
+        _setup_async_chat_response(
+            mock_async_http_client, '{"labels": ["t"], "primaryCategory": "t", "confidence": 0.9}'
+        )
+
+        await async_ai_service.classify_text("text")
+
+        mock_async_http_client.stream.assert_not_called()
+        assert "format" in mock_async_http_client.post.call_args.kwargs["json"]
+        assert async_ai_service.metrics()["earlyStops"] == 0
+
+    @pytest.mark.asyncio
+    async def test_task_options_sent_to_ollama(self, async_ai_service, mock_async_http_client):
+        _setup_async_chat_response(mock_async_http_client, '{"summary": "s", "keyPoints": [], "wordCount": 1}')
+
+        await async_ai_service.summarize_text("text")
+
+        options = mock_async_http_client.post.call_args.kwargs["json"]["options"]
+        assert options["num_predict"] == 1024
+        assert "stop" not in options
+        assert options["temperature"] == async_ai_service.temperature
+
+    @pytest.mark.asyncio
+    async def test_prose_before_fenced_json_is_not_cut_off(self, async_ai_service, mock_async_http_client):
+        async_ai_service.early_stop = False
+        answer = 'Here is the JSON:\n```json\n{"labels": ["t"], "primaryCategory": "t", "confidence": 0.9}\n```'
+        _setup_async_chat_response(mock_async_http_client, answer)
+
+        result = await async_ai_service.classify_text("text")
+
+        options = mock_async_http_client.post.call_args.kwargs["json"]["options"]
+        stops = options.get("stop", [])
+        assert not any(stop in answer[: answer.index("{")] for stop in stops)
+        assert result.primaryCategory == "t"
+
+    @pytest.mark.asyncio
+    async def test_combined_prompt_sums_output_caps(self, mock_async_http_client, shared_model_router, backends):
+        service = AsyncAIService(http_client=mock_async_http_client, router=shared_model_router, backends=backends)
+        _setup_async_chat_response(mock_async_http_client, TestAsyncCombinedPrompt.COMBINED_JSON)
+
+        await service.analyze_text("text", [TaskType.CLASSIFY, TaskType.SENTIMENT])
+
+        options = mock_async_http_client.post.call_args.kwargs["json"]["options"]
+        assert options["num_predict"] == 512
+
+
+class TestStructuredOutput:
+    @pytest.mark.asyncio
+    async def test_dto_schema_sent_as_format(self, async_ai_service, mock_async_http_client):
+        _setup_async_chat_response(
+            mock_async_http_client,
+            '{"overallSentiment": "neutral", "sentimentScore": 0.0, "emotions": [], "confidence": 0.5}',
+        )
+
+        await async_ai_service.analyze_sentiment("text")
+
+        response_format = mock_async_http_client.post.call_args.kwargs["json"]["format"]
+        assert response_format == SentimentResponse.model_json_schema()
+        assert set(response_format["required"]) == {"overallSentiment", "sentimentScore", "emotions", "confidence"}
+
+    @pytest.mark.asyncio
+    async def test_combined_prompt_schema_nests_each_task(self, mock_async_http_client, shared_model_router, backends):
+        service = AsyncAIService(http_client=mock_async_http_client, router=shared_model_router, backends=backends)
+        _setup_async_chat_response(mock_async_http_client, TestAsyncCombinedPrompt.COMBINED_JSON)
+
+        await service.analyze_text("text", [TaskType.CLASSIFY, TaskType.SENTIMENT])
+
+        response_format = mock_async_http_client.post.call_args.kwargs["json"]["format"]
+        assert response_format["required"] == ["classify", "sentiment"]
+        assert response_format["properties"]["classify"] == ClassificationResponse.model_json_schema()
+
+    @pytest.mark.asyncio
+    async def test_disabled_sends_no_format(self, async_ai_service, mock_async_http_client):
+        async_ai_service.structured_output = False
+        _setup_async_chat_response(
+            mock_async_http_client, '{"labels": ["t"], "primaryCategory": "t", "confidence": 0.9}'
+        )
+
+        await async_ai_service.classify_text("text")
+
+        assert "format" not in mock_async_http_client.post.call_args.kwargs["json"]
+
+    def test_sync_service_sends_format(self, ai_service, mock_http_client):
+        _setup_chat_response(mock_http_client, '{"labels": ["t"], "primaryCategory": "t", "confidence": 0.9}')
+
+        ai_service.classify_text("text")
+
+        body = mock_http_client.post.call_args.kwargs["json"]
+        assert body["format"] == ClassificationResponse.model_json_schema()
+
+
+class TestJsonRecovery:
+    @pytest.mark.asyncio
+    async def test_recovers_prose_wrapped_response(self, async_ai_service, mock_async_http_client):
+        async_ai_service.early_stop = False
+        _setup_async_chat_response(
+            mock_async_http_client,
+            "Here is the analysis:\n{'overallSentiment': 'positive', 'sentimentScore': '0.8', "
+            "'emotions': ['joy',], 'confidence': 0.9}\nHope that helps!",
+        )
+
+        result = await async_ai_service.analyze_sentiment("text")
+
+        assert result.sentimentScore == 0.8
+        repairs = async_ai_service.metrics()["jsonRepairs"]
+        assert repairs["recovered_responses"] == 1
+        assert repairs["single_quotes"] == 1
+
+    def test_sync_service_recovers_trailing_comma(self, ai_service, mock_http_client):
+        _setup_chat_response(
+            mock_http_client, '{"labels": ["a",], "primaryCategory": "a", "confidence": 0.7,}'
+        )
+
+        result = ai_service.classify_text("text")
+
+        assert result.labels == ["a"]
+
+    @pytest.mark.asyncio
+    async def test_combined_sections_are_coerced(self, mock_async_http_client, shared_model_router, backends):
+        service = AsyncAIService(http_client=mock_async_http_client, router=shared_model_router, backends=backends)
+        _setup_async_chat_response(
+            mock_async_http_client,
+            '{"classify": {"labels": "a, b", "primaryCategory": "a", "confidence": "0.9"}, '
+            '"sentiment": {"overallSentiment": "neutral", "sentimentScore": 0, "emotions": [], "confidence": 0.5}}',
+        )
+
+        result = await service.analyze_text("text", [TaskType.CLASSIFY, TaskType.SENTIMENT])
+
+        assert result.classify.labels == ["a", "b"]
+        assert mock_async_http_client.post.await_count == 1
+        assert service.metrics()["jsonRepairs"]["coerced_lists"] == 1
+
+
+class TestAsyncRetries:
+    CLASSIFY_JSON = '{"labels": ["t"], "primaryCategory": "t", "confidence": 0.9}'
+
+    @pytest.fixture(autouse=True)
+    def no_backoff(self, async_ai_service):
+        async_ai_service.early_stop = False
+        async_ai_service.retry_policy = RetryPolicy(max_attempts=3, base_delay=0, max_delay=0)
+
+    @pytest.mark.asyncio
+    async def test_transient_error_is_retried(self, async_ai_service, mock_async_http_client):
+        mock_async_http_client.post.side_effect = [httpx.ConnectError("refused"), _chat_response(self.CLASSIFY_JSON)]
+
+        result = await async_ai_service.classify_text("text")
+
+        assert result.primaryCategory == "t"
+        assert mock_async_http_client.post.await_count == 2
+        assert async_ai_service.metrics()["retries"] == {"classify": {"upstream": 1}}
+
+    @pytest.mark.asyncio
+    async def test_gives_up_after_max_attempts(self, async_ai_service, mock_async_http_client):
+        mock_async_http_client.post.side_effect = httpx.ReadTimeout("slow")
+
+        with pytest.raises(httpx.ReadTimeout):
+            await async_ai_service.classify_text("text")
+
+        assert mock_async_http_client.post.await_count == 3
+
+    @pytest.mark.asyncio
+    async def test_client_errors_are_not_retried(self, async_ai_service, mock_async_http_client):
+        request = httpx.Request("POST", "http://ollama/api/chat")
+        error = httpx.HTTPStatusError("bad request", request=request, response=httpx.Response(400, request=request))
+        mock_async_http_client.post.side_effect = error
+
+        with pytest.raises(httpx.HTTPStatusError):
+            await async_ai_service.classify_text("text")
+
+        assert mock_async_http_client.post.await_count == 1
+
+    @pytest.mark.asyncio
+    async def test_exhausted_budget_stops_retries(self, async_ai_service, mock_async_http_client):
+        async_ai_service.retry_budget = RetryBudget(ratio=0.0, max_tokens=1)
+        mock_async_http_client.post.side_effect = httpx.ConnectError("refused")
+
+        with pytest.raises(httpx.ConnectError):
+            await async_ai_service.classify_text("text")
+
+        assert mock_async_http_client.post.await_count == 2
+        assert async_ai_service.metrics()["retryBudget"]["exhausted"] == 1
+
+    @pytest.mark.asyncio
+    async def test_unparseable_output_is_sent_back_for_repair(self, async_ai_service, mock_async_http_client):
+        mock_async_http_client.post.side_effect = [
+            _chat_response("labels are t, category t"),
+            _chat_response(self.CLASSIFY_JSON),
+        ]
+
+        result = await async_ai_service.classify_text("original text")
+
+        assert result.primaryCategory == "t"
+        repair_prompt = mock_async_http_client.post.call_args.kwargs["json"]["messages"][0]["content"]
+        assert "labels are t, category t" in repair_prompt
+        assert "original text" not in repair_prompt
+        assert async_ai_service.metrics()["retries"] == {"classify": {"repair": 1}}
+
+    @pytest.mark.asyncio
+    async def test_repair_disabled_raises_parse_error(self, async_ai_service, mock_async_http_client):
+        async_ai_service.retry_policy.repair_prompts = False
+        mock_async_http_client.post.return_value = _chat_response("not json")
+
+        with pytest.raises(RuntimeError, match="Failed to parse AI response as JSON"):
+            await async_ai_service.classify_text("text")
+
+        assert mock_async_http_client.post.await_count == 1
+
+
+class TestUpstreamTimeouts:
+    @pytest.mark.asyncio
+    async def test_read_timeout_follows_task(self, async_ai_service, mock_async_http_client):
+        async_ai_service.early_stop = False
+        _setup_async_chat_response(mock_async_http_client, '{"summary": "s", "keyPoints": [], "wordCount": 1}')
+
+        await async_ai_service.summarize_text("text")
+
+        kwargs = mock_async_http_client.post.call_args.kwargs
+        assert kwargs["timeout"].read == 180.0
+        assert kwargs["timeout"].connect == 5.0
+        assert callable(kwargs["extensions"]["trace"])
+
+    def test_combined_prompt_uses_slowest_task(self):
+        timeout = AsyncAIService._timeout([TaskType.CLASSIFY, TaskType.SUMMARIZE])
+
+        assert timeout.read == 180.0
+
+    def test_sync_service_sets_timeout_per_request(self, ai_service, mock_http_client):
+        _setup_chat_response(mock_http_client, '{"labels": ["t"], "primaryCategory": "t", "confidence": 0.9}')
+
+        ai_service.classify_text("text")
+
+        assert mock_http_client.post.call_args.kwargs["timeout"].read == 60.0
+
+    def test_pool_wait_in_metrics(self, async_ai_service):
+        assert async_ai_service.metrics()["poolWait"]["requests"] == 0
+
+
+class TestBackendPoolIntegration:
+    @pytest.mark.asyncio
+    async def test_requests_go_to_leased_host(self, mock_async_http_client, mock_router):
+        pool = BackendPool(["http://gpu-1:11434", "http://gpu-2:11434"], hosts_per_model=1)
+        service = AsyncAIService(http_client=mock_async_http_client, router=mock_router, backends=pool)
+        _setup_async_chat_response(mock_async_http_client, '{"summary": "s", "keyPoints": [], "wordCount": 1}')
+
+        await service.summarize_text("text")
+
+        url = mock_async_http_client.post.call_args.args[0]
+        assert url == f"{pool.preferred('ministral-3:8b')[0].url}/api/chat"
+        stats = {s["url"]: s for s in pool.stats()}
+        assert stats[pool.preferred("ministral-3:8b")[0].url]["requests"] == 1
+        assert all(s["outstanding"] == 0 and s["failures"] == 0 for s in stats.values())
+
+    @pytest.mark.asyncio
+    async def test_upstream_failure_counts_against_host(self, mock_async_http_client, mock_router):
+        pool = BackendPool(["http://gpu-1:11434"])
+        service = AsyncAIService(http_client=mock_async_http_client, router=mock_router, backends=pool)
+        service.retry_policy = RetryPolicy(max_attempts=1, base_delay=0, max_delay=0)
+        mock_async_http_client.post.side_effect = httpx.ConnectError("refused")
+
+        with pytest.raises(httpx.ConnectError):
+            await service.classify_text("text")
+
+        assert pool.stats()[0]["failures"] == 1
+
+
+class TestBulkheads:
+    @pytest.mark.asyncio
+    async def test_calls_are_counted_per_model(self, async_ai_service, mock_async_http_client):
+        _setup_async_chat_response(
+            mock_async_http_client, '{"labels": ["t"], "primaryCategory": "t", "confidence": 0.9}'
+        )
+
+        await async_ai_service.classify_text("text")
+
+        bulkheads = async_ai_service.metrics()["bulkheads"]
+        assert bulkheads["gemma3:4b"]["completed"] == 1
+        assert bulkheads["gemma3:4b"]["active"] == 0
+
+    @pytest.mark.asyncio
+    async def test_full_bulkhead_rejects_without_calling_upstream(self, async_ai_service, mock_async_http_client):
+        bulkhead = async_ai_service.bulkheads["gemma3:4b"] = Bulkhead(
+            "gemma3:4b", limit=1, max_queue=0, queue_timeout=1
+        )
+        bulkhead.active = 1
+
+        with pytest.raises(BulkheadFullError) as exc_info:
+            await async_ai_service.classify_text("text")
+
+        assert exc_info.value.status_code == 429
+        mock_async_http_client.post.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_disabled_bulkheads_are_not_created(self, async_ai_service, mock_async_http_client):
+        async_ai_service.bulkheads_enabled = False
+        _setup_async_chat_response(
+            mock_async_http_client, '{"labels": ["t"], "primaryCategory": "t", "confidence": 0.9}'
+        )
+
+        await async_ai_service.classify_text("text")
+
+        assert async_ai_service.bulkheads == {}
+
+    @pytest.mark.asyncio
+    async def test_queue_wait_is_tracked_per_priority_class(self, async_ai_service, mock_async_http_client):
+        async_ai_service.priorities = PriorityClasses({"interactive": 8, "batch": 1}, "batch")
+        _setup_async_chat_response(
+            mock_async_http_client, '{"labels": ["t"], "primaryCategory": "t", "confidence": 0.9}'
+        )
+
+        await async_ai_service.classify_text("text")
+        token = request_priority.set(async_ai_service.priorities.resolve("interactive"))
+        try:
+            await async_ai_service.classify_text("other text")
+        finally:
+            request_priority.reset(token)
+
+        priorities = async_ai_service.metrics()["priorities"]
+        assert priorities["default"] == "batch"
+        assert priorities["queueWait"]["batch"]["samples"] == 1
+        assert priorities["queueWait"]["interactive"]["samples"] == 1
+
+
+class TestTokenScheduling:
+    CLASSIFY_JSON = '{"labels": ["t"], "primaryCategory": "t", "confidence": 0.9}'
+
+    @pytest.fixture
+    def service(self, async_ai_service):
+        async_ai_service.token_scheduling = True
+        return async_ai_service
+
+    @pytest.mark.asyncio
+    async def test_reported_usage_is_learned(self, service, mock_async_http_client):
+        service.early_stop = False
+        mock_response = MagicMock()
+        mock_response.json.return_value = {
+            "message": {"content": self.CLASSIFY_JSON},
+            "prompt_eval_count": 80,
+            "prompt_eval_duration": 10**8,
+            "eval_count": 24,
+            "eval_duration": 10**9,
+        }
+        mock_async_http_client.post.return_value = mock_response
+
+        await service.classify_text("text")
+
+        stats = service.metrics()["tokenScheduler"]["gemma3:4b"]
+        assert stats["learnedCalls"] == 1
+        assert stats["decodeTokens"] == {"classify": 24}
+        assert stats["inFlight"] == 0
+
+    @pytest.mark.asyncio
+    async def test_early_stopped_stream_counts_streamed_tokens(self, service, mock_async_http_client):
+        service.structured_output = False
+        _setup_async_chat_response(mock_async_http_client, self.CLASSIFY_JSON)
+
+        await service.classify_text("text")
+
+        assert service.token_schedulers["gemma3:4b"].expected_decode("classify", 256) == 1
+
+    @pytest.mark.asyncio
+    async def test_exhausted_capacity_rejects_before_calling_upstream(self, service, mock_async_http_client):
+        scheduler = service.token_schedulers["gemma3:4b"] = TokenScheduler(
+            "gemma3:4b", tokens_per_second=1, burst_seconds=1, max_wait=1
+        )
+        await scheduler.admit("classify", prompt_tokens=0, max_tokens=100)
+
+        with pytest.raises(CapacityExceededError):
+            await service.classify_text("text")
+
+        mock_async_http_client.post.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_disabled_by_default(self, async_ai_service, mock_async_http_client):
+        _setup_async_chat_response(mock_async_http_client, self.CLASSIFY_JSON)
+
+        await async_ai_service.classify_text("text")
+
+        assert async_ai_service.metrics()["tokenScheduler"] == {}
+
+
+class TestMicroBatching:
+    @pytest.fixture
+    def service(self, async_ai_service, mock_async_http_client):
+        async_ai_service.micro_batching = True
+        async_ai_service.micro_batcher.max_wait = 0.01
+        async_ai_service.retry_policy.repair_prompts = False
+        return async_ai_service
+
+    @staticmethod
+    def _answer(mock_async_http_client, respond):
+        async def post(url, headers, json, **kwargs):
+            response = MagicMock()
+            response.json.return_value = {"message": {"content": respond(json)}}
+            return response
+
+        mock_async_http_client.post.side_effect = post
+
+    @staticmethod
+    def _classification(label: str) -> dict:
+        return {"labels": [label], "primaryCategory": label, "confidence": 0.9}
+
+    @pytest.mark.asyncio
+    async def test_concurrent_requests_share_one_prompt(self, service, mock_async_http_client):
+        self._answer(
+            mock_async_http_client,
+            lambda body: json.dumps({"results": [self._classification("a"), self._classification("b")]}),
+        )
+
+        first, second = await asyncio.gather(service.classify_text("text a"), service.classify_text("text b"))
+
+        assert (first.primaryCategory, second.primaryCategory) == ("a", "b")
+        assert mock_async_http_client.post.call_count == 1
+        body = mock_async_http_client.post.call_args.kwargs["json"]
+        prompt = body["messages"][0]["content"]
+        assert "Text 1: text a" in prompt and "Text 2: text b" in prompt
+        assert body["format"]["properties"]["results"]["minItems"] == 2
+        assert body["options"]["num_predict"] == 2 * 256
+        assert service.metrics()["microBatching"]["batches"] == 1
+
+    @pytest.mark.asyncio
+    async def test_invalid_answer_falls_back_to_single_call(self, service, mock_async_http_client):
+        def respond(body):
+            prompt = body["messages"][0]["content"]
+            if "numbered texts" in prompt:
+                return json.dumps({"results": [self._classification("a"), {"unexpected": True}]})
+            return json.dumps(self._classification("single"))
+
+        self._answer(mock_async_http_client, respond)
+
+        first, second = await asyncio.gather(service.classify_text("text a"), service.classify_text("text b"))
+
+        assert (first.primaryCategory, second.primaryCategory) == ("a", "single")
+        assert mock_async_http_client.post.call_count == 2
+        assert service.metrics()["microBatching"]["fallbacks"] == 1
+
+    @pytest.mark.asyncio
+    async def test_answer_count_mismatch_falls_back_for_all(self, service, mock_async_http_client):
+        def respond(body):
+            if "numbered texts" in body["messages"][0]["content"]:
+                return json.dumps([self._classification("only one")])
+            return json.dumps(self._classification("single"))
+
+        self._answer(mock_async_http_client, respond)
+
+        results = await asyncio.gather(service.classify_text("text a"), service.classify_text("text b"))
+
+        assert [r.primaryCategory for r in results] == ["single", "single"]
+        assert service.micro_batch_fallbacks == 2
+
+    @pytest.mark.asyncio
+    async def test_long_texts_are_not_batched(self, service, mock_async_http_client):
+        service.micro_batch_max_tokens = 10
+        self._answer(mock_async_http_client, lambda body: json.dumps(self._classification("x")))
+
+        await asyncio.gather(service.classify_text("x" * 400), service.classify_text("y" * 400))
+
+        assert mock_async_http_client.post.call_count == 2
+        assert service.metrics()["microBatching"]["batches"] == 0
+
+    @pytest.mark.asyncio
+    async def test_lone_request_uses_the_single_prompt(self, service, mock_async_http_client):
+        self._answer(mock_async_http_client, lambda body: json.dumps(self._classification("x")))
+
+        await service.classify_text("text")
+
+        prompt = mock_async_http_client.post.call_args.kwargs["json"]["messages"][0]["content"]
+        assert "numbered texts" not in prompt
+
+
+class TestMapReduceSummarization:
+    SUMMARY_JSON = '{"summary": "s", "keyPoints": ["p"], "wordCount": 1}'
+
+    @pytest.fixture
+    def service(self, async_ai_service, mock_async_http_client):
+        async_ai_service.summarize_chunk_tokens = 50
+        async_ai_service.cache = ResponseCache(max_entries=100, ttl_seconds=60)
+        _setup_async_chat_response(mock_async_http_client, self.SUMMARY_JSON)
+        return async_ai_service
+
+    @staticmethod
+    def _document(paragraphs: int) -> str:
+        return "\n\n".join(f"Paragraph {i} " + "word " * 30 for i in range(paragraphs))
+
+    @staticmethod
+    def _prompts(mock_async_http_client) -> list[str]:
+        return [call.kwargs["json"]["messages"][0]["content"] for call in mock_async_http_client.post.call_args_list]
+
+    @pytest.mark.asyncio
+    async def test_long_text_is_summarized_by_chunks_then_reduced(self, service, mock_async_http_client):
+        result = await service.summarize_text(self._document(3))
+
+        assert result.summary == "s"
+        prompts = self._prompts(mock_async_http_client)
+        chunk_prompts = [p for p in prompts if p.startswith("Summarize")]
+        reduce_prompts = [p for p in prompts if "summaries of consecutive parts" in p]
+        assert len(chunk_prompts) == 3
+        assert all("Paragraph" in p for p in chunk_prompts)
+        assert len(reduce_prompts) == 1
+        assert "Part 3 summary: s" in reduce_prompts[0]
+        assert service.metrics()["mapReduce"] == {
+            "chunkTokens": 50,
+            "documents": 1,
+            "chunks": 3,
+            "reusedChunks": 0,
+            "reduceCalls": 1,
+        }
+        assert (result.chunks, result.reusedChunks) == (3, 0)
+
+    @pytest.mark.asyncio
+    async def test_short_text_uses_one_prompt(self, service, mock_async_http_client):
+        await service.summarize_text("A short text.")
+
+        assert mock_async_http_client.post.call_count == 1
+        assert service.metrics()["mapReduce"]["documents"] == 0
+
+    @pytest.mark.asyncio
+    async def test_reduce_runs_in_levels_while_summaries_overflow(self, service, mock_async_http_client):
+        service.summarize_chunk_tokens = 120
+
+        await service.summarize_text(self._document(12))
+
+        reduce_prompts = [p for p in self._prompts(mock_async_http_client) if "consecutive parts" in p]
+        assert len(reduce_prompts) > 1
+        assert service.map_reduce["reduceCalls"] == len(reduce_prompts)
+
+    @pytest.mark.asyncio
+    async def test_reduce_depth_limits_levels(self, service, mock_async_http_client):
+        service.summarize_chunk_tokens = 120
+        service.summarize_reduce_depth = 1
+
+        await service.summarize_text(self._document(12))
+
+        reduce_prompts = [p for p in self._prompts(mock_async_http_client) if "consecutive parts" in p]
+        assert len(reduce_prompts) == 1
+        assert f"Part {service.map_reduce['chunks']} summary" in reduce_prompts[0]
+
+    @pytest.mark.asyncio
+    async def test_repeat_document_is_served_from_cache(self, service, mock_async_http_client):
+        document = self._document(3)
+        await service.summarize_text(document)
+        calls = mock_async_http_client.post.call_count
+
+        await service.summarize_text(document)
+
+        assert mock_async_http_client.post.call_count == calls
+
+    @pytest.mark.asyncio
+    async def test_edited_document_only_resummarizes_changed_chunks(self, service, mock_async_http_client):
+        paragraphs = [f"Paragraph {i} " + "word " * 30 for i in range(12)]
+        first = await service.summarize_text("\n\n".join(paragraphs))
+        mock_async_http_client.post.reset_mock()
+
+        paragraphs[5] = "An edited paragraph " + "text " * 25
+        second = await service.summarize_text("\n\n".join(paragraphs))
+
+        chunk_prompts = [p for p in self._prompts(mock_async_http_client) if p.startswith("Summarize")]
+        assert len(chunk_prompts) == 1
+        assert "An edited paragraph" in chunk_prompts[0]
+        assert second.reusedChunks == second.chunks - 1
+        assert first.reusedChunks == 0
+        assert service.map_reduce["reduceCalls"] == 2
+
+    def test_summary_fields_filled_by_service_are_not_requested_from_model(self, async_ai_service):
+        schema = async_ai_service._response_format([TaskType.SUMMARIZE])
+
+        assert set(schema["properties"]) == {"summary", "keyPoints", "wordCount"}
+
+    @pytest.mark.asyncio
+    async def test_analyze_summarizes_long_text_by_chunks(self, service, mock_async_http_client):
+        response = await service.analyze_text(self._document(3), [TaskType.SUMMARIZE])
+
+        assert response.summarize.summary == "s"
+        assert service.map_reduce["chunks"] == 3
+
+    @pytest.mark.asyncio
+    async def test_stream_returns_chunked_summary_as_one_result(self, service, mock_async_http_client):
+        events = [event async for event in service.stream_task(TaskType.SUMMARIZE, self._document(3))]
+
+        assert [name for name, _ in events] == ["result"]
+        assert service.map_reduce["documents"] == 1
+
+
+class TestFailover:
+    CLASSIFY_JSON = '{"labels": ["t"], "primaryCategory": "t", "confidence": 0.9}'
+
+    @pytest.fixture
+    def open_pool(self):
+        pool = BackendPool(
+            ["http://ollama:11434"], breaker_factory=lambda: CircuitBreaker(min_calls=1, open_seconds=30)
+        )
+        backend = pool.acquire("gemma3:4b")
+        pool.release(backend, "gemma3:4b", 0.1, False)
+        return pool
+
+    @pytest.mark.asyncio
+    async def test_open_circuit_uses_fallback_model(self, mock_async_http_client, mock_router, open_pool):
+        mock_router.get_fallback_model.return_value = "gemma3:1b"
+        service = AsyncAIService(http_client=mock_async_http_client, router=mock_router, backends=open_pool)
+        _setup_async_chat_response(mock_async_http_client, self.CLASSIFY_JSON)
+
+        result = await service.classify_text("text")
+
+        assert result.primaryCategory == "t"
+        assert mock_async_http_client.post.call_args.kwargs["json"]["model"] == "gemma3:1b"
+        assert service.metrics()["failovers"] == {"classify": 1}
+
+    @pytest.mark.asyncio
+    async def test_open_circuit_without_fallback_fails_fast(self, mock_async_http_client, mock_router, open_pool):
+        service = AsyncAIService(http_client=mock_async_http_client, router=mock_router, backends=open_pool)
+
+        with pytest.raises(CircuitOpenError):
+            await service.classify_text("text")
+
+        mock_async_http_client.post.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_fallback_answers_are_cached_under_fallback_model(
+        self, mock_async_http_client, mock_router, open_pool
+    ):
+        mock_router.get_fallback_model.return_value = "gemma3:1b"
+        cache = ResponseCache(max_entries=10, ttl_seconds=60)
+        service = AsyncAIService(
+            http_client=mock_async_http_client, router=mock_router, cache=cache, backends=open_pool
+        )
+        _setup_async_chat_response(mock_async_http_client, self.CLASSIFY_JSON)
+
+        await service.classify_text("text")
+
+        assert cache.get(service._cache_key("classify", "gemma3:1b", "text")) is not None
+        assert cache.get(service._cache_key("classify", "gemma3:4b", "text")) is None
+
+
+class TestHedging:
+    CLASSIFY_JSON = '{"labels": ["t"], "primaryCategory": "t", "confidence": 0.9}'
+
+    @pytest.fixture
+    def pool(self):
+        return BackendPool(["http://gpu-1:11434", "http://gpu-2:11434"], hosts_per_model=2)
+
+    @pytest.fixture
+    def service(self, mock_async_http_client, mock_router, pool):
+        service = AsyncAIService(http_client=mock_async_http_client, router=mock_router, backends=pool)
+        service.early_stop = False
+        service.hedging = True
+        service.hedge_delay = 0.01
+        return service
+
+    def _slow_host(self, mock_async_http_client, slow_url, seconds=1.0):
+        calls = []
+
+        async def post(url, headers, json, **kwargs):
+            calls.append(url)
+            if url.startswith(slow_url):
+                await asyncio.sleep(seconds)
+            return _chat_response(self.CLASSIFY_JSON)
+
+        mock_async_http_client.post.side_effect = post
+        return calls
+
+    @pytest.mark.asyncio
+    async def test_slow_primary_is_hedged_on_other_replica(self, service, mock_async_http_client, pool):
+        primary_url = pool.preferred("gemma3:4b")[0].url
+        calls = self._slow_host(mock_async_http_client, primary_url)
+
+        result = await service.classify_text("text")
+
+        assert result.primaryCategory == "t"
+        assert len(calls) == 2
+        assert calls[0].startswith(primary_url) and not calls[1].startswith(primary_url)
+        hedging = service.metrics()["hedging"]
+        assert hedging["hedges"] == {"gemma3:4b": 1}
+        assert hedging["hedgeWins"] == {"gemma3:4b": 1}
+
+    @pytest.mark.asyncio
+    async def test_loser_is_cancelled_and_releases_host(self, service, mock_async_http_client, pool):
+        self._slow_host(mock_async_http_client, pool.preferred("gemma3:4b")[0].url)
+
+        await service.classify_text("text")
+        await asyncio.sleep(0)
+
+        assert all(s["outstanding"] == 0 and s["failures"] == 0 for s in pool.stats())
+
+    @pytest.mark.asyncio
+    async def test_fast_primary_is_not_hedged(self, service, mock_async_http_client):
+        _setup_async_chat_response(mock_async_http_client, self.CLASSIFY_JSON)
+
+        await service.classify_text("text")
+
+        assert mock_async_http_client.post.await_count == 1
+        assert service.metrics()["hedging"]["hedges"] == {}
+
+    @pytest.mark.asyncio
+    async def test_budget_caps_hedges(self, service, mock_async_http_client, pool):
+        service.hedge_budget = RetryBudget(ratio=0.0, max_tokens=1)
+        calls = self._slow_host(mock_async_http_client, pool.preferred("gemma3:4b")[0].url, seconds=0.05)
+
+        await service.classify_text("first")
+        await service.classify_text("second")
+
+        assert len(calls) == 3
+        assert service.metrics()["hedging"]["budget"]["exhausted"] == 1
+
+    @pytest.mark.asyncio
+    async def test_p95_delay_waits_for_samples(self, service, mock_async_http_client):
+        service.hedge_delay = 0
+        _setup_async_chat_response(mock_async_http_client, self.CLASSIFY_JSON)
+
+        assert service._hedge_after("gemma3:4b") is None
+        for i in range(20):
+            await service.classify_text(f"text {i}")
+
+        assert service._hedge_after("gemma3:4b") is not None
+
+
+class TestCascade:
+    CONFIDENT = '{"labels": ["t"], "primaryCategory": "cheap", "confidence": 0.95}'
+    UNSURE = '{"labels": ["t"], "primaryCategory": "cheap", "confidence": 0.3}'
+    LARGE = '{"labels": ["t"], "primaryCategory": "large", "confidence": 0.9}'
+    INTENT = '{"primaryIntent": "i", "secondaryIntents": [], "intentCategory": "statement", "confidence": 0.9}'
+
+    @pytest.fixture
+    def service(self, async_ai_service, mock_router):
+        async_ai_service.early_stop = False
+        async_ai_service.cascade = True
+        async_ai_service.cascade_threshold = 0.7
+        mock_router.get_cascade_model.side_effect = lambda t: "ministral-3:3b" if t == TaskType.CLASSIFY else None
+        return async_ai_service
+
+    def _models_answer(self, mock_async_http_client, cheap_content):
+        async def post(url, headers, json, **kwargs):
+            return _chat_response(cheap_content if json["model"] == "ministral-3:3b" else self.LARGE)
+
+        mock_async_http_client.post.side_effect = post
+
+    @pytest.mark.asyncio
+    async def test_confident_cheap_answer_is_kept(self, service, mock_async_http_client):
+        self._models_answer(mock_async_http_client, self.CONFIDENT)
+
+        result = await service.classify_text("text")
+
+        assert result.primaryCategory == "cheap"
+        assert mock_async_http_client.post.await_count == 1
+        cascade = service.metrics()["cascade"]
+        assert cascade["cheapTierShare"] == 1.0
+        assert cascade["byTask"] == {"classify": {"cheap": 1}}
+        assert cascade["latency"]["cheap"]["samples"] == 1
+
+    @pytest.mark.asyncio
+    async def test_low_confidence_escalates(self, service, mock_async_http_client):
+        self._models_answer(mock_async_http_client, self.UNSURE)
+
+        result = await service.classify_text("text")
+
+        assert result.primaryCategory == "large"
+        models = [c.kwargs["json"]["model"] for c in mock_async_http_client.post.call_args_list]
+        assert models == ["ministral-3:3b", "gemma3:4b"]
+        assert service.metrics()["cascade"]["byTask"] == {"classify": {"escalated": 1}}
+
+    @pytest.mark.asyncio
+    async def test_unparseable_cheap_answer_escalates_without_repair(self, service, mock_async_http_client):
+        self._models_answer(mock_async_http_client, "no idea")
+
+        result = await service.classify_text("text")
+
+        assert result.primaryCategory == "large"
+        assert mock_async_http_client.post.await_count == 2
+        assert service.metrics()["retries"] == {}
+
+    @pytest.mark.asyncio
+    async def test_tasks_without_cheap_model_are_not_cascaded(self, service, mock_async_http_client):
+        _setup_async_chat_response(
+            mock_async_http_client, '{"summary": "s", "keyPoints": [], "wordCount": 1}'
+        )
+
+        await service.summarize_text("text")
+
+        assert mock_async_http_client.post.call_args.kwargs["json"]["model"] == "ministral-3:8b"
+        assert service.metrics()["cascade"]["requests"] == 0
+
+    @pytest.mark.asyncio
+    async def test_cascaded_answers_are_cached_separately(self, mock_async_http_client, mock_router, backends):
+        cache = ResponseCache(max_entries=10, ttl_seconds=60)
+        service = AsyncAIService(http_client=mock_async_http_client, router=mock_router, cache=cache, backends=backends)
+        service.early_stop = False
+        service.cascade = True
+        mock_router.get_cascade_model.side_effect = lambda t: "ministral-3:3b"
+        self._models_answer(mock_async_http_client, self.CONFIDENT)
+
+        await service.classify_text("text")
+
+        assert cache.get(service._cache_key("classify", "gemma3:4b", "text")) is None
+        assert await service.classify_text("text") is not None
+        assert mock_async_http_client.post.await_count == 1
+
+    @pytest.mark.asyncio
+    async def test_analyze_and_single_task_share_cascaded_entry(self, mock_async_http_client, mock_router, backends):
+        cache = ResponseCache(max_entries=10, ttl_seconds=60)
+        service = AsyncAIService(http_client=mock_async_http_client, router=mock_router, cache=cache, backends=backends)
+        service.early_stop = False
+        service.cascade = True
+        mock_router.get_model.side_effect = lambda t, tokens=None: "gemma3:4b"
+        mock_router.get_cascade_model.side_effect = lambda t: "ministral-3:3b" if t == TaskType.CLASSIFY else None
+
+        async def post(url, headers, json, **kwargs):
+            if json["model"] == "ministral-3:3b":
+                return _chat_response(self.CONFIDENT)
+            return _chat_response(self.INTENT)
+
+        mock_async_http_client.post.side_effect = post
+
+        analyzed = await service.analyze_text("text", [TaskType.CLASSIFY, TaskType.INTENT])
+        calls = mock_async_http_client.post.await_count
+        single = await service.classify_text("text")
+
+        assert analyzed.errors == {}
+        assert analyzed.classify.primaryCategory == "cheap"
+        assert single == analyzed.classify
+        assert mock_async_http_client.post.await_count == calls
+        assert service.metrics()["combinedPrompts"] == 0
+        assert service.metrics()["cascade"]["byTask"] == {"classify": {"cheap": 1}}
+
+    @pytest.mark.asyncio
+    async def test_streamed_answer_serves_cascaded_request(self, mock_async_http_client, mock_router, backends):
+        cache = ResponseCache(max_entries=10, ttl_seconds=60)
+        service = AsyncAIService(http_client=mock_async_http_client, router=mock_router, cache=cache, backends=backends)
+        service.cascade = True
+        mock_router.get_cascade_model.side_effect = lambda t: "ministral-3:3b" if t == TaskType.CLASSIFY else None
+        self._models_answer(mock_async_http_client, self.CONFIDENT)
+
+        events = [event async for event in service.stream_task(TaskType.CLASSIFY, "text")]
+        result = await service.classify_text("text")
+
+        assert result == events[-1][1]
+        assert mock_async_http_client.post.await_count == 1
+
+
+class TestInputSizeRouting:
+    @pytest.mark.asyncio
+    async def test_router_receives_token_estimate(self, async_ai_service, mock_async_http_client, mock_router):
+        _setup_async_chat_response(
+            mock_async_http_client, '{"labels": ["t"], "primaryCategory": "t", "confidence": 0.9}'
+        )
+
+        await async_ai_service.classify_text("x" * 400)
+
+        mock_router.get_model.assert_called_with(TaskType.CLASSIFY, tokens=100)
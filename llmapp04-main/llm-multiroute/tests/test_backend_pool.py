@@ -0,0 +1,166 @@
+from unittest.mock import patch
+
+import pytest
+
+from app.router.backend_pool import BackendPool
+from app.router.circuit_breaker import CircuitBreaker, CircuitOpenError
+
+HOSTS = ["http://ollama-1:11434", "http://ollama-2:11434", "http://ollama-3:11434", "http://ollama-4:11434"]
+
+
+@pytest.fixture
+def pool(clock):
+    return BackendPool(HOSTS, hosts_per_model=2, failure_threshold=2, cooldown_seconds=30, clock=clock)
+
+
+class TestPlacement:
+    def test_model_stays_on_its_preferred_hosts(self, pool):
+        preferred = {b.url for b in pool.preferred("gemma3:4b")}
+
+        used = set()
+        for _ in range(10):
+            backend = pool.acquire("gemma3:4b")
+            used.add(backend.url)
+
+        assert len(preferred) == 2
+        assert used == preferred
+
+    def test_placement_is_stable_across_pools(self, pool, clock):
+        other = BackendPool(list(reversed(HOSTS)), hosts_per_model=2, clock=clock)
+
+        assert [b.url for b in pool.preferred("m")] == [b.url for b in other.preferred("m")]
+
+    def test_removing_a_host_only_moves_its_models(self, pool, clock):
+        models = [f"model-{i}" for i in range(20)]
+        before = {m: [b.url for b in pool.preferred(m)] for m in models}
+        smaller = BackendPool(HOSTS[:-1], hosts_per_model=2, clock=clock)
+
+        for model in models:
+            if HOSTS[-1] not in before[model]:
+                assert [b.url for b in smaller.preferred(model)] == before[model]
+
+    def test_requires_a_host(self):
+        with pytest.raises(ValueError):
+            BackendPool([])
+
+
+class TestLoadAwareRouting:
+    def test_picks_least_outstanding_preferred_host(self, pool):
+        first = pool.acquire("m")
+        second = pool.acquire("m")
+
+        assert first is not second
+        pool.release(first, "m", 0.1, True)
+        assert pool.acquire("m") is first
+
+    def test_unhealthy_host_is_skipped_until_cooldown(self, pool, clock):
+        first, second = pool.preferred("m")
+        for _ in range(2):
+            first.outstanding += 1
+            pool.release(first, "m", 0.1, False)
+
+        assert pool.acquire("m") is second
+        pool.release(second, "m", 0.1, True)
+        clock.now += 31
+        assert pool.acquire("m") is first
+
+    def test_spills_to_other_hosts_when_preferred_are_down(self, pool):
+        for backend in pool.preferred("m"):
+            for _ in range(2):
+                backend.outstanding += 1
+                pool.release(backend, "m", 0.1, False)
+
+        backend = pool.acquire("m")
+
+        assert backend not in pool.preferred("m")
+
+    def test_lease_records_latency_and_failures(self, pool, clock):
+        with pool.lease("m") as backend:
+            clock.now += 0.5
+        with pytest.raises(RuntimeError):
+            with pool.lease("m") as failing:
+                raise RuntimeError("boom")
+
+        stats = {s["url"]: s for s in pool.stats()}
+        assert stats[backend.url]["avgLatencyMs"] == 500.0
+        assert stats[failing.url]["failures"] == 1
+        assert all(s["outstanding"] == 0 for s in stats.values())
+        assert "m" in stats[backend.url]["models"]
+
+    @patch("app.router.backend_pool.settings")
+    def test_from_settings_defaults_to_base_url(self, mock_settings):
+        mock_settings.OLLAMA_HOSTS = ""
+        mock_settings.OLLAMA_BASE_URL = "http://localhost:11434/"
+        mock_settings.OLLAMA_HOSTS_PER_MODEL = 2
+        mock_settings.OLLAMA_HOST_FAILURE_THRESHOLD = 3
+        mock_settings.OLLAMA_HOST_COOLDOWN_SECONDS = 30
+
+        pool = BackendPool.from_settings()
+
+        assert [b.url for b in pool.backends] == ["http://localhost:11434"]
+
+
+class TestCircuitBreakers:
+    @pytest.fixture
+    def guarded_pool(self, clock):
+        return BackendPool(
+            HOSTS[:2],
+            hosts_per_model=2,
+            failure_threshold=100,
+            breaker_factory=lambda: CircuitBreaker(min_calls=2, open_seconds=30, clock=clock),
+            clock=clock,
+        )
+
+    def _fail(self, pool, backend, model, times=2):
+        for _ in range(times):
+            backend.outstanding += 1
+            pool.release(backend, model, 0.1, False)
+
+    def test_open_breaker_moves_model_to_other_host(self, guarded_pool):
+        first, second = guarded_pool.preferred("m")
+        self._fail(guarded_pool, first, "m")
+
+        assert guarded_pool.acquire("m") is second
+
+    def test_breaker_is_per_model(self, guarded_pool):
+        first, _ = guarded_pool.preferred("m")
+        self._fail(guarded_pool, first, "m")
+
+        assert guarded_pool.available("other")
+        assert first in [guarded_pool.acquire("other") for _ in range(2)]
+
+    def test_all_open_fails_fast(self, guarded_pool):
+        for backend in guarded_pool.backends:
+            self._fail(guarded_pool, backend, "m")
+
+        assert not guarded_pool.available("m")
+        with pytest.raises(CircuitOpenError) as exc_info:
+            guarded_pool.acquire("m")
+        assert exc_info.value.retry_after == 30
+
+    def test_breaker_state_in_stats(self, guarded_pool):
+        first, _ = guarded_pool.preferred("m")
+        self._fail(guarded_pool, first, "m")
+
+        stats = {s["url"]: s for s in guarded_pool.stats()}
+        assert stats[first.url]["breakers"]["m"]["state"] == "open"
+
+
+class TestTriedHosts:
+    def test_lease_records_and_avoids_tried_hosts(self, pool):
+        tried = set()
+
+        with pool.lease("m", tried) as first:
+            pass
+        with pool.lease("m", tried) as second:
+            pass
+
+        assert first is not second
+        assert tried == {first.url, second.url}
+
+    def test_falls_back_to_tried_host_when_no_other(self, pool):
+        preferred = {b.url for b in pool.preferred("m")}
+
+        assert pool.acquire("m", preferred).url in preferred
+        assert not pool.has_spare("m", preferred)
+        assert pool.has_spare("m", set())
@@ -0,0 +1,201 @@
+import asyncio
+
+import httpx
+import pytest
+
+from app.router.circuit_breaker import CircuitOpenError
+from app.service.bulkhead import Bulkhead, BulkheadFullError, is_overload, parse_limits
+
+
+async def _hold(bulkhead: Bulkhead, release: asyncio.Event, started: list):
+    async with bulkhead.slot():
+        started.append(True)
+        await release.wait()
+
+
+class TestBulkhead:
+    @pytest.mark.asyncio
+    async def test_limits_concurrency_and_queues_fifo(self):
+        bulkhead = Bulkhead("m", limit=1, max_queue=2, queue_timeout=1)
+        release = asyncio.Event()
+        order = []
+
+        async def run(name):
+            async with bulkhead.slot():
+                order.append(name)
+                await release.wait()
+
+        tasks = [asyncio.create_task(run(name)) for name in ("a", "b", "c")]
+        await asyncio.sleep(0)
+        assert order == ["a"]
+        assert bulkhead.stats()["queued"] == 2
+
+        release.set()
+        await asyncio.gather(*tasks)
+
+        assert order == ["a", "b", "c"]
+        assert bulkhead.stats()["active"] == 0
+
+    @pytest.mark.asyncio
+    async def test_full_queue_is_rejected_with_429(self):
+        bulkhead = Bulkhead("m", limit=1, max_queue=1, queue_timeout=1)
+        release = asyncio.Event()
+        started = []
+        tasks = [asyncio.create_task(_hold(bulkhead, release, started)) for _ in range(2)]
+        await asyncio.sleep(0)
+
+        with pytest.raises(BulkheadFullError) as exc_info:
+            async with bulkhead.slot():
+                pass
+
+        assert exc_info.value.status_code == 429
+        assert exc_info.value.retry_after >= 1
+        assert bulkhead.rejected == 1
+        release.set()
+        await asyncio.gather(*tasks)
+
+    @pytest.mark.asyncio
+    async def test_queue_wait_times_out_with_503(self):
+        bulkhead = Bulkhead("m", limit=1, max_queue=5, queue_timeout=0.01)
+        release = asyncio.Event()
+        holder = asyncio.create_task(_hold(bulkhead, release, []))
+        await asyncio.sleep(0)
+
+        with pytest.raises(BulkheadFullError) as exc_info:
+            async with bulkhead.slot():
+                pass
+
+        assert exc_info.value.status_code == 503
+        assert bulkhead.stats()["queued"] == 0
+        release.set()
+        await holder
+
+    @pytest.mark.asyncio
+    async def test_cancelled_waiter_leaves_queue(self):
+        bulkhead = Bulkhead("m", limit=1, max_queue=5, queue_timeout=1)
+        release = asyncio.Event()
+        holder = asyncio.create_task(_hold(bulkhead, release, []))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(_hold(bulkhead, release, []))
+        await asyncio.sleep(0)
+
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+        release.set()
+        await holder
+
+        assert bulkhead.stats()["queued"] == 0
+        assert bulkhead.active == 0
+
+    @pytest.mark.asyncio
+    async def test_queued_flows_are_admitted_by_weight(self):
+        bulkhead = Bulkhead("m", limit=1, max_queue=10, queue_timeout=1)
+        release = asyncio.Event()
+        holder = asyncio.create_task(_hold(bulkhead, release, []))
+        await asyncio.sleep(0)
+        order = []
+
+        async def run(flow, weight):
+            async with bulkhead.slot(flow, weight):
+                order.append(flow)
+
+        tasks = [asyncio.create_task(run("batch", 1)) for _ in range(3)]
+        tasks += [asyncio.create_task(run("interactive", 8)) for _ in range(2)]
+        await asyncio.sleep(0)
+        release.set()
+        await asyncio.gather(holder, *tasks)
+
+        assert order == ["interactive", "interactive", "batch", "batch", "batch"]
+
+
+class TestAdaptiveLimit:
+    def _bulkhead(self, clock):
+        return Bulkhead("m", limit=2, max_queue=10, queue_timeout=1, adaptive=True, max_limit=8, clock=clock)
+
+    @pytest.mark.asyncio
+    async def test_slow_calls_shrink_limit(self):
+        now = [0.0]
+        bulkhead = self._bulkhead(lambda: now[0])
+        for seconds in [1.0] * Bulkhead.WINDOW + [5.0] * Bulkhead.WINDOW:
+            async with bulkhead.slot():
+                now[0] += seconds
+
+        assert bulkhead.limit == 1
+
+    @pytest.mark.asyncio
+    async def test_varied_call_lengths_do_not_shrink_limit(self):
+        now = [0.0]
+        bulkhead = Bulkhead("m", limit=8, max_queue=100, queue_timeout=1, adaptive=True, clock=lambda: now[0])
+
+        for round_ in range(20):
+            release = asyncio.Event()
+            tasks = [asyncio.create_task(_hold(bulkhead, release, [])) for _ in range(bulkhead.limit)]
+            await asyncio.sleep(0)
+            # Saturated calls of 1-4s, as when short and long generations share a model
+            now[0] += 1.0 + (round_ * 7 % 4)
+            release.set()
+            await asyncio.gather(*tasks)
+
+        assert bulkhead.limit == 8
+
+    @pytest.mark.asyncio
+    async def test_fast_saturated_calls_grow_limit(self):
+        now = [0.0]
+        bulkhead = self._bulkhead(lambda: now[0])
+
+        for _ in range(10):
+            release = asyncio.Event()
+            tasks = [asyncio.create_task(_hold(bulkhead, release, [])) for _ in range(bulkhead.limit)]
+            await asyncio.sleep(0)
+            now[0] += 0.01
+            release.set()
+            await asyncio.gather(*tasks)
+
+        assert bulkhead.limit > 2
+
+    @pytest.mark.asyncio
+    async def test_overload_failures_shrink_limit(self):
+        bulkhead = Bulkhead("m", limit=4, max_queue=10, queue_timeout=1, adaptive=True)
+        for _ in range(3):
+            with pytest.raises(httpx.ReadTimeout):
+                async with bulkhead.slot():
+                    raise httpx.ReadTimeout("upstream")
+
+        assert bulkhead.limit == 2
+
+    @pytest.mark.asyncio
+    async def test_unrelated_errors_leave_limit_alone(self):
+        bulkhead = Bulkhead("m", limit=4, max_queue=10, queue_timeout=1, adaptive=True)
+        request = httpx.Request("POST", "http://ollama:11434/api/chat")
+        errors = [
+            CircuitOpenError("m", retry_after=30),
+            httpx.HTTPStatusError("bad request", request=request, response=httpx.Response(400, request=request)),
+            RuntimeError("Failed to parse AI response as JSON"),
+        ]
+        for error in errors:
+            with pytest.raises(type(error)):
+                async with bulkhead.slot():
+                    raise error
+
+        assert bulkhead.limit == 4
+        assert bulkhead.stats()["active"] == 0
+
+
+class TestIsOverload:
+    def test_timeouts_429_and_5xx_are_overload(self):
+        request = httpx.Request("POST", "http://ollama:11434/api/chat")
+
+        def status_error(code):
+            return httpx.HTTPStatusError("error", request=request, response=httpx.Response(code, request=request))
+
+        assert is_overload(httpx.ReadTimeout("slow"))
+        assert is_overload(status_error(503))
+        assert is_overload(status_error(429))
+        assert not is_overload(status_error(404))
+        assert not is_overload(httpx.ConnectError("refused"))
+
+
+class TestParseLimits:
+    def test_parses_model_pairs(self):
+        assert parse_limits("gemma3:12b=4, ministral-3:8b=2") == {"gemma3:12b": 4, "ministral-3:8b": 2}
+        assert parse_limits("") == {}
@@ -0,0 +1,74 @@
+import pytest
+
+from app.router.circuit_breaker import CircuitBreaker
+
+
+@pytest.fixture
+def breaker(clock):
+    return CircuitBreaker(
+        window=10, min_calls=4, failure_rate=0.5, slow_call_seconds=5, slow_call_rate=0.75, open_seconds=30, clock=clock
+    )
+
+
+class TestCircuitBreaker:
+    def test_stays_closed_below_min_calls(self, breaker):
+        for _ in range(3):
+            breaker.record(False, 0.1)
+
+        assert breaker.state == CircuitBreaker.CLOSED
+
+    def test_opens_on_failure_rate(self, breaker):
+        for ok in (True, False, True, False):
+            breaker.record(ok, 0.1)
+
+        assert breaker.state == CircuitBreaker.OPEN
+        assert not breaker.acquire()
+        assert breaker.retry_after() == 30
+
+    def test_opens_on_slow_calls(self, breaker):
+        for _ in range(4):
+            breaker.record(True, 6.0)
+
+        assert breaker.state == CircuitBreaker.OPEN
+
+    def test_half_open_admits_one_probe(self, breaker, clock):
+        for _ in range(4):
+            breaker.record(False, 0.1)
+        clock.now += 30
+
+        assert breaker.state == CircuitBreaker.HALF_OPEN
+        assert breaker.acquire()
+        assert not breaker.can_call()
+        assert not breaker.acquire()
+
+    def test_successful_probe_closes(self, breaker, clock):
+        for _ in range(4):
+            breaker.record(False, 0.1)
+        clock.now += 30
+        breaker.acquire()
+
+        breaker.record(True, 0.1)
+
+        assert breaker.state == CircuitBreaker.CLOSED
+        assert breaker.stats()["calls"] == 0
+
+    def test_failed_probe_reopens(self, breaker, clock):
+        for _ in range(4):
+            breaker.record(False, 0.1)
+        clock.now += 30
+        breaker.acquire()
+
+        breaker.record(False, 0.1)
+
+        assert breaker.state == CircuitBreaker.OPEN
+        assert breaker.stats()["timesOpened"] == 2
+
+    def test_cancelled_probe_frees_slot(self, breaker, clock):
+        for _ in range(4):
+            breaker.record(False, 0.1)
+        clock.now += 30
+        breaker.acquire()
+
+        breaker.cancel()
+
+        assert breaker.can_call()
@@ -0,0 +1,66 @@
+import pytest
+
+from app.service.fair_queue import FairQueue
+
+
+class TestFairQueue:
+    def test_single_flow_is_fifo(self):
+        queue = FairQueue()
+        for item in ("a", "b", "c"):
+            queue.push(item, "flow")
+
+        assert [queue.pop() for _ in range(3)] == ["a", "b", "c"]
+
+    def test_flows_alternate_however_much_each_queued(self):
+        queue = FairQueue()
+        for i in range(4):
+            queue.push(f"bulk-{i}", "bulk")
+        queue.push("ui-0", "ui")
+        queue.push("ui-1", "ui")
+
+        assert [queue.pop() for _ in range(4)] == ["bulk-0", "ui-0", "bulk-1", "ui-1"]
+
+    def test_weight_sets_share(self):
+        queue = FairQueue()
+        for i in range(6):
+            queue.push(("batch", i), "batch", weight=1)
+            queue.push(("interactive", i), "interactive", weight=4)
+
+        first = [queue.pop()[0] for _ in range(5)]
+
+        assert first.count("interactive") == 4
+
+    def test_costly_items_get_fewer_turns(self):
+        queue = FairQueue()
+        for i in range(3):
+            queue.push(("summarize", i), "summarize", cost=1000)
+        for i in range(5):
+            queue.push(("classify", i), "classify", cost=250)
+
+        first = [queue.pop()[0] for _ in range(5)]
+
+        assert first.count("classify") == 4
+
+    def test_idle_flow_gets_no_credit(self):
+        queue = FairQueue()
+        queue.push("a-0", "a")
+        queue.pop()
+        for i in range(3):
+            queue.push(f"b-{i}", "b")
+        queue.pop()
+        queue.push("a-1", "a")
+
+        assert [queue.pop() for _ in range(3)] == ["b-1", "a-1", "b-2"]
+
+    def test_remove(self):
+        queue = FairQueue()
+        first, second = object(), object()
+        queue.push(first, "flow")
+        queue.push(second, "flow")
+
+        queue.remove(first)
+
+        assert len(queue) == 1
+        assert queue.pop() is second
+        with pytest.raises(ValueError):
+            queue.remove(first)
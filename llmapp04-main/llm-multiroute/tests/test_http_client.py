@@ -0,0 +1,34 @@
+from unittest.mock import patch
+
+import httpx
+import pytest
+
+from app.service.http_client import build_async_client, client_limits, request_timeout
+
+
+class TestHttpClientSettings:
+    def test_limits_come_from_settings(self):
+        with patch("app.service.http_client.settings") as mock_settings:
+            mock_settings.OLLAMA_MAX_CONNECTIONS = 7
+            mock_settings.OLLAMA_MAX_KEEPALIVE_CONNECTIONS = 3
+            mock_settings.OLLAMA_KEEPALIVE_EXPIRY_SECONDS = 12.0
+
+            limits = client_limits()
+
+        assert limits == httpx.Limits(max_connections=7, max_keepalive_connections=3, keepalive_expiry=12.0)
+
+    def test_request_timeout_splits_phases(self):
+        with patch("app.service.http_client.settings") as mock_settings:
+            mock_settings.OLLAMA_CONNECT_TIMEOUT = 2.0
+            mock_settings.OLLAMA_WRITE_TIMEOUT = 4.0
+            mock_settings.OLLAMA_POOL_TIMEOUT = 6.0
+
+            timeout = request_timeout(90.0)
+
+        assert timeout == httpx.Timeout(connect=2.0, read=90.0, write=4.0, pool=6.0)
+
+    @pytest.mark.asyncio
+    async def test_async_client_uses_default_read_timeout(self):
+        async with build_async_client() as client:
+            assert isinstance(client, httpx.AsyncClient)
+            assert client.timeout == request_timeout(120.0)
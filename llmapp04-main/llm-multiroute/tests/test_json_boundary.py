@@ -0,0 +1,53 @@
+from app.service.json_boundary import JsonObjectDetector
+
+
+def _feed_all(detector, fragments):
+    for fragment in fragments:
+        result = detector.feed(fragment)
+        if result is not None:
+            return result
+    return None
+
+
+class TestJsonObjectDetector:
+    def test_returns_object_once_balanced(self):
+        detector = JsonObjectDetector()
+
+        assert detector.feed('{"labels": ["a"], ') is None
+        assert detector.feed('"confidence": 0.9}') == '{"labels": ["a"], "confidence": 0.9}'
+
+    def test_skips_leading_fence_and_trailing_prose(self):
+        detector = JsonObjectDetector()
+
+        result = _feed_all(detector, ["```json\n", '{"a": 1}', "\n```\nHope this helps!"])
+
+        assert result == '{"a": 1}'
+
+    def test_trims_text_after_closing_brace_in_same_fragment(self):
+        detector = JsonObjectDetector()
+
+        assert detector.feed('{"a": 1} and more') == '{"a": 1}'
+
+    def test_nested_objects(self):
+        detector = JsonObjectDetector()
+
+        result = _feed_all(detector, ['{"a": {"b": ', '{"c": 1}}', ', "d": 2}'])
+
+        assert result == '{"a": {"b": {"c": 1}}, "d": 2}'
+
+    def test_braces_inside_strings_are_ignored(self):
+        detector = JsonObjectDetector()
+
+        result = _feed_all(detector, ['{"summary": "use } and { freely", ', '"q": "say \\"}\\""}'])
+
+        assert result == '{"summary": "use } and { freely", "q": "say \\"}\\""}'
+
+    def test_incomplete_object_returns_none(self):
+        detector = JsonObjectDetector()
+
+        assert _feed_all(detector, ['{"a": [1, 2', "]"]) is None
+
+    def test_text_without_object_returns_none(self):
+        detector = JsonObjectDetector()
+
+        assert detector.feed("This is not valid JSON") is None
@@ -0,0 +1,109 @@
+import pytest
+
+from app.dto.classification_response import ClassificationResponse
+from app.dto.intent_response import IntentResponse
+from app.dto.summary_response import SummaryResponse
+from app.service.json_repair import JsonRepairer
+
+
+@pytest.fixture
+def repairer():
+    return JsonRepairer()
+
+
+class TestJsonRepairerLoad:
+    def test_valid_json_needs_no_repair(self, repairer):
+        assert repairer.load('{"a": 1}') == ({"a": 1}, [])
+
+    def test_extracts_object_from_prose(self, repairer):
+        data, repairs = repairer.load('Sure! Here is the JSON:\n{"a": 1}\nLet me know if you need more.')
+
+        assert data == {"a": 1}
+        assert repairs == ["extracted_object"]
+
+    def test_skips_braces_in_prose_before_object(self, repairer):
+        data, repairs = repairer.load('The {best} answer: {"labels": ["a"], "confidence": 0.9}')
+
+        assert data == {"labels": ["a"], "confidence": 0.9}
+        assert repairs == ["extracted_object"]
+
+    def test_trailing_commas(self, repairer):
+        data, repairs = repairer.load('{"a": [1, 2,], "b": 3,}')
+
+        assert data == {"a": [1, 2], "b": 3}
+        assert repairs == ["trailing_commas"]
+
+    def test_single_quotes(self, repairer):
+        data, repairs = repairer.load("{'a': 'say \"hi\"', 'b': 'it\\'s'}")
+
+        assert data == {"a": 'say "hi"', "b": "it's"}
+        assert repairs == ["single_quotes"]
+
+    def test_unquoted_keys_and_python_literals(self, repairer):
+        data, repairs = repairer.load('{flag: True, missing: None, "text": "True: keep"}')
+
+        assert data == {"flag": True, "missing": None, "text": "True: keep"}
+        assert repairs == ["python_literals", "unquoted_keys"]
+
+    def test_unrecoverable_text_raises(self, repairer):
+        with pytest.raises(ValueError):
+            repairer.load("This is not valid JSON")
+
+
+class TestJsonRepairerCoerce:
+    def test_numeric_strings_and_percentages(self, repairer):
+        data, repairs = repairer.coerce(
+            {"labels": ["a"], "primaryCategory": "a", "confidence": "90%"}, ClassificationResponse
+        )
+
+        assert data["confidence"] == 0.9
+        assert repairs == ["coerced_numbers"]
+
+    def test_float_word_count_to_int(self, repairer):
+        data, _ = repairer.coerce({"summary": "s", "keyPoints": [], "wordCount": 25.0}, SummaryResponse)
+
+        assert data["wordCount"] == 25 and isinstance(data["wordCount"], int)
+
+    def test_renamed_keys_and_string_lists(self, repairer):
+        data, repairs = repairer.coerce(
+            {"primary_intent": "buy", "secondary_intents": "browse, compare", "IntentCategory": "request",
+             "confidence": 0.8},
+            IntentResponse,
+        )
+
+        assert data == {
+            "primaryIntent": "buy",
+            "secondaryIntents": ["browse", "compare"],
+            "intentCategory": "request",
+            "confidence": 0.8,
+        }
+        assert repairs == ["coerced_lists", "renamed_keys"]
+
+    def test_missing_list_defaults_to_empty(self, repairer):
+        data, repairs = repairer.coerce({"summary": "s", "wordCount": 1}, SummaryResponse)
+
+        assert data["keyPoints"] == []
+        assert repairs == ["defaulted_lists"]
+
+
+class TestJsonRepairerParse:
+    def test_counts_each_repair_on_success(self, repairer):
+        result = repairer.parse(
+            "Here you go: {'labels': ['tech',], 'primaryCategory': 'tech', 'confidence': '0.9'} Thanks!",
+            ClassificationResponse,
+        )
+
+        assert result.confidence == 0.9
+        assert repairer.stats() == {
+            "recovered_responses": 1,
+            "extracted_object": 1,
+            "single_quotes": 1,
+            "trailing_commas": 1,
+            "coerced_numbers": 1,
+        }
+
+    def test_failed_parse_is_not_counted(self, repairer):
+        with pytest.raises(ValueError):
+            repairer.parse('{"labels": ["a"]}', ClassificationResponse)
+
+        assert repairer.stats() == {}
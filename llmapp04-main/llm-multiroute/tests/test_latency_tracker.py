@@ -0,0 +1,28 @@
+import pytest
+
+from app.service.latency_tracker import LatencyTracker
+
+
+class TestLatencyTracker:
+    def test_percentile_needs_min_samples(self):
+        tracker = LatencyTracker(min_samples=5)
+        for seconds in (0.1, 0.2, 0.3, 0.4):
+            tracker.record("m", seconds)
+
+        assert tracker.percentile("m", 0.95) is None
+
+    def test_nearest_rank_percentile(self):
+        tracker = LatencyTracker(min_samples=1)
+        for i in range(1, 101):
+            tracker.record("m", i / 100)
+
+        assert tracker.percentile("m", 0.95) == pytest.approx(0.95)
+        assert tracker.percentile("m", 0.5) == pytest.approx(0.5)
+
+    def test_window_keeps_recent_samples(self):
+        tracker = LatencyTracker(window=3, min_samples=1)
+        for seconds in (9.0, 1.0, 1.0, 1.0):
+            tracker.record("m", seconds)
+
+        assert tracker.percentile("m", 1.0) == 1.0
+        assert tracker.stats()["m"]["samples"] == 3
@@ -0,0 +1,96 @@
+import asyncio
+
+import pytest
+
+from app.service.micro_batcher import MicroBatcher
+
+
+class TestMicroBatcher:
+    @pytest.mark.asyncio
+    async def test_concurrent_items_share_one_flush(self):
+        batcher = MicroBatcher(max_size=8, max_wait=0.01)
+        flushes = []
+
+        async def flush(items):
+            flushes.append(list(items))
+            return [item.upper() for item in items]
+
+        results = await asyncio.gather(*(batcher.submit("k", item, flush) for item in ("a", "b", "c")))
+
+        assert results == ["A", "B", "C"]
+        assert flushes == [["a", "b", "c"]]
+        assert batcher.stats() == {"batches": 1, "items": 3, "avgBatchSize": 3.0}
+
+    @pytest.mark.asyncio
+    async def test_full_batch_flushes_without_waiting(self):
+        batcher = MicroBatcher(max_size=2, max_wait=60)
+        flushes = []
+
+        async def flush(items):
+            flushes.append(list(items))
+            return items
+
+        results = await asyncio.wait_for(
+            asyncio.gather(*(batcher.submit("k", item, flush) for item in (1, 2, 3, 4))), timeout=1
+        )
+
+        assert results == [1, 2, 3, 4]
+        assert flushes == [[1, 2], [3, 4]]
+
+    @pytest.mark.asyncio
+    async def test_keys_are_batched_separately(self):
+        batcher = MicroBatcher(max_size=8, max_wait=0.01)
+        flushes = []
+
+        async def flush(items):
+            flushes.append(list(items))
+            return items
+
+        await asyncio.gather(batcher.submit("x", 1, flush), batcher.submit("y", 2, flush))
+
+        assert sorted(flushes) == [[1], [2]]
+
+    @pytest.mark.asyncio
+    async def test_exception_outcome_goes_to_its_caller_only(self):
+        batcher = MicroBatcher(max_size=8, max_wait=0.01)
+
+        async def flush(items):
+            return [ValueError(item) if item == "bad" else item for item in items]
+
+        results = await asyncio.gather(
+            batcher.submit("k", "ok", flush), batcher.submit("k", "bad", flush), return_exceptions=True
+        )
+
+        assert results[0] == "ok"
+        assert isinstance(results[1], ValueError)
+
+    @pytest.mark.asyncio
+    async def test_flush_failure_reaches_every_caller(self):
+        batcher = MicroBatcher(max_size=8, max_wait=0.01)
+
+        async def flush(items):
+            raise RuntimeError("upstream down")
+
+        results = await asyncio.gather(
+            batcher.submit("k", 1, flush), batcher.submit("k", 2, flush), return_exceptions=True
+        )
+
+        assert all(isinstance(result, RuntimeError) for result in results)
+
+    @pytest.mark.asyncio
+    async def test_running_batch_is_held_until_done(self):
+        batcher = MicroBatcher(max_size=1, max_wait=1)
+        release = asyncio.Event()
+
+        async def flush(items):
+            await release.wait()
+            return items
+
+        caller = asyncio.create_task(batcher.submit("k", 1, flush))
+        await asyncio.sleep(0)
+
+        assert len(batcher._running) == 1
+        release.set()
+        assert await caller == 1
+        await asyncio.sleep(0)
+        assert not batcher._running
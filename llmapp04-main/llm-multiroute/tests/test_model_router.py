@@ -49,6 +49,16 @@ class TestModelRouter:
         models = list(routes.values())
         assert len(models) == len(set(models)), "Each task should route to a different model"
 
+    def test_group_by_model_keeps_distinct_models_apart(self):
+        router = ModelRouter()
+        groups = router.group_by_model(list(TaskType))
+        assert groups == {
+            "gemma3:4b": [TaskType.CLASSIFY],
+            "ministral-3:3b": [TaskType.SENTIMENT],
+            "ministral-3:8b": [TaskType.SUMMARIZE],
+            "gemma3:12b": [TaskType.INTENT],
+        }
+
 
 class TestModelRouterCustomConfig:
     @patch("app.router.model_router.settings")
@@ -82,6 +92,48 @@ class TestModelRouterCustomConfig:
             "intent": "model-d",
         }
 
+    @patch("app.router.model_router.settings")
+    def test_group_by_model_combines_shared_models(self, mock_settings):
+        mock_settings.OLLAMA_MODEL_CLASSIFY = "shared"
+        mock_settings.OLLAMA_MODEL_SENTIMENT = "shared"
+        mock_settings.OLLAMA_MODEL_SUMMARIZE = "model-c"
+        mock_settings.OLLAMA_MODEL_INTENT = "shared"
+
+        router = ModelRouter()
+        groups = router.group_by_model(list(TaskType))
+
+        assert groups == {
+            "shared": [TaskType.CLASSIFY, TaskType.SENTIMENT, TaskType.INTENT],
+            "model-c": [TaskType.SUMMARIZE],
+        }
+
+
+class TestFallbackAndCascadeModels:
+    @patch("app.router.model_router.settings")
+    def test_fallbacks_only_list_configured_routes(self, mock_settings):
+        mock_settings.OLLAMA_FALLBACK_MODEL_CLASSIFY = "gemma3:1b"
+        mock_settings.OLLAMA_FALLBACK_MODEL_SENTIMENT = ""
+        mock_settings.OLLAMA_FALLBACK_MODEL_SUMMARIZE = ""
+        mock_settings.OLLAMA_FALLBACK_MODEL_INTENT = ""
+
+        router = ModelRouter()
+
+        assert router.get_fallback_model(TaskType.CLASSIFY) == "gemma3:1b"
+        assert router.get_fallback_model(TaskType.INTENT) is None
+        assert router.get_fallbacks() == {"classify": "gemma3:1b"}
+
+    @patch("app.router.model_router.settings")
+    def test_summarize_is_never_cascaded(self, mock_settings):
+        mock_settings.CASCADE_MODEL_CLASSIFY = "ministral-3:3b"
+        mock_settings.CASCADE_MODEL_SENTIMENT = ""
+        mock_settings.CASCADE_MODEL_INTENT = "ministral-3:3b"
+
+        router = ModelRouter()
+
+        assert router.get_cascade_model(TaskType.SUMMARIZE) is None
+        assert router.get_cascade_model(TaskType.SENTIMENT) is None
+        assert router.get_cascades() == {"classify": "ministral-3:3b", "intent": "ministral-3:3b"}
+
 
 class TestTaskType:
     def test_task_type_values(self):
@@ -0,0 +1,44 @@
+import pytest
+
+from app.router.outcome import track_outcome
+
+
+class TestTrackOutcome:
+    def _track(self, clock, is_failure=lambda error: True):
+        outcomes = []
+        tracker = track_outcome(lambda seconds, ok: outcomes.append((seconds, ok)), clock, is_failure)
+        return tracker, outcomes
+
+    def test_success_records_elapsed_time(self, clock):
+        tracker, outcomes = self._track(clock)
+        with tracker:
+            clock.now += 2
+
+        assert outcomes == [(2, True)]
+
+    def test_failure_is_classified(self, clock):
+        tracker, outcomes = self._track(clock, lambda error: isinstance(error, TimeoutError))
+        with pytest.raises(ValueError):
+            with tracker:
+                raise ValueError("bad input")
+        tracker, failed = self._track(clock, lambda error: isinstance(error, TimeoutError))
+        with pytest.raises(TimeoutError):
+            with tracker:
+                raise TimeoutError
+
+        assert outcomes == [(0, None)]
+        assert failed == [(0, False)]
+
+    def test_closed_stream_counts_as_success(self, clock):
+        outcomes = []
+
+        def stream():
+            with track_outcome(lambda seconds, ok: outcomes.append(ok), clock):
+                yield "token"
+                yield "more"
+
+        tokens = stream()
+        next(tokens)
+        tokens.close()
+
+        assert outcomes == [True]
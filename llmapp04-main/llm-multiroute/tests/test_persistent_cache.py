@@ -0,0 +1,109 @@
+import pytest
+
+from app.dto.classification_response import ClassificationResponse
+from app.dto.sentiment_response import SentimentResponse
+from app.service.persistent_cache import PersistentResultCache
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / "cache" / "results.sqlite3")
+
+
+def _result(category: str) -> ClassificationResponse:
+    return ClassificationResponse(labels=[category], primaryCategory=category, confidence=0.9)
+
+
+class TestPersistentResultCache:
+    @pytest.mark.asyncio
+    async def test_round_trip_returns_dto(self, db_path, clock):
+        cache = PersistentResultCache(db_path, max_entries=10, ttl_seconds=60, clock=clock)
+
+        await cache.set("k", _result("news"))
+        result = await cache.get("k", ClassificationResponse)
+
+        assert result == _result("news")
+        assert cache.hits == 1
+
+    @pytest.mark.asyncio
+    async def test_survives_reopen(self, db_path, clock):
+        cache = PersistentResultCache(db_path, max_entries=10, ttl_seconds=60, clock=clock)
+        await cache.set("k", _result("news"))
+        cache.close()
+
+        reopened = PersistentResultCache(db_path, max_entries=10, ttl_seconds=60, clock=clock)
+
+        assert await reopened.get("k", ClassificationResponse) == _result("news")
+
+    @pytest.mark.asyncio
+    async def test_expired_entry_misses(self, db_path, clock):
+        cache = PersistentResultCache(db_path, max_entries=10, ttl_seconds=60, clock=clock)
+        await cache.set("k", _result("news"))
+
+        clock.now += 61
+
+        assert await cache.get("k", ClassificationResponse) is None
+        assert cache.misses == 1
+
+    def test_size_limit_drops_least_recently_read(self, db_path, clock):
+        cache = PersistentResultCache(
+            db_path, max_entries=2, ttl_seconds=60, prune_every=1, touch_interval=0, clock=clock
+        )
+        cache.set_sync("a", _result("a"))
+        clock.now += 1
+        cache.set_sync("b", _result("b"))
+        clock.now += 1
+        cache.get_sync("a", ClassificationResponse)
+        clock.now += 1
+
+        cache.set_sync("c", _result("c"))
+
+        assert cache.get_sync("b", ClassificationResponse) is None
+        assert cache.get_sync("a", ClassificationResponse) is not None
+        assert cache.stats()["size"] == 2
+
+    def test_recent_hit_does_not_refresh_access_time(self, db_path, clock):
+        cache = PersistentResultCache(
+            db_path, max_entries=2, ttl_seconds=600, prune_every=1, touch_interval=60, clock=clock
+        )
+        cache.set_sync("a", _result("a"))
+        clock.now += 1
+        cache.set_sync("b", _result("b"))
+        clock.now += 1
+        cache.get_sync("a", ClassificationResponse)
+        clock.now += 1
+
+        cache.set_sync("c", _result("c"))
+
+        assert cache.get_sync("a", ClassificationResponse) is None
+        assert cache.get_sync("b", ClassificationResponse) is not None
+
+    def test_stale_payload_is_a_miss_and_deleted(self, db_path, clock):
+        cache = PersistentResultCache(db_path, max_entries=10, ttl_seconds=60, clock=clock)
+        stale = SentimentResponse(overallSentiment="positive", sentimentScore=0.5, emotions=[], confidence=0.9)
+        cache.set_sync("k", stale)
+
+        assert cache.get_sync("k", ClassificationResponse) is None
+        assert cache.misses == 1
+        assert cache.stats()["size"] == 0
+
+    def test_pruned_every_n_writes(self, db_path, clock):
+        cache = PersistentResultCache(db_path, max_entries=1, ttl_seconds=60, prune_every=3, clock=clock)
+        cache.set_sync("a", _result("a"))
+        clock.now += 1
+        cache.set_sync("b", _result("b"))
+
+        assert cache.stats()["size"] == 2
+
+        clock.now += 1
+        cache.set_sync("c", _result("c"))
+
+        assert cache.stats()["size"] == 1
+        assert cache.get_sync("c", ClassificationResponse) is not None
+
+    def test_clear(self, db_path, clock):
+        cache = PersistentResultCache(db_path, max_entries=10, ttl_seconds=60, clock=clock)
+        cache.set_sync("a", _result("a"))
+
+        assert cache.clear() == 1
+        assert cache.stats()["size"] == 0
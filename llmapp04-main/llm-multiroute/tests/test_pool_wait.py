@@ -0,0 +1,44 @@
+import pytest
+
+from app.service.pool_wait import PoolWaitTracker
+
+
+class TestPoolWaitTracker:
+    @pytest.mark.asyncio
+    async def test_wait_excludes_connection_setup(self, clock):
+        tracker = PoolWaitTracker(clock=clock)
+        trace = tracker.start()
+
+        clock.now += 0.5  # waiting for a free slot in the pool
+        await trace("connection.connect_tcp.started", {})
+        clock.now += 0.2
+        await trace("connection.connect_tcp.complete", {})
+        await trace("http11.send_request_headers.started", {})
+
+        assert tracker.requests == 1
+        assert tracker.total_seconds == pytest.approx(0.5)
+
+    @pytest.mark.asyncio
+    async def test_reused_connection_records_queueing_only(self, clock):
+        tracker = PoolWaitTracker(clock=clock)
+        trace = tracker.start()
+
+        clock.now += 0.05
+        await trace("http11.send_request_headers.started", {})
+        clock.now += 3.0
+        await trace("http11.receive_response_headers.started", {})
+
+        assert tracker.stats() == {"requests": 1, "avgMs": 50.0, "maxMs": 50.0, "totalSeconds": 0.05}
+
+    @pytest.mark.asyncio
+    async def test_stats_aggregate_requests(self, clock):
+        tracker = PoolWaitTracker(clock=clock)
+        for wait in (0.1, 0.3):
+            trace = tracker.start()
+            clock.now += wait
+            await trace("http2.send_request_headers.started", {})
+
+        stats = tracker.stats()
+        assert stats["requests"] == 2
+        assert stats["avgMs"] == pytest.approx(200.0)
+        assert stats["maxMs"] == pytest.approx(300.0)
@@ -0,0 +1,59 @@
+import pytest
+
+from app.service.priority import PriorityClasses, UnknownPriorityError, parse_api_keys, request_priority
+
+
+@pytest.fixture
+def classes():
+    return PriorityClasses(
+        {"interactive": 8, "standard": 4, "batch": 1},
+        "standard",
+        {"script-key": ("reports", "batch")},
+    )
+
+
+class TestPriorityClasses:
+    def test_defaults_without_headers(self, classes):
+        priority = classes.resolve()
+
+        assert (priority.name, priority.weight, priority.tenant) == ("standard", 4, "default")
+
+    def test_header_selects_class(self, classes):
+        priority = classes.resolve("Interactive")
+
+        assert (priority.name, priority.weight, priority.tenant) == ("interactive", 8, "default")
+
+    def test_api_key_overrides_header(self, classes):
+        priority = classes.resolve("interactive", api_key="script-key")
+
+        assert (priority.name, priority.tenant) == ("batch", "reports")
+
+    def test_unknown_key_falls_back_to_header(self, classes):
+        priority = classes.resolve("batch", api_key="other")
+
+        assert (priority.name, priority.tenant) == ("batch", "default")
+
+    def test_unknown_class_is_rejected(self, classes):
+        with pytest.raises(UnknownPriorityError, match="urgent"):
+            classes.resolve("urgent")
+
+    def test_default_must_be_a_class(self):
+        with pytest.raises(ValueError):
+            PriorityClasses({"batch": 1}, "standard")
+
+    def test_current_reads_request_context(self, classes):
+        assert classes.current().name == "standard"
+
+        token = request_priority.set(classes.resolve("batch"))
+        try:
+            assert classes.current().name == "batch"
+        finally:
+            request_priority.reset(token)
+
+
+class TestParseApiKeys:
+    def test_parses_tenant_and_class(self):
+        assert parse_api_keys("k1=reports:batch, k2=Interactive") == {
+            "k1": ("reports", "batch"),
+            "k2": ("default", "interactive"),
+        }
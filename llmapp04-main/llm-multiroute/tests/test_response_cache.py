@@ -0,0 +1,70 @@
+from app.service.response_cache import ResponseCache
+
+
+class TestResponseCache:
+    def test_miss_then_hit(self, clock):
+        cache = ResponseCache(max_entries=10, ttl_seconds=60, clock=clock)
+
+        assert cache.get("k") is None
+        cache.set("k", "value")
+
+        assert cache.get("k") == "value"
+        assert cache.hits == 1
+        assert cache.misses == 1
+
+    def test_entry_expires_after_ttl(self, clock):
+        cache = ResponseCache(max_entries=10, ttl_seconds=60, clock=clock)
+        cache.set("k", "value")
+
+        clock.now += 61
+
+        assert cache.get("k") is None
+        assert cache.expirations == 1
+        assert len(cache) == 0
+
+    def test_least_recently_used_entry_is_evicted(self, clock):
+        cache = ResponseCache(max_entries=2, ttl_seconds=60, clock=clock)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+
+        cache.set("c", 3)
+
+        assert cache.get("b") is None
+        assert cache.get("a") == 1
+        assert cache.get("c") == 3
+        assert cache.evictions == 1
+
+    def test_zero_entries_disables_cache(self, clock):
+        cache = ResponseCache(max_entries=0, ttl_seconds=60, clock=clock)
+        cache.set("k", "value")
+
+        assert cache.get("k") is None
+        assert cache.enabled is False
+
+    def test_clear_returns_flushed_count(self, clock):
+        cache = ResponseCache(max_entries=10, ttl_seconds=60, clock=clock)
+        cache.set("a", 1)
+        cache.set("b", 2)
+
+        assert cache.clear() == 2
+        assert len(cache) == 0
+
+    def test_stats(self, clock):
+        cache = ResponseCache(max_entries=10, ttl_seconds=60, clock=clock)
+        cache.set("a", 1)
+        cache.get("a")
+        cache.get("b")
+
+        stats = cache.stats()
+
+        assert stats == {
+            "enabled": True,
+            "size": 1,
+            "maxEntries": 10,
+            "ttlSeconds": 60,
+            "hits": 1,
+            "misses": 1,
+            "evictions": 0,
+            "expirations": 0,
+        }
@@ -0,0 +1,56 @@
+import httpx
+import pytest
+
+from app.service.retry import RetryBudget, RetryPolicy, is_retryable
+
+
+def _status_error(status: int) -> httpx.HTTPStatusError:
+    request = httpx.Request("POST", "http://ollama/api/chat")
+    return httpx.HTTPStatusError("error", request=request, response=httpx.Response(status, request=request))
+
+
+class TestIsRetryable:
+    @pytest.mark.parametrize(
+        "error", [httpx.ConnectError("x"), httpx.ReadTimeout("x"), _status_error(503), _status_error(429)]
+    )
+    def test_transient_errors(self, error):
+        assert is_retryable(error)
+
+    @pytest.mark.parametrize("error", [_status_error(400), _status_error(404), RuntimeError("x"), ValueError("x")])
+    def test_permanent_errors(self, error):
+        assert not is_retryable(error)
+
+
+class TestRetryPolicy:
+    def test_backoff_is_capped_and_jittered(self):
+        policy = RetryPolicy(max_attempts=5, base_delay=1.0, max_delay=3.0)
+
+        delays = [policy.backoff(retry) for retry in (1, 2, 3, 4) for _ in range(50)]
+
+        assert all(0 <= delay <= 3.0 for delay in delays)
+        assert all(delay <= 1.0 for delay in delays[:50])
+        assert len(set(delays)) > 1
+
+
+class TestRetryBudget:
+    def test_spends_until_empty(self):
+        budget = RetryBudget(ratio=0.5, max_tokens=2)
+
+        assert budget.try_spend()
+        assert budget.try_spend()
+        assert not budget.try_spend()
+        assert budget.exhausted == 1
+
+    def test_deposits_refill_up_to_cap(self):
+        budget = RetryBudget(ratio=0.5, max_tokens=2)
+        budget.try_spend()
+        budget.try_spend()
+
+        budget.deposit()
+        assert not budget.try_spend()
+        budget.deposit()
+        assert budget.try_spend()
+
+        for _ in range(10):
+            budget.deposit()
+        assert budget.stats()["tokens"] == 2
@@ -0,0 +1,90 @@
+import json
+import os
+
+import pytest
+
+from app.router.model_router import ModelRouter, TaskType
+from app.router.routing_rules import RoutingRules
+from app.router.token_estimate import estimate_tokens
+
+RULES = [
+    {"name": "short-classify", "task": "classify", "maxTokens": 200, "model": "gemma3:1b"},
+    {"name": "long-classify", "task": "classify", "minTokens": 2000, "model": "long-context"},
+    {"name": "huge-anything", "minTokens": 5000, "model": "huge"},
+]
+
+
+@pytest.fixture
+def rules_path(tmp_path):
+    path = tmp_path / "rules.json"
+    path.write_text(json.dumps(RULES))
+    return path
+
+
+def _rewrite(path, rules):
+    path.write_text(json.dumps(rules))
+    stat = os.stat(path)
+    os.utime(path, (stat.st_atime, stat.st_mtime + 10))
+
+
+class TestRoutingRules:
+    def test_first_matching_rule_wins(self, rules_path, clock):
+        rules = RoutingRules(str(rules_path), clock=clock)
+
+        assert rules.match(TaskType.CLASSIFY, 50).name == "short-classify"
+        assert rules.match(TaskType.CLASSIFY, 6000).name == "long-classify"
+        assert rules.match(TaskType.INTENT, 6000).name == "huge-anything"
+        assert rules.match(TaskType.CLASSIFY, 1000) is None
+        assert rules.stats()["hits"] == {"short-classify": 1, "long-classify": 1, "huge-anything": 1}
+
+    def test_reloads_changed_file_after_interval(self, rules_path, clock):
+        rules = RoutingRules(str(rules_path), reload_seconds=5, clock=clock)
+        rules.match(TaskType.CLASSIFY, 50)
+        _rewrite(rules_path, [{"name": "all-small", "model": "tiny"}])
+
+        assert rules.match(TaskType.CLASSIFY, 50).name == "short-classify"
+        clock.now += 5
+        assert rules.match(TaskType.CLASSIFY, 50).name == "all-small"
+        assert rules.stats()["reloads"] == 2
+
+    def test_invalid_file_keeps_previous_rules(self, rules_path, clock):
+        rules = RoutingRules(str(rules_path), reload_seconds=0, clock=clock)
+        rules.match(TaskType.CLASSIFY, 50)
+        _rewrite(rules_path, [{"name": "no-model"}])
+
+        assert rules.match(TaskType.CLASSIFY, 50).name == "short-classify"
+        assert rules.stats()["lastError"] is not None
+
+    def test_missing_file_means_no_rules(self, tmp_path, clock):
+        rules = RoutingRules(str(tmp_path / "missing.json"), clock=clock)
+
+        assert rules.match(TaskType.CLASSIFY, 50) is None
+
+
+class TestRuleBasedRouting:
+    def test_get_model_applies_rules_to_token_count(self, rules_path, clock):
+        router = ModelRouter(RoutingRules(str(rules_path), clock=clock))
+
+        assert router.get_model(TaskType.CLASSIFY, tokens=estimate_tokens("three word query")) == "gemma3:1b"
+        assert router.get_model(TaskType.CLASSIFY, tokens=3000) == "long-context"
+        assert router.get_model(TaskType.CLASSIFY, tokens=1000) == router.get_model(TaskType.CLASSIFY)
+
+    def test_rules_ignored_without_token_count(self, rules_path, clock):
+        router = ModelRouter(RoutingRules(str(rules_path), clock=clock))
+
+        assert router.get_model(TaskType.CLASSIFY) == router.get_routes()["classify"]
+
+    def test_decision_is_logged_with_rule(self, rules_path, clock, caplog):
+        router = ModelRouter(RoutingRules(str(rules_path), clock=clock))
+
+        with caplog.at_level("INFO", logger="app.router.model_router"):
+            router.get_model(TaskType.CLASSIFY, tokens=10)
+
+        assert "rule=short-classify" in caplog.text
+        assert "model=gemma3:1b" in caplog.text
+
+
+class TestEstimateTokens:
+    def test_roughly_four_characters_per_token(self):
+        assert estimate_tokens("") == 1
+        assert estimate_tokens("x" * 4000) == 1000
@@ -0,0 +1,52 @@
+from app.router.token_estimate import estimate_tokens
+from app.service.text_chunker import split_text
+
+
+class TestSplitText:
+    def test_short_text_is_one_chunk(self):
+        assert split_text("  A short text.  ", 100) == ["A short text."]
+
+    def test_empty_text_has_no_chunks(self):
+        assert split_text("\n\n", 100) == []
+
+    def test_paragraphs_are_packed_up_to_budget(self):
+        paragraphs = ["a" * 40, "b" * 40, "c" * 40]
+
+        chunks = split_text("\n\n".join(paragraphs), 25)
+
+        assert chunks == ["a" * 40 + "\n\n" + "b" * 40, "c" * 40]
+
+    def test_long_paragraph_is_split_between_sentences(self):
+        sentences = [f"Sentence number {i} is here." for i in range(10)]
+
+        chunks = split_text(" ".join(sentences), 20)
+
+        assert len(chunks) > 1
+        assert all(chunk.endswith(".") for chunk in chunks)
+        assert " ".join(chunks) == " ".join(sentences)
+
+    def test_every_chunk_fits_budget(self):
+        text = "\n\n".join(" ".join(f"word{i}" for i in range(n * 30)) + "." for n in range(1, 6))
+
+        chunks = split_text(text, 50)
+
+        assert all(estimate_tokens(chunk) <= 50 for chunk in chunks)
+        assert " ".join(" ".join(chunks).split()) == " ".join(text.split())
+
+    def test_oversized_word_is_cut(self):
+        chunks = split_text("x" * 100, 10)
+
+        assert chunks == ["x" * 40, "x" * 40, "x" * 20]
+
+    def test_content_defined_boundaries_resync_after_edit(self):
+        paragraphs = [f"Paragraph {i} " + "word " * (10 + i * 7 % 31) for i in range(150)]
+        original = split_text("\n\n".join(paragraphs), 400, content_defined=True)
+        greedy = split_text("\n\n".join(paragraphs), 400)
+
+        paragraphs.insert(40, "A new paragraph " + "text " * 20)
+        edited = split_text("\n\n".join(paragraphs), 400, content_defined=True)
+        edited_greedy = split_text("\n\n".join(paragraphs), 400)
+
+        assert len(set(edited) - set(original)) == 1
+        assert len(set(edited_greedy) - set(greedy)) > 5
+        assert all(estimate_tokens(chunk) <= 400 for chunk in edited)
@@ -0,0 +1,155 @@
+import asyncio
+
+import pytest
+
+from app.service.token_scheduler import CapacityExceededError, TokenScheduler
+
+
+def _scheduler(clock, **kwargs):
+    options = {"tokens_per_second": 1000, "burst_seconds": 0.1, "max_wait": 1.0, "prefill_weight": 0.1}
+    options.update(kwargs)
+    return TokenScheduler("gemma3:4b", clock=clock, **options)
+
+
+class TestAdmission:
+    @pytest.mark.asyncio
+    async def test_cost_is_output_cap_plus_weighted_prompt(self, clock):
+        scheduler = _scheduler(clock)
+
+        admission = await scheduler.admit("classify", prompt_tokens=400, max_tokens=60)
+
+        assert (admission.prefill, admission.decode) == (400, 60)
+        assert admission.cost == pytest.approx(100)
+        assert scheduler.stats()["credit"] == pytest.approx(0)
+        assert scheduler.in_flight == 1
+
+    @pytest.mark.asyncio
+    async def test_call_waits_until_debt_is_paid_back(self, clock):
+        scheduler = _scheduler(clock)
+        await scheduler.admit("summarize", prompt_tokens=0, max_tokens=150)
+
+        waiting = asyncio.create_task(scheduler.admit("classify", prompt_tokens=0, max_tokens=10))
+        await asyncio.sleep(0)
+        assert not waiting.done()
+        assert scheduler.stats()["queued"] == 1
+
+        clock.now += 0.06
+        await asyncio.wait_for(waiting, timeout=1)
+
+        assert scheduler.admitted == 2
+        assert scheduler.stats()["queued"] == 0
+
+    @pytest.mark.asyncio
+    async def test_rejects_when_predicted_wait_is_too_long(self, clock):
+        scheduler = _scheduler(clock, max_wait=0.5)
+        await scheduler.admit("summarize", prompt_tokens=0, max_tokens=600)
+
+        with pytest.raises(CapacityExceededError) as exc_info:
+            await scheduler.admit("summarize", prompt_tokens=0, max_tokens=600)
+
+        assert exc_info.value.retry_after == pytest.approx(1.1)
+        assert scheduler.rejected == 1
+
+    @pytest.mark.asyncio
+    async def test_cancelled_waiter_leaves_queue(self, clock):
+        scheduler = _scheduler(clock)
+        await scheduler.admit("summarize", prompt_tokens=0, max_tokens=150)
+        waiting = asyncio.create_task(scheduler.admit("classify", prompt_tokens=0, max_tokens=10))
+        await asyncio.sleep(0)
+
+        waiting.cancel()
+        await asyncio.gather(waiting, return_exceptions=True)
+
+        assert scheduler.stats()["queued"] == 0
+        assert scheduler.in_flight == 1
+
+    @pytest.mark.asyncio
+    async def test_release_without_usage_is_charged_estimate(self, clock):
+        scheduler = _scheduler(clock)
+        admission = await scheduler.admit("classify", prompt_tokens=0, max_tokens=50)
+
+        scheduler.release(admission, {})
+
+        assert scheduler.stats()["credit"] == pytest.approx(50)
+        assert scheduler.in_flight == 0
+
+    @pytest.mark.asyncio
+    async def test_unsent_call_gets_full_refund(self, clock):
+        scheduler = _scheduler(clock)
+        admission = await scheduler.admit("classify", prompt_tokens=0, max_tokens=50)
+
+        scheduler.release(admission, None)
+
+        assert scheduler.stats()["credit"] == pytest.approx(100)
+
+
+class TestLearning:
+    @pytest.mark.asyncio
+    async def test_usage_settles_cost_and_learns_output_length(self, clock):
+        scheduler = _scheduler(clock, tokens_per_second=10000)
+        admission = await scheduler.admit("classify", prompt_tokens=100, max_tokens=256)
+
+        scheduler.release(admission, {"prompt_eval_count": 100, "eval_count": 40})
+
+        assert scheduler.stats()["credit"] == pytest.approx(1000 - 50)
+        assert scheduler.expected_decode("classify", 256) == 40
+        assert scheduler.expected_decode("summarize", 1024) == 1024
+
+    @pytest.mark.asyncio
+    async def test_streamed_token_count_is_used_when_stream_closed_early(self, clock):
+        scheduler = _scheduler(clock, tokens_per_second=10000)
+        admission = await scheduler.admit("classify", prompt_tokens=0, max_tokens=256)
+
+        scheduler.release(admission, {"streamed": 30})
+
+        assert scheduler.expected_decode("classify", 256) == 30
+
+    @pytest.mark.asyncio
+    async def test_learns_prefill_weight_from_durations(self, clock):
+        scheduler = _scheduler(clock, tokens_per_second=10000, learn=True)
+        admission = await scheduler.admit("classify", prompt_tokens=1000, max_tokens=100)
+
+        # 1000 prompt tokens in 0.2s, 100 output tokens in 2s: prefill is 100x cheaper per token
+        scheduler.release(
+            admission,
+            {"prompt_eval_count": 1000, "prompt_eval_duration": 2e8, "eval_count": 100, "eval_duration": 2e9},
+        )
+
+        assert scheduler.prefill_weight == pytest.approx(0.1 + 0.2 * (0.01 - 0.1))
+
+    @pytest.mark.asyncio
+    async def test_capacity_rises_to_observed_throughput(self, clock):
+        scheduler = _scheduler(clock, tokens_per_second=10, burst_seconds=100)
+        first = await scheduler.admit("classify", prompt_tokens=0, max_tokens=50)
+        await scheduler.admit("classify", prompt_tokens=0, max_tokens=50)
+
+        # 100 tokens in 1s while two calls shared the model: 200 tokens/s
+        scheduler.release(
+            first, {"prompt_eval_count": 0, "prompt_eval_duration": 0, "eval_count": 100, "eval_duration": 1e9}
+        )
+
+        assert scheduler.tokens_per_second == pytest.approx(10 + 0.2 * (200 - 10))
+
+    @pytest.mark.asyncio
+    async def test_capacity_only_drops_when_saturated(self, clock):
+        scheduler = _scheduler(clock, tokens_per_second=1000, burst_seconds=1)
+        usage = {"prompt_eval_count": 0, "prompt_eval_duration": 0, "eval_count": 10, "eval_duration": 1e9}
+
+        idle = await scheduler.admit("classify", prompt_tokens=0, max_tokens=10)
+        scheduler.release(idle, usage)
+        assert scheduler.tokens_per_second == 1000
+
+        busy = await scheduler.admit("summarize", prompt_tokens=0, max_tokens=2000)
+        scheduler.release(busy, usage)
+        assert scheduler.tokens_per_second == pytest.approx(1000 + 0.2 * (10 - 1000))
+
+    @pytest.mark.asyncio
+    async def test_learning_can_be_disabled(self, clock):
+        scheduler = _scheduler(clock, tokens_per_second=10000, learn=False)
+        admission = await scheduler.admit("classify", prompt_tokens=0, max_tokens=256)
+
+        scheduler.release(admission, {"eval_count": 40, "eval_duration": 1e8, "prompt_eval_duration": 0})
+
+        assert scheduler.expected_decode("classify", 256) == 256
+        assert scheduler.tokens_per_second == 10000
+        assert scheduler.stats()["learnedCalls"] == 0
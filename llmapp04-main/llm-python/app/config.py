@@ -8,6 +8,11 @@ class Settings:
     OLLAMA_MODEL: str = os.getenv("OLLAMA_MODEL", "gemma3:4b")
     OLLAMA_TEMPERATURE: float = float(os.getenv("OLLAMA_TEMPERATURE", "0.7"))
     OLLAMA_API_KEY: str = os.getenv("OLLAMA_API_KEY", "")
+    # Send the DTO JSON schemas as Ollama's `format`; disable for backends without structured outputs
+    OLLAMA_STRUCTURED_OUTPUT: bool = os.getenv("OLLAMA_STRUCTURED_OUTPUT", "true").lower() == "true"
+
+    # Ask for all tasks in one prompt on /api/ai/analyze
+    MULTI_TASK_PROMPT_ENABLED: bool = os.getenv("MULTI_TASK_PROMPT_ENABLED", "true").lower() == "true"
 
 
 settings = Settings()
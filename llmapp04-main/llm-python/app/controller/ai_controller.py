@@ -1,15 +1,19 @@
+from typing import get_args
+
 from fastapi import APIRouter
 
+from app.dto.analyze_request import AnalysisTask, AnalyzeRequest
+from app.dto.analyze_response import AnalyzeResponse
 from app.dto.classification_response import ClassificationResponse
 from app.dto.intent_response import IntentResponse
 from app.dto.sentiment_response import SentimentResponse
 from app.dto.summary_response import SummaryResponse
 from app.dto.text_request import TextRequest
-from app.service.ai_service import AIService
+from app.service.ai_service import AsyncAIService
 
 router = APIRouter(prefix="/api/ai", tags=["AI Text Analysis"])
 
-ai_service = AIService()
+ai_service = AsyncAIService()
 
 
 @router.post(
@@ -18,8 +22,8 @@ ai_service = AIService()
     summary="Classify Text",
     description="Analyzes text and returns classification labels, tags, and primary category",
 )
-def classify_text(request: TextRequest) -> ClassificationResponse:
-    return ai_service.classify_text(request.text)
+async def classify_text(request: TextRequest) -> ClassificationResponse:
+    return await ai_service.classify_text(request.text)
 
 
 @router.post(
@@ -28,8 +32,8 @@ def classify_text(request: TextRequest) -> ClassificationResponse:
     summary="Analyze Sentiment",
     description="Analyzes text sentiment (positive, negative, neutral) and detects specific emotions",
 )
-def analyze_sentiment(request: TextRequest) -> SentimentResponse:
-    return ai_service.analyze_sentiment(request.text)
+async def analyze_sentiment(request: TextRequest) -> SentimentResponse:
+    return await ai_service.analyze_sentiment(request.text)
 
 
 @router.post(
@@ -38,8 +42,8 @@ def analyze_sentiment(request: TextRequest) -> SentimentResponse:
     summary="Summarize Text",
     description="Generates a concise summary with key points from the provided text",
 )
-def summarize_text(request: TextRequest) -> SummaryResponse:
-    return ai_service.summarize_text(request.text)
+async def summarize_text(request: TextRequest) -> SummaryResponse:
+    return await ai_service.summarize_text(request.text)
 
 
 @router.post(
@@ -48,5 +52,18 @@ def summarize_text(request: TextRequest) -> SummaryResponse:
     summary="Detect Intent",
     description="Identifies the intent and purpose behind the text (question, request, statement, command)",
 )
-def detect_intent(request: TextRequest) -> IntentResponse:
-    return ai_service.detect_intent(request.text)
+async def detect_intent(request: TextRequest) -> IntentResponse:
+    return await ai_service.detect_intent(request.text)
+
+
+@router.post(
+    "/analyze",
+    response_model=AnalyzeResponse,
+    summary="Run Several Analyses",
+    description=(
+        "Runs the requested analyses (all four by default) concurrently and returns every result "
+        "plus per-task errors"
+    ),
+)
+async def analyze_text(request: AnalyzeRequest) -> AnalyzeResponse:
+    return await ai_service.analyze_text(request.text, request.tasks or list(get_args(AnalysisTask)))
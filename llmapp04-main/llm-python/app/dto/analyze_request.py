@@ -0,0 +1,20 @@
+from typing import Literal, Optional
+
+from pydantic import BaseModel, Field
+
+AnalysisTask = Literal["classify", "sentiment", "summarize", "intent"]
+
+
+class AnalyzeRequest(BaseModel):
+    """Request body for running several analyses on one text."""
+
+    text: str = Field(
+        ...,
+        description="Text to be analyzed",
+        json_schema_extra={"example": "I love this product! The quality is outstanding."},
+    )
+    tasks: Optional[list[AnalysisTask]] = Field(
+        None,
+        description="Analyses to run; all four when omitted",
+        json_schema_extra={"example": ["sentiment", "intent"]},
+    )
@@ -1,8 +1,22 @@
+from contextlib import asynccontextmanager
+
+import httpx
 from fastapi import FastAPI
 
 from app.config import settings
+from app.controller.ai_controller import ai_service
 from app.controller.ai_controller import router as ai_router
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # One pooled client for the process; closed when the server shuts down.
+    async with httpx.AsyncClient(timeout=120.0) as client:
+        ai_service.http_client = client
+        yield
+        ai_service.http_client = None
+
+
 app = FastAPI(
     title="Spring AI with Ollama - Text Analysis API",
     version="1.0.0",
@@ -19,6 +33,7 @@ app = FastAPI(
     servers=[
         {"url": f"http://localhost:{settings.SERVER_PORT}", "description": "Local Development Server"}
     ],
+    lifespan=lifespan,
 )
 
 app.include_router(ai_router)
@@ -1,97 +1,248 @@
+import asyncio
 import json
 import re
-from typing import Optional
+from typing import Any, Iterable, Optional
 
 import httpx
 
 from app.config import settings
+from app.dto.analyze_response import AnalyzeResponse
 from app.dto.classification_response import ClassificationResponse
 from app.dto.intent_response import IntentResponse
 from app.dto.sentiment_response import SentimentResponse
 from app.dto.summary_response import SummaryResponse
 
+# Per-task instruction, expected JSON shape and response model; the text is inserted
+# between the instruction and the format.
+_TASKS: dict[str, tuple[str, str, type]] = {
+    "classify": (
+        "Analyze the following text and classify it with appropriate labels and tags. ",
+        '{"labels": ["label1", "label2"], "primaryCategory": "category", "confidence": 0.9}',
+        ClassificationResponse,
+    ),
+    "sentiment": (
+        "Analyze the sentiment of the following text. ",
+        '{"overallSentiment": "positive", "sentimentScore": 0.8, '
+        '"emotions": ["joy", "excitement"], "confidence": 0.9}',
+        SentimentResponse,
+    ),
+    "summarize": (
+        "Summarize the following text concisely. ",
+        '{"summary": "your summary here", "keyPoints": ["point1", "point2", "point3"], "wordCount": 25}',
+        SummaryResponse,
+    ),
+    "intent": (
+        "Detect the intent behind the following text. ",
+        '{"primaryIntent": "main_intent", "secondaryIntents": ["intent1", "intent2"], '
+        '"intentCategory": "question", "confidence": 0.9}',
+        IntentResponse,
+    ),
+}
 
-class AIService:
-    def __init__(self, http_client: Optional[httpx.Client] = None):
-        self.http_client = http_client or httpx.Client(timeout=120.0)
+# JSON schemas passed as Ollama's ``format`` to constrain decoding to each DTO.
+_TASK_SCHEMAS: dict[str, dict] = {task: spec[2].model_json_schema() for task, spec in _TASKS.items()}
+
+
+class _BaseAIService:
+    """Prompt construction and response parsing shared by the sync and async services."""
+
+    def __init__(self):
         self.base_url = settings.OLLAMA_BASE_URL
         self.model = settings.OLLAMA_MODEL
         self.temperature = settings.OLLAMA_TEMPERATURE
         self.api_key = settings.OLLAMA_API_KEY
+        self.structured_output = settings.OLLAMA_STRUCTURED_OUTPUT
 
-    def _chat(self, prompt: str) -> str:
+    def _headers(self) -> dict[str, str]:
         headers = {}
         if self.api_key:
             headers["Authorization"] = f"Bearer {self.api_key}"
-        response = self.http_client.post(
-            f"{self.base_url}/api/chat",
-            headers=headers,
-            json={
-                "model": self.model,
-                "messages": [{"role": "user", "content": prompt}],
-                "stream": False,
-                "options": {"temperature": self.temperature},
-            },
-        )
-        response.raise_for_status()
-        return response.json()["message"]["content"]
+        return headers
 
-    def classify_text(self, text: str) -> ClassificationResponse:
-        prompt = (
-            "Analyze the following text and classify it with appropriate labels and tags. "
-            "Respond with ONLY valid JSON, no additional text or explanation.\n\n"
-            f"Text: {text}\n\n"
-            "Return JSON in this exact format:\n"
-            '{"labels": ["label1", "label2"], "primaryCategory": "category", "confidence": 0.9}'
-        )
-        response = self._chat(prompt)
-        return self._parse_json(response, ClassificationResponse)
+    def _response_format(self, tasks: list[str]) -> Optional[dict]:
+        """JSON schema for Ollama's ``format`` so decoding can only produce the expected DTO(s)."""
+        if not self.structured_output:
+            return None
+        if len(tasks) == 1:
+            return _TASK_SCHEMAS[tasks[0]]
+        return {
+            "type": "object",
+            "properties": {task: _TASK_SCHEMAS[task] for task in tasks},
+            "required": list(tasks),
+        }
 
-    def analyze_sentiment(self, text: str) -> SentimentResponse:
-        prompt = (
-            "Analyze the sentiment of the following text. "
-            "Respond with ONLY valid JSON, no additional text or explanation.\n\n"
-            f"Text: {text}\n\n"
-            "Return JSON in this exact format:\n"
-            '{"overallSentiment": "positive", "sentimentScore": 0.8, '
-            '"emotions": ["joy", "excitement"], "confidence": 0.9}'
-        )
-        response = self._chat(prompt)
-        return self._parse_json(response, SentimentResponse)
+    def _chat_body(self, prompt: str, tasks: list[str]) -> dict:
+        body = {
+            "model": self.model,
+            "messages": [{"role": "user", "content": prompt}],
+            "stream": False,
+            "options": {"temperature": self.temperature},
+        }
+        response_format = self._response_format(tasks)
+        if response_format is not None:
+            body["format"] = response_format
+        return body
 
-    def summarize_text(self, text: str) -> SummaryResponse:
-        prompt = (
-            "Summarize the following text concisely. "
+    @staticmethod
+    def _build_prompt(task: str, text: str) -> str:
+        instruction, json_format, _ = _TASKS[task]
+        return (
+            f"{instruction}"
             "Respond with ONLY valid JSON, no additional text or explanation.\n\n"
             f"Text: {text}\n\n"
             "Return JSON in this exact format:\n"
-            '{"summary": "your summary here", "keyPoints": ["point1", "point2", "point3"], "wordCount": 25}'
+            f"{json_format}"
         )
-        response = self._chat(prompt)
-        return self._parse_json(response, SummaryResponse)
 
-    def detect_intent(self, text: str) -> IntentResponse:
-        prompt = (
-            "Detect the intent behind the following text. "
+    @staticmethod
+    def _build_combined_prompt(tasks: list[str], text: str) -> str:
+        task_lines = "".join(f"- {task}: {_TASKS[task][0].strip()}\n" for task in tasks)
+        json_format = ", ".join(f'"{task}": {_TASKS[task][1]}' for task in tasks)
+        return (
+            "Perform each of the following tasks on the text below. "
             "Respond with ONLY valid JSON, no additional text or explanation.\n\n"
+            f"Tasks:\n{task_lines}\n"
             f"Text: {text}\n\n"
-            "Return JSON in this exact format:\n"
-            '{"primaryIntent": "main_intent", "secondaryIntents": ["intent1", "intent2"], '
-            '"intentCategory": "question", "confidence": 0.9}'
+            "Return one JSON object with a key per task, in this exact format:\n"
+            f"{{{json_format}}}"
         )
-        response = self._chat(prompt)
-        return self._parse_json(response, IntentResponse)
 
     @staticmethod
-    def _parse_json(raw: str, model_class: type):
+    def _load_json(raw: str) -> Any:
         cleaned = raw.strip()
         # Strip markdown code blocks if present
         cleaned = re.sub(r"^```json\s*", "", cleaned)
         cleaned = re.sub(r"^```\s*", "", cleaned)
         cleaned = re.sub(r"\s*```$", "", cleaned)
-        cleaned = cleaned.strip()
+        return json.loads(cleaned.strip())
+
+    @classmethod
+    def _parse_json(cls, raw: str, model_class: type):
+        # Schema-constrained output is plain JSON; only fall back to fence stripping when that fails.
+        try:
+            return model_class.model_validate_json(raw)
+        except ValueError:
+            pass
         try:
-            data = json.loads(cleaned)
+            data = cls._load_json(raw)
             return model_class(**data)
         except Exception as e:
             raise RuntimeError(f"Failed to parse AI response as JSON: {raw}") from e
+
+    @classmethod
+    def _parse_combined(cls, raw: str, tasks: list[str]) -> dict[str, Any]:
+        """Split a combined answer into per-task DTOs, leaving out sections that do not validate."""
+        try:
+            data = cls._load_json(raw)
+        except Exception:
+            return {}
+        if not isinstance(data, dict):
+            return {}
+        results = {}
+        for task in tasks:
+            try:
+                results[task] = _TASKS[task][2](**data.get(task))
+            except Exception:
+                continue
+        return results
+
+
+class AIService(_BaseAIService):
+    """Blocking client, kept for scripts and callers outside the event loop."""
+
+    def __init__(self, http_client: Optional[httpx.Client] = None):
+        super().__init__()
+        self.http_client = http_client or httpx.Client(timeout=120.0)
+
+    def _chat(self, prompt: str, tasks: list[str]) -> str:
+        response = self.http_client.post(
+            f"{self.base_url}/api/chat",
+            headers=self._headers(),
+            json=self._chat_body(prompt, tasks),
+        )
+        response.raise_for_status()
+        return response.json()["message"]["content"]
+
+    def _run_task(self, task: str, text: str):
+        response = self._chat(self._build_prompt(task, text), [task])
+        return self._parse_json(response, _TASKS[task][2])
+
+    def classify_text(self, text: str) -> ClassificationResponse:
+        return self._run_task("classify", text)
+
+    def analyze_sentiment(self, text: str) -> SentimentResponse:
+        return self._run_task("sentiment", text)
+
+    def summarize_text(self, text: str) -> SummaryResponse:
+        return self._run_task("summarize", text)
+
+    def detect_intent(self, text: str) -> IntentResponse:
+        return self._run_task("intent", text)
+
+
+class AsyncAIService(_BaseAIService):
+    """Non-blocking client used by the API routes.
+
+    The ``httpx.AsyncClient`` is owned by the application lifespan (see ``app.main``)
+    and attached here on startup, so all requests share one connection pool.
+    Every task runs on the same model, so ``analyze_text`` asks for all of them in
+    one prompt unless ``combine_tasks`` is off.
+    """
+
+    def __init__(self, http_client: Optional[httpx.AsyncClient] = None):
+        super().__init__()
+        self.http_client = http_client
+        self.combine_tasks = settings.MULTI_TASK_PROMPT_ENABLED
+
+    async def _chat(self, prompt: str, tasks: list[str]) -> str:
+        if self.http_client is None:
+            raise RuntimeError("AsyncAIService has no HTTP client; is the application lifespan running?")
+        response = await self.http_client.post(
+            f"{self.base_url}/api/chat",
+            headers=self._headers(),
+            json=self._chat_body(prompt, tasks),
+        )
+        response.raise_for_status()
+        return response.json()["message"]["content"]
+
+    async def _run_task(self, task: str, text: str):
+        response = await self._chat(self._build_prompt(task, text), [task])
+        return self._parse_json(response, _TASKS[task][2])
+
+    async def classify_text(self, text: str) -> ClassificationResponse:
+        return await self._run_task("classify", text)
+
+    async def analyze_sentiment(self, text: str) -> SentimentResponse:
+        return await self._run_task("sentiment", text)
+
+    async def summarize_text(self, text: str) -> SummaryResponse:
+        return await self._run_task("summarize", text)
+
+    async def detect_intent(self, text: str) -> IntentResponse:
+        return await self._run_task("intent", text)
+
+    async def analyze_text(self, text: str, tasks: Iterable[str]) -> AnalyzeResponse:
+        """Run several tasks on ``text``, in one combined prompt when enabled.
+
+        Tasks missing from the combined answer, or all of them when combining is off or
+        the combined call fails, run as separate concurrent calls.
+        """
+        tasks = list(dict.fromkeys(tasks))
+        outcomes: dict[str, Any] = {}
+        if self.combine_tasks and len(tasks) > 1:
+            try:
+                response = await self._chat(self._build_combined_prompt(tasks, text), tasks)
+                outcomes.update(self._parse_combined(response, tasks))
+            except Exception:
+                # Each task is retried on its own below
+                pass
+        missing = [task for task in tasks if task not in outcomes]
+        results = await asyncio.gather(*(self._run_task(task, text) for task in missing), return_exceptions=True)
+        outcomes.update(zip(missing, results))
+        response = AnalyzeResponse()
+        for task, outcome in outcomes.items():
+            if isinstance(outcome, Exception):
+                response.errors[task] = str(outcome)
+            else:
+                setattr(response, task, outcome)
+        return response
@@ -1,8 +1,10 @@
-from unittest.mock import MagicMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
 
+import httpx
 import pytest
 from fastapi.testclient import TestClient
 
+from app.dto.analyze_response import AnalyzeResponse
 from app.dto.classification_response import ClassificationResponse
 from app.dto.intent_response import IntentResponse
 from app.dto.sentiment_response import SentimentResponse
@@ -12,7 +14,7 @@ from app.main import app
 
 @pytest.fixture
 def mock_ai_service():
-    with patch("app.controller.ai_controller.ai_service") as mock_service:
+    with patch("app.controller.ai_controller.ai_service", new_callable=AsyncMock) as mock_service:
         yield mock_service
 
 
@@ -291,3 +293,35 @@ class TestRequestValidation:
         )
 
         assert response.status_code == 422
+
+
+class TestLifespan:
+    def test_lifespan_attaches_shared_async_client(self):
+        from app.controller.ai_controller import ai_service
+
+        with TestClient(app):
+            assert isinstance(ai_service.http_client, httpx.AsyncClient)
+        assert ai_service.http_client is None
+
+
+class TestAnalyzeEndpoint:
+    def test_runs_all_tasks_by_default(self, client, mock_ai_service):
+        mock_ai_service.analyze_text.return_value = AnalyzeResponse(
+            sentiment=SentimentResponse(overallSentiment="positive", sentimentScore=0.8, emotions=[], confidence=0.9),
+            errors={"summarize": "AI service timeout"},
+        )
+
+        response = client.post("/api/ai/analyze", json={"text": "Great product"})
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["sentiment"]["overallSentiment"] == "positive"
+        assert data["errors"] == {"summarize": "AI service timeout"}
+        mock_ai_service.analyze_text.assert_called_once_with(
+            "Great product", ["classify", "sentiment", "summarize", "intent"]
+        )
+
+    def test_unknown_task_returns_422(self, client, mock_ai_service):
+        response = client.post("/api/ai/analyze", json={"text": "Hi", "tasks": ["translate"]})
+
+        assert response.status_code == 422
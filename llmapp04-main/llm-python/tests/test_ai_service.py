@@ -1,5 +1,5 @@
 import json
-from unittest.mock import MagicMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
 
@@ -7,7 +7,7 @@ from app.dto.classification_response import ClassificationResponse
 from app.dto.intent_response import IntentResponse
 from app.dto.sentiment_response import SentimentResponse
 from app.dto.summary_response import SummaryResponse
-from app.service.ai_service import AIService
+from app.service.ai_service import AIService, AsyncAIService
 
 
 @pytest.fixture
@@ -267,3 +267,167 @@ class TestJsonParsingEdgeCases:
         assert "labels" in prompt
         assert "primaryCategory" in prompt
         assert "confidence" in prompt
+
+
+@pytest.fixture
+def mock_async_http_client():
+    client = MagicMock()
+    client.post = AsyncMock()
+    return client
+
+
+@pytest.fixture
+def async_ai_service(mock_async_http_client):
+    return AsyncAIService(http_client=mock_async_http_client)
+
+
+def _setup_async_chat_response(mock_async_http_client, response_text: str):
+    mock_response = MagicMock()
+    mock_response.json.return_value = {"message": {"content": response_text}}
+    mock_response.raise_for_status = MagicMock()
+    mock_async_http_client.post.return_value = mock_response
+
+
+class TestAsyncAIService:
+    @pytest.mark.asyncio
+    async def test_classify_text(self, async_ai_service, mock_async_http_client):
+        _setup_async_chat_response(
+            mock_async_http_client,
+            '{"labels": ["technology"], "primaryCategory": "technology", "confidence": 0.95}',
+        )
+
+        result = await async_ai_service.classify_text("AI is transforming healthcare")
+
+        assert result.primaryCategory == "technology"
+        body = mock_async_http_client.post.call_args.kwargs["json"]
+        assert "AI is transforming healthcare" in body["messages"][0]["content"]
+
+    @pytest.mark.asyncio
+    async def test_summarize_text(self, async_ai_service, mock_async_http_client):
+        _setup_async_chat_response(
+            mock_async_http_client, '{"summary": "s", "keyPoints": ["p"], "wordCount": 1}'
+        )
+
+        result = await async_ai_service.summarize_text("text")
+
+        assert result.summary == "s"
+
+    @pytest.mark.asyncio
+    async def test_invalid_json_raises_exception(self, async_ai_service, mock_async_http_client):
+        _setup_async_chat_response(mock_async_http_client, "This is not valid JSON")
+
+        with pytest.raises(RuntimeError, match="Failed to parse AI response as JSON"):
+            await async_ai_service.detect_intent("some text")
+
+    @pytest.mark.asyncio
+    async def test_missing_http_client_raises(self):
+        service = AsyncAIService()
+
+        with pytest.raises(RuntimeError, match="no HTTP client"):
+            await service.analyze_sentiment("some text")
+
+
+class TestAsyncAnalyzeText:
+    @pytest.mark.asyncio
+    async def test_failed_task_is_reported_without_failing_others(self, async_ai_service, mock_async_http_client):
+        async def post(url, headers, json):
+            prompt = json["messages"][0]["content"]
+            content = (
+                "not json"
+                if prompt.startswith("Summarize")
+                else '{"overallSentiment": "neutral", "sentimentScore": 0.0, "emotions": [], "confidence": 0.5}'
+            )
+            mock_response = MagicMock()
+            mock_response.json.return_value = {"message": {"content": content}}
+            return mock_response
+
+        mock_async_http_client.post.side_effect = post
+        async_ai_service.combine_tasks = False
+
+        result = await async_ai_service.analyze_text("text", ["sentiment", "summarize"])
+
+        assert result.sentiment.overallSentiment == "neutral"
+        assert result.summarize is None
+        assert "Failed to parse AI response as JSON" in result.errors["summarize"]
+        assert mock_async_http_client.post.await_count == 2
+
+
+class TestAsyncCombinedPrompt:
+    @pytest.mark.asyncio
+    async def test_all_tasks_share_one_prompt(self, async_ai_service, mock_async_http_client):
+        _setup_async_chat_response(
+            mock_async_http_client,
+            '{"classify": {"labels": ["t"], "primaryCategory": "t", "confidence": 0.9}, '
+            '"summarize": {"summary": "s", "keyPoints": ["p"], "wordCount": 1}}',
+        )
+
+        result = await async_ai_service.analyze_text("text", ["classify", "summarize"])
+
+        assert result.classify.primaryCategory == "t"
+        assert result.summarize.summary == "s"
+        assert mock_async_http_client.post.await_count == 1
+
+    @pytest.mark.asyncio
+    async def test_missing_section_falls_back_to_single_call(self, async_ai_service, mock_async_http_client):
+        combined = MagicMock()
+        combined.json.return_value = {
+            "message": {"content": '{"classify": {"labels": ["t"], "primaryCategory": "t", "confidence": 0.9}}'}
+        }
+        single = MagicMock()
+        single.json.return_value = {"message": {"content": '{"summary": "s", "keyPoints": [], "wordCount": 1}'}}
+        mock_async_http_client.post.side_effect = [combined, single]
+
+        result = await async_ai_service.analyze_text("text", ["classify", "summarize"])
+
+        assert result.classify.primaryCategory == "t"
+        assert result.summarize.summary == "s"
+        assert result.errors == {}
+
+    @pytest.mark.asyncio
+    async def test_failed_combined_call_falls_back_to_single_calls(self, async_ai_service, mock_async_http_client):
+        classify = MagicMock()
+        classify.json.return_value = {
+            "message": {"content": '{"labels": ["t"], "primaryCategory": "t", "confidence": 0.9}'}
+        }
+        summarize = MagicMock()
+        summarize.json.return_value = {"message": {"content": '{"summary": "s", "keyPoints": [], "wordCount": 1}'}}
+        mock_async_http_client.post.side_effect = [RuntimeError("upstream 503"), classify, summarize]
+
+        result = await async_ai_service.analyze_text("text", ["classify", "summarize"])
+
+        assert result.classify.primaryCategory == "t"
+        assert result.summarize.summary == "s"
+        assert result.errors == {}
+        assert mock_async_http_client.post.await_count == 3
+
+
+class TestStructuredOutput:
+    def test_dto_schema_sent_as_format(self, ai_service, mock_http_client):
+        _setup_chat_response(mock_http_client, '{"labels": ["t"], "primaryCategory": "t", "confidence": 0.9}')
+
+        ai_service.classify_text("text")
+
+        body = mock_http_client.post.call_args.kwargs["json"]
+        assert body["format"] == ClassificationResponse.model_json_schema()
+
+    def test_disabled_sends_no_format(self, ai_service, mock_http_client):
+        ai_service.structured_output = False
+        _setup_chat_response(mock_http_client, '{"labels": ["t"], "primaryCategory": "t", "confidence": 0.9}')
+
+        ai_service.classify_text("text")
+
+        assert "format" not in mock_http_client.post.call_args.kwargs["json"]
+
+    @pytest.mark.asyncio
+    async def test_combined_prompt_schema_nests_each_task(self, async_ai_service, mock_async_http_client):
+        _setup_async_chat_response(
+            mock_async_http_client,
+            '{"classify": {"labels": ["t"], "primaryCategory": "t", "confidence": 0.9}, '
+            '"summarize": {"summary": "s", "keyPoints": [], "wordCount": 1}}',
+        )
+
+        await async_ai_service.analyze_text("text", ["classify", "summarize"])
+
+        response_format = mock_async_http_client.post.call_args.kwargs["json"]["format"]
+        assert response_format["required"] == ["classify", "summarize"]
+        assert response_format["properties"]["summarize"] == SummaryResponse.model_json_schema()